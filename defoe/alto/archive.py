@@ -7,6 +7,7 @@ import abc
 import re
 import zipfile
 
+from defoe.archive_manifest import get_manifest, zip_members
 from defoe.alto.document import Document
 from defoe.spark_utils import open_stream
 
@@ -25,18 +26,86 @@ class AltoArchive(abc.ABCMeta('ABC', (object,), {})):
         :type: filename: str or unicode
         """
         self.filename = filename
-        stream = open_stream(self.filename)
-        self.zip = zipfile.ZipFile(stream)
-        self.filenames = [entry.filename for entry in self.zip.infolist()]
+        self.archive_zip = None
+        self.manifest = get_manifest(self)
+        self.filenames = self.manifest["filenames"]
+        self.members = self.manifest["members"]
+        self.document_codes = self.manifest["document_codes"]
+
+    @property
+    def zip(self):
+        """
+        Gets ZIP file, opening it on first use, so an archive whose
+        manifest has been read only reads the ZIP file once a member
+        is opened.
+
+        :return: ZIP file
+        :rtype: zipfile.ZipFile
+        """
+        if self.archive_zip is None:
+            stream = open_stream(self.filename)
+            self.archive_zip = zipfile.ZipFile(stream)
+        return self.archive_zip
+
+    def __getstate__(self):
+        """
+        Gets state for pickling: the archive's filename and manifest.
+        The ZIP file, if open, is reopened on first use after
+        unpickling.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"filename": self.filename, "manifest": self.manifest}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.filename = state["filename"]
+        self.archive_zip = None
+        self.manifest = state["manifest"]
+        self.filenames = self.manifest["filenames"]
+        self.members = self.manifest["members"]
+        self.document_codes = self.manifest["document_codes"]
+
+    def list_members(self):
+        """
+        Lists members of archive.
+
+        :return: member names, offset, compressed size and size keyed by
+        member name, and directories within archive directory
+        :rtype: tuple(list(str or unicode), dict(str or unicode,
+        list(int)), list(str or unicode))
+        """
+        filenames, members = zip_members(self.zip)
+        return filenames, members, []
+
+    def find_document_codes(self, filenames):
+        """
+        Finds documents and their pages in archive members, with
+        each document's pages sorted by Document.sorter.
+
+        :param filenames: member names
+        :type filenames: list(str or unicode)
+        :return: sorted page codes keyed by document code
+        :rtype: dict(str or unicode, list(str or unicode))
+        """
         document_pattern = re.compile(self.get_document_pattern())
         page_pattern = re.compile(self.get_page_pattern())
         document_matches = [
-            _f for _f in [document_pattern.match(name) for name in self.filenames] if _f]
+            _f for _f in [document_pattern.match(name) for name in filenames] if _f]
         page_matches = [
-            _f for _f in [page_pattern.match(name) for name in self.filenames] if _f]
-        self.document_codes = {match.group(1): [] for match in document_matches}
+            _f for _f in [page_pattern.match(name) for name in filenames] if _f]
+        document_codes = {match.group(1): [] for match in document_matches}
         for match in page_matches:
-            self.document_codes[match.group(1)].append(match.group(2))
+            document_codes[match.group(1)].append(match.group(2))
+        for page_codes in document_codes.values():
+            page_codes.sort(key=Document.sorter)
+        return document_codes
 
     def __getitem__(self, index):
         """
@@ -0,0 +1,189 @@
+"""
+Single-pass extraction of words and their attributes from ALTO files.
+"""
+
+from array import array
+import sys
+
+from lxml import etree
+
+ALTO_TAGS = ("Page", "TextBlock", "TextLine", "String")
+"""
+ALTO elements read by parse_alto, in no namespace, as matched by
+XPath queries such as //String/@CONTENT
+"""
+NAMESPACED_ALTO_TAGS = tuple("{*}" + tag for tag in ALTO_TAGS)
+""" ALTO elements read by parse_alto, in any namespace """
+ELEMENT_NBYTES = 1700
+"""
+Approximate memory held by each element of a parsed ALTO tree,
+including its attributes and whitespace, as measured with lxml
+"""
+
+
+class AltoColumns(object):
+    """
+    Words in an ALTO page and their attributes, held in aligned
+    columns with one entry per String element with CONTENT, in
+    document order.
+
+    Numeric attributes (WC, HPOS, VPOS, WIDTH, HEIGHT) are held in
+    arrays of floats, with NaN for missing or invalid values. CC, which
+    holds one confidence digit per character, and TextLine and
+    TextBlock IDs are held in lists, with None for missing values.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.page = {}
+        self.words = []
+        self.wc = array("d")
+        self.cc = []
+        self.hpos = array("d")
+        self.vpos = array("d")
+        self.width = array("d")
+        self.height = array("d")
+        self.line_ids = []
+        self.block_ids = []
+
+    def __len__(self):
+        """
+        Gets number of words.
+
+        :return: number of words
+        :rtype: int
+        """
+        return len(self.words)
+
+    @property
+    def nbytes(self):
+        """
+        Gets approximate memory held by the columns.
+
+        :return: number of bytes
+        :rtype: int
+        """
+        nbytes = sum(sys.getsizeof(word) for word in self.words)
+        nbytes += sum(sys.getsizeof(cc) for cc in self.cc if cc is not None)
+        for column in [self.wc, self.hpos, self.vpos, self.width,
+                       self.height]:
+            nbytes += column.itemsize * len(column)
+        # One reference per entry in each of the lists.
+        return nbytes + 4 * 8 * len(self.words)
+
+    def add_string(self, string, line_id, block_id):
+        """
+        Adds a String element's content and attributes, unless it has
+        no content.
+
+        :param string: String element
+        :type string: lxml.etree._Element
+        :param line_id: ID of TextLine holding the String
+        :type line_id: str or unicode
+        :param block_id: ID of TextBlock holding the String
+        :type block_id: str or unicode
+        """
+        get = string.get
+        content = get("CONTENT")
+        if content is None:
+            return
+        self.words.append(str(content))
+        self.wc.append(to_float(get("WC")))
+        self.cc.append(get("CC"))
+        self.hpos.append(to_float(get("HPOS")))
+        self.vpos.append(to_float(get("VPOS")))
+        self.width.append(to_float(get("WIDTH")))
+        self.height.append(to_float(get("HEIGHT")))
+        self.line_ids.append(line_id)
+        self.block_ids.append(block_id)
+
+
+def to_float(value):
+    """
+    Converts attribute value to float.
+
+    :param value: value
+    :type value: str or unicode
+    :return: value as float, or NaN if value is None or invalid
+    :rtype: float
+    """
+    if value is None:
+        return float("nan")
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+def parse_alto(source, keep_tree=False, tags=ALTO_TAGS):
+    """
+    Parses an ALTO file in a single pass, collecting the attributes of
+    its Page element and the content and attributes of its String
+    elements.
+
+    Unless keep_tree is True, each TextBlock, and any other elements,
+    are discarded once read, so the whole tree is never held in
+    memory.
+
+    :param source: file name or stream
+    :type source: str or unicode or file-like object
+    :param keep_tree: if True, keep the tree and return its root
+    :type keep_tree: bool
+    :param tags: Page, TextBlock, TextLine and String tags, either
+    ALTO_TAGS or NAMESPACED_ALTO_TAGS
+    :type tags: tuple(str or unicode)
+    :return: columns and root element, or None if keep_tree is False
+    :rtype: tuple(defoe.alto_utils.AltoColumns, lxml.etree._Element)
+    """
+    columns = AltoColumns()
+    line_id = None
+    block_id = None
+    # Attributes are complete on "start" events, so "end" events, which
+    # would double the number of events, are not needed.
+    context = etree.iterparse(source, events=("start",), tag=tags)
+    for _, element in context:
+        tag = element.tag.rpartition("}")[2]
+        if tag == "String":
+            columns.add_string(element, line_id, block_id)
+        elif tag == "TextLine":
+            line_id = element.get("ID")
+        elif tag == "TextBlock":
+            block_id = element.get("ID")
+            if not keep_tree:
+                discard_preceding(element)
+        elif tag == "Page":
+            columns.page = dict(element.attrib)
+    if keep_tree:
+        return columns, context.root
+    return columns, None
+
+
+def tree_nbytes(tree):
+    """
+    Gets approximate memory held by a parsed ALTO tree.
+
+    :param tree: tree or its root element
+    :type tree: lxml.etree._ElementTree or lxml.etree._Element
+    :return: number of bytes
+    :rtype: int
+    """
+    return ELEMENT_NBYTES * sum(1 for _ in tree.iter())
+
+
+def discard_preceding(element):
+    """
+    Removes all elements that precede an element, other than its
+    ancestors, from the tree. These are the elements whose parsing is
+    complete when the element's start tag is parsed.
+
+    :param element: element
+    :type element: lxml.etree._Element
+    """
+    parent = element.getparent()
+    while parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+        element = parent
+        parent = element.getparent()
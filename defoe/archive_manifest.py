@@ -0,0 +1,264 @@
+"""
+Manifests of archives, listing their members and documents, so that
+archives can be opened without listing and pattern-matching their
+members each time.
+
+A manifest is held in a JSON file next to its archive, named
+<ARCHIVE>.manifest.json, or, if the DEFOE_MANIFEST_DIR environment
+variable is set, in that directory, named by a hash of the archive's
+absolute path. A manifest is only used if the modification times and
+sizes of the archive, and any directories within it, are those
+recorded in the manifest.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+MANIFEST_VERSION = 2
+""" Manifest format version """
+MANIFEST_SUFFIX = ".manifest.json"
+""" Suffix of manifest file names """
+MANIFEST_DIR_ENV = "DEFOE_MANIFEST_DIR"
+""" Environment variable giving directory of manifests """
+
+
+def manifest_path(filename):
+    """
+    Gets path to manifest of an archive.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :return: manifest path
+    :rtype: str or unicode
+    """
+    filename = os.path.abspath(filename)
+    directory = os.environ.get(MANIFEST_DIR_ENV)
+    if directory:
+        name = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+        return os.path.join(directory, name + MANIFEST_SUFFIX)
+    return filename + MANIFEST_SUFFIX
+
+
+def archive_stat(filename, directories=()):
+    """
+    Gets modification times and sizes of an archive and directories
+    within it.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :param directories: directories, relative to archive directory
+    :type directories: list(str or unicode)
+    :return: modification time in ns and size, keyed by directory,
+    with "" for the archive, or None if any could not be found, as for
+    URLs
+    :rtype: dict(str or unicode, list(int))
+    """
+    stats = {}
+    for directory in [""] + list(directories):
+        path = os.path.join(filename, directory) if directory else filename
+        try:
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        stats[directory] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def zip_members(zip_file):
+    """
+    Gets members of ZIP file.
+
+    :param zip_file: ZIP file
+    :type zip_file: zipfile.ZipFile
+    :return: member names, and offset of local header, compressed size
+    and size keyed by member name
+    :rtype: tuple(list(str or unicode), dict(str or unicode, list(int)))
+    """
+    infos = zip_file.infolist()
+    members = {info.filename:
+               [info.header_offset, info.compress_size, info.file_size]
+               for info in infos}
+    return [info.filename for info in infos], members
+
+
+def directory_members(directory, recurse=False):
+    """
+    Gets members of a directory. If recurse is True then the members of
+    its subdirectories, but not their subdirectories, are included, as
+    <SUBDIRECTORY>/<NAME>, in place of the subdirectories.
+
+    Directory entries are listed with os.scandir, which, on most file
+    systems, tells files from directories without calling stat on
+    each entry.
+
+    :param directory: directory name
+    :type directory: str or unicode
+    :param recurse: include members of subdirectories
+    :type recurse: bool
+    :return: member names, None, size and size keyed by member name, and
+    subdirectories included
+    :rtype: tuple(list(str or unicode), dict(str or unicode, list(int)),
+    list(str or unicode))
+    """
+    filenames = []
+    members = {}
+    subdirectories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                filenames.append(entry.name)
+                size = entry.stat().st_size
+                members[entry.name] = [None, size, size]
+            elif recurse:
+                subdirectories.append(entry.name)
+                with os.scandir(entry.path) as subentries:
+                    for subentry in subentries:
+                        name = entry.name + "/" + subentry.name
+                        filenames.append(name)
+                        if subentry.is_file():
+                            size = subentry.stat().st_size
+                            members[name] = [None, size, size]
+    return filenames, members, subdirectories
+
+
+def read_manifest(filename, archive_type=None):
+    """
+    Reads manifest of an archive.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :param archive_type: name of class reading the archive, and
+    patterns it uses, which must match those in the manifest. If None
+    then a manifest for any archive type is read
+    :type archive_type: list(str or unicode)
+    :return: manifest, or None if there is no manifest, or it is for
+    another version, archive type or archive modification time or size
+    :rtype: dict
+    """
+    try:
+        with open(manifest_path(filename)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    if archive_type is not None and \
+            manifest.get("archive_type") != list(archive_type):
+        return None
+    stat = manifest.get("stat")
+    if not stat or \
+            archive_stat(filename, [d for d in stat if d]) != stat:
+        return None
+    return manifest
+
+
+def create_manifest(archive_type,
+                    filenames,
+                    members,
+                    document_codes,
+                    stat):
+    """
+    Creates manifest of an archive.
+
+    :param archive_type: name of class reading the archive, and
+    patterns it uses
+    :type archive_type: list(str or unicode)
+    :param filenames: member names
+    :type filenames: list(str or unicode)
+    :param members: offset, compressed size and size keyed by member
+    name
+    :type members: dict(str or unicode, list(int))
+    :param document_codes: sorted page codes keyed by document code
+    :type document_codes: dict(str or unicode, list(str or unicode))
+    :param stat: modification time and size of archive, and any
+    directories within it, as returned by archive_stat, or None if
+    these are unknown, in which case the manifest is never valid
+    :type stat: dict(str or unicode, list(int))
+    :return: manifest
+    :rtype: dict
+    """
+    return {"version": MANIFEST_VERSION,
+            "archive_type": list(archive_type),
+            "stat": stat,
+            "filenames": filenames,
+            "members": members,
+            "document_codes": document_codes}
+
+
+def write_manifest(filename, manifest):
+    """
+    Writes manifest of an archive. The manifest is written to a
+    temporary file which then replaces any existing manifest, so
+    readers never see a partial manifest.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :param manifest: manifest
+    :type manifest: dict
+    :return: manifest path
+    :rtype: str or unicode
+    """
+    path = manifest_path(filename)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return path
+
+
+def get_archive_type(archive):
+    """
+    Gets name of class reading an archive, and patterns it uses to
+    find documents and pages, which together determine the document
+    codes listed in a manifest.
+
+    :param archive: archive
+    :type archive: defoe.alto.archive.AltoArchive or
+    defoe.nls.archive_combine.AltoArchive or
+    defoe.fmp.archive_combine.AltoArchive
+    :return: class name and patterns
+    :rtype: list(str or unicode)
+    """
+    archive_class = type(archive)
+    return [archive_class.__module__ + "." + archive_class.__name__,
+            archive.get_document_pattern(),
+            archive.get_page_pattern()]
+
+
+def get_manifest(archive):
+    """
+    Gets manifest of an archive, reading it if there is a valid
+    manifest, or creating it otherwise. Manifests are created by
+    listing the archive's members, with its list_members method, and
+    finding their document codes, with its find_document_codes method.
+
+    :param archive: archive
+    :type archive: defoe.alto.archive.AltoArchive or
+    defoe.nls.archive_combine.AltoArchive or
+    defoe.fmp.archive_combine.AltoArchive
+    :return: manifest
+    :rtype: dict
+    """
+    archive_type = get_archive_type(archive)
+    manifest = read_manifest(archive.filename, archive_type)
+    if manifest is not None:
+        return manifest
+    before = archive_stat(archive.filename)
+    filenames, members, directories = archive.list_members()
+    stat = archive_stat(archive.filename, directories)
+    if before is None or stat is None or before[""] != stat[""]:
+        # Archive is not local, or changed while being listed, so the
+        # manifest cannot be validated.
+        stat = None
+    return create_manifest(archive_type,
+                           filenames,
+                           members,
+                           archive.find_document_codes(filenames),
+                           stat)
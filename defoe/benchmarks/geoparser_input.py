@@ -0,0 +1,78 @@
+"""
+Benchmark preparing geoparser input with the geoparser's prepare-plain
+script against defoe.query_utils.geoparser_document.
+
+    usage: python -m defoe.benchmarks.geoparser_input [-n NUM_PAGES ...]
+                                                      [-r REPEAT]
+
+Run from the directory holding geoparser-v1.1. Pages are the words of
+the ALTO test fixture page.
+"""
+
+from argparse import ArgumentParser
+import subprocess
+import timeit
+
+from defoe.alto.page import Page
+from defoe.file_utils import get_path
+from defoe.query_utils import geoparser_document
+from defoe.test.alto import fixtures
+
+PREPARE_PLAIN_CMD = ["./geoparser-v1.1/scripts/prepare-plain"]
+
+
+def prepare_plain(texts):
+    """
+    Prepare geoparser input by running prepare-plain, as the
+    geoparser's run script does with "-t plain".
+
+    :param texts: texts
+    :type texts: list(str or unicode)
+    :return: XML
+    :rtype: str or unicode
+    """
+    proc = subprocess.run(PREPARE_PLAIN_CMD,
+                          input=("\n\n".join(texts) + "\n").encode("utf-8"),
+                          stdout=subprocess.PIPE,
+                          check=True)
+    return proc.stdout.decode("utf-8")
+
+
+def main():
+    """
+    Run benchmark and print time per page for each number of pages.
+    """
+    parser = ArgumentParser(description="Benchmark geoparser input")
+    parser.add_argument("-n",
+                        "--num_pages",
+                        nargs="+",
+                        type=int,
+                        default=[1, 10, 100],
+                        help="Number of pages per document")
+    parser.add_argument("-r",
+                        "--repeat",
+                        type=int,
+                        default=5,
+                        help="Number of runs per measurement")
+    args = parser.parse_args()
+
+    source = get_path(fixtures, "000000037_000005.xml")
+    text = " ".join(Page(None, None, source).words)
+    print("{:>8} {:>20} {:>20} {:>8}".format(
+        "pages", "prepare-plain (ms)", "document (ms)", "speedup"))
+    for num_pages in args.num_pages:
+        texts = [text] * num_pages
+        assert prepare_plain(texts) == geoparser_document(texts)
+        before_ms = min(timeit.repeat(lambda: prepare_plain(texts),
+                                      number=1,
+                                      repeat=args.repeat)) * 1000
+        after_ms = min(timeit.repeat(lambda: geoparser_document(texts),
+                                     number=1,
+                                     repeat=args.repeat)) * 1000
+        print("{:>8} {:>20.3f} {:>20.3f} {:>7.1f}x".format(
+            num_pages, before_ms / num_pages, after_ms / num_pages,
+            before_ms / after_ms))
+
+
+if __name__ == "__main__":
+    main()
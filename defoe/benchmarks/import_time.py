@@ -0,0 +1,145 @@
+"""
+Benchmark the time taken to import defoe modules, and report which
+heavy dependencies each import loads.
+
+    usage: python -m defoe.benchmarks.import_time [-m MODULE ...]
+                                                  [-r REPEAT]
+                                                  [-s [NUM_PARTITIONS]]
+
+Each module is imported in a new Python process, as it would be by
+run_query.py on the driver or by a new Python worker. With -s, the
+modules are also imported on Spark workers, one task per partition,
+and the time and loaded dependencies are reported per worker process.
+Workers reused by Spark report the import time of their first task
+only.
+"""
+
+from argparse import ArgumentParser
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["spacy", "nltk", "numpy", "pyspark", "PIL"]
+""" Dependencies whose import time dominates starting a worker """
+
+DEFAULT_MODULES = ["defoe.run_query",
+                   "defoe.query_utils",
+                   "defoe.nls.setup",
+                   "defoe.nls.query_utils",
+                   "defoe.nls.queries.total_words",
+                   "defoe.nls.queries.keyword_by_year",
+                   "defoe.papers.query_utils",
+                   "defoe.alto.query_utils"]
+
+COLD_IMPORT_CODE = """
+import sys, time
+start = time.perf_counter()
+import {}
+print((time.perf_counter() - start) * 1000)
+print(" ".join(m for m in {!r} if m in sys.modules))
+"""
+
+
+def probe(modules):
+    """
+    Import modules in this process and report time taken and heavy
+    dependencies loaded.
+
+    :param modules: module names
+    :type modules: list(str or unicode)
+    :return: process id, time in ms to import each module, or error
+    message, and heavy dependencies loaded
+    :rtype: dict
+    """
+    imports = []
+    for module in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+            imports.append((module, (time.perf_counter() - start) * 1000))
+        except ImportError as exception:
+            imports.append((module, str(exception)))
+    return {"pid": os.getpid(),
+            "imports": imports,
+            "loaded": [m for m in HEAVY_MODULES if m in sys.modules]}
+
+
+def cold_import(module):
+    """
+    Import module in a new Python process.
+
+    :param module: module name
+    :type module: str or unicode
+    :return: time in ms to import module and heavy dependencies
+    loaded, or None and an error message
+    :rtype: tuple(float, str or unicode)
+    """
+    proc = subprocess.run([sys.executable, "-c",
+                           COLD_IMPORT_CODE.format(module, HEAVY_MODULES)],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        return None, proc.stderr.decode("utf-8").strip().split("\n")[-1]
+    import_ms, loaded = proc.stdout.decode("utf-8").split("\n")[:2]
+    return float(import_ms), loaded
+
+
+def main():
+    """
+    Run benchmark and print import time for each module.
+    """
+    parser = ArgumentParser(description="Benchmark defoe import time")
+    parser.add_argument("-m",
+                        "--modules",
+                        nargs="+",
+                        default=DEFAULT_MODULES,
+                        help="Modules to import")
+    parser.add_argument("-r",
+                        "--repeat",
+                        type=int,
+                        default=3,
+                        help="Number of imports per module")
+    parser.add_argument("-s",
+                        "--spark",
+                        nargs="?",
+                        type=int,
+                        const=2,
+                        default=None,
+                        help="Number of partitions to probe Spark workers")
+    args = parser.parse_args()
+
+    print("{:<40} {:>10}  {}".format("module", "cold (ms)", "loads"))
+    for module in args.modules:
+        times = []
+        for _ in range(args.repeat):
+            import_ms, loaded = cold_import(module)
+            if import_ms is None:
+                break
+            times.append(import_ms)
+        if times:
+            print("{:<40} {:>10.1f}  {}".format(module, min(times), loaded))
+        else:
+            print("{:<40} {:>10}  {}".format(module, "-", loaded))
+
+    if args.spark is not None:
+        from pyspark import SparkContext, SparkConf
+        context = SparkContext(conf=SparkConf().setAppName("import_time"))
+        modules = args.modules
+        results = context.parallelize(range(args.spark), args.spark) \
+            .map(lambda _: probe(modules)) \
+            .collect()
+        context.stop()
+        for result in results:
+            print("worker {}: loads {}".format(result["pid"],
+                                               " ".join(result["loaded"])))
+            for module, import_ms in result["imports"]:
+                if isinstance(import_ms, float):
+                    print("  {:<38} {:>10.1f}".format(module, import_ms))
+                else:
+                    print("  {:<38} {:>10}  {}".format(module, "-", import_ms))
+
+
+if __name__ == "__main__":
+    main()
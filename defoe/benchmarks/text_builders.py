@@ -0,0 +1,144 @@
+"""
+Benchmark building page strings by repeated concatenation against
+the token pipeline in defoe.query_utils.
+
+    usage: python -m defoe.benchmarks.text_builders [-n NUM_WORDS ...]
+                                                    [-r REPEAT]
+
+Pages are synthesised by repeating the words of the ALTO test fixture
+page. Words containing 'f' are left out so that the long-s fix, whose
+cost does not depend on how strings are built, is not run.
+"""
+
+from argparse import ArgumentParser
+import timeit
+
+from defoe import query_utils
+from defoe.alto.page import Page
+from defoe.file_utils import get_path
+from defoe.nls.query_utils import clean_page_as_string, get_page_as_string
+from defoe.nls.query_utils import preprocess_clean_page
+from defoe.query_utils import PreprocessWordType
+from defoe.test.alto import fixtures
+
+
+class SyntheticPage(object):
+    """
+    Page holding only a list of words.
+    """
+
+    def __init__(self, words):
+        """
+        Constructor.
+
+        :param words: words
+        :type words: list(str or unicode)
+        """
+        self.words = words
+
+
+def concatenate_page(page, preprocess_type):
+    """
+    Build a page string by repeated concatenation, as
+    get_page_as_string did before using the token pipeline.
+    """
+    page_string = ''
+    for word in page.words:
+        preprocessed_word = query_utils.preprocess_word(word,
+                                                        preprocess_type)
+        if page_string == '':
+            page_string = preprocessed_word
+        else:
+            page_string += (' ' + preprocessed_word)
+    return page_string
+
+
+def concatenate_clean_page(page):
+    """
+    Clean a page by repeated concatenation, as clean_page_as_string
+    did before using the token pipeline (without the long-s fix).
+    """
+    page_string = ''
+    for word in page.words:
+        if page_string == '':
+            page_string = word
+        else:
+            page_string += (' ' + word)
+    page_combined = ''.join(page_string.split('- '))
+    page_string_final = ''
+    for word in page_combined.split():
+        if "." not in word:
+            separated_str = query_utils.CAMEL_CASE_REGEXP.sub(r'\1 ', word)
+        else:
+            separated_str = word
+        if page_string_final == '':
+            page_string_final = separated_str
+        else:
+            page_string_final += (' ' + separated_str)
+    return page_string_final
+
+
+def make_page(num_words):
+    """
+    Synthesise a page from the words of the ALTO test fixture.
+
+    :param num_words: number of words
+    :type num_words: int
+    :return: page
+    :rtype: SyntheticPage
+    """
+    source = get_path(fixtures, '000000037_000005.xml')
+    words = [word for word in Page(None, None, source).words
+             if 'f' not in word]
+    words = (words * (num_words // len(words) + 1))[:num_words]
+    return SyntheticPage(words)
+
+
+def main():
+    """
+    Run benchmark and print time per page for each page size.
+    """
+    parser = ArgumentParser(description="Benchmark page string building")
+    parser.add_argument("-n",
+                        "--num_words",
+                        nargs="+",
+                        type=int,
+                        default=[1000, 10000, 100000],
+                        help="Number of words per page")
+    parser.add_argument("-r",
+                        "--repeat",
+                        type=int,
+                        default=5,
+                        help="Number of runs per measurement")
+    args = parser.parse_args()
+
+    preprocess_type = PreprocessWordType.NORMALIZE
+    print("{:>8} {:<22} {:>12} {:>12} {:>8}".format(
+        "words", "builder", "before (ms)", "after (ms)", "speedup"))
+    for num_words in args.num_words:
+        page = make_page(num_words)
+        clean_page = clean_page_as_string(page)
+        benchmarks = [
+            ("get_page_as_string",
+             lambda: concatenate_page(page, preprocess_type),
+             lambda: get_page_as_string(page, preprocess_type)),
+            ("clean_page_as_string",
+             lambda: concatenate_clean_page(page),
+             lambda: clean_page_as_string(page)),
+            ("preprocess_clean_page",
+             lambda: concatenate_page(SyntheticPage(clean_page.split(' ')),
+                                      preprocess_type),
+             lambda: preprocess_clean_page(clean_page, preprocess_type))
+        ]
+        for name, before, after in benchmarks:
+            assert before() == after()
+            before_ms = min(timeit.repeat(before, number=1,
+                                          repeat=args.repeat)) * 1000
+            after_ms = min(timeit.repeat(after, number=1,
+                                         repeat=args.repeat)) * 1000
+            print("{:>8} {:<22} {:>12.3f} {:>12.3f} {:>7.1f}x".format(
+                num_words, name, before_ms, after_ms, before_ms / after_ms))
+
+
+if __name__ == "__main__":
+    main()
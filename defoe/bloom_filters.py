@@ -0,0 +1,431 @@
+"""
+Bloom filters of the preprocessed words of each page of an archive,
+or each article of a newspaper issue, so that queries can skip pages
+which definitely lack every keyword without preprocessing their
+words.
+
+Filters are held in a sidecar JSON file next to their archive, named
+<ARCHIVE>.bloom.json, or, if the DEFOE_BLOOM_DIR environment variable
+is set, in that directory, named by a hash of the archive's absolute
+path. As for manifests (see defoe.archive_manifest), a sidecar is
+only used if the modification time and size of the archive are those
+recorded in the sidecar. Sidecars are built by
+defoe.build_bloom_filters.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import tempfile
+
+from defoe import query_utils
+from defoe.archive_manifest import archive_stat
+
+BLOOM_VERSION = 1
+""" Sidecar format version """
+BLOOM_SUFFIX = ".bloom.json"
+""" Suffix of sidecar file names """
+BLOOM_DIR_ENV = "DEFOE_BLOOM_DIR"
+""" Environment variable giving directory of sidecars """
+FALSE_POSITIVE_RATE = 0.01
+""" Default false positive rate of filters """
+PREPROCESS_TYPES = [query_utils.PreprocessWordType.NORMALIZE,
+                    query_utils.PreprocessWordType.LEMMATIZE,
+                    query_utils.PreprocessWordType.STEM]
+""" Default types of preprocessing of words held in filters """
+SIDECAR_CACHE_SIZE = 16
+""" Maximum number of sidecars held by a process """
+
+_SIDECARS = {}
+
+
+class BloomFilter(object):
+    """
+    Bloom filter of words, using double hashing of a BLAKE2 digest of
+    each word, so that filters give the same answers in every
+    process.
+    """
+
+    def __init__(self, num_bits, num_hashes, bits=None):
+        """
+        Constructor.
+
+        :param num_bits: number of bits
+        :type num_bits: int
+        :param num_hashes: number of bits set for each word
+        :type num_hashes: int
+        :param bits: bits, or None for an empty filter
+        :type bits: bytearray
+        """
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        if bits is None:
+            bits = bytearray((num_bits + 7) // 8)
+        self.bits = bits
+
+    @classmethod
+    def from_words(cls, words, false_positive_rate=FALSE_POSITIVE_RATE):
+        """
+        Creates a filter holding words, sized so that the chance that
+        it holds any other word is false_positive_rate.
+
+        :param words: words
+        :type words: iterable(str or unicode)
+        :param false_positive_rate: false positive rate
+        :type false_positive_rate: float
+        :return: filter
+        :rtype: defoe.bloom_filters.BloomFilter
+        """
+        words = set(words)
+        bloom_filter = cls(*filter_size(len(words), false_positive_rate))
+        for word in words:
+            bloom_filter.add(word)
+        return bloom_filter
+
+    def indices(self, word):
+        """
+        Gets indices of bits set for a word.
+
+        :param word: word
+        :type word: str or unicode
+        :return: bit indices
+        :rtype: list(int)
+        """
+        digest = hashlib.blake2b(word.encode("utf-8"),
+                                 digest_size=16).digest()
+        hash1 = int.from_bytes(digest[:8], "little")
+        hash2 = int.from_bytes(digest[8:], "little") | 1
+        return [(hash1 + i * hash2) % self.num_bits
+                for i in range(self.num_hashes)]
+
+    def add(self, word):
+        """
+        Adds a word.
+
+        :param word: word
+        :type word: str or unicode
+        """
+        for index in self.indices(word):
+            self.bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, word):
+        """
+        Checks whether the filter may hold a word.
+
+        :param word: word
+        :type word: str or unicode
+        :return: False if the word was definitely not added
+        :rtype: bool
+        """
+        bits = self.bits
+        return all(bits[index >> 3] & (1 << (index & 7))
+                   for index in self.indices(word))
+
+    def false_positive_rate(self):
+        """
+        Estimates the false positive rate, from the fraction of bits
+        set.
+
+        :return: false positive rate
+        :rtype: float
+        """
+        num_set = sum(bin(byte).count("1") for byte in self.bits)
+        return (num_set / self.num_bits) ** self.num_hashes
+
+    def to_list(self):
+        """
+        Gets filter as a list, for JSON.
+
+        :return: number of bits, number of hashes and base64-encoded
+        bits
+        :rtype: list
+        """
+        return [self.num_bits,
+                self.num_hashes,
+                base64.b64encode(bytes(self.bits)).decode("ascii")]
+
+    @classmethod
+    def from_list(cls, values):
+        """
+        Creates a filter from a list, as returned by to_list.
+
+        :param values: number of bits, number of hashes and
+        base64-encoded bits
+        :type values: list
+        :return: filter
+        :rtype: defoe.bloom_filters.BloomFilter
+        """
+        num_bits, num_hashes, bits = values
+        return cls(num_bits, num_hashes,
+                   bytearray(base64.b64decode(bits)))
+
+
+def filter_size(num_words, false_positive_rate):
+    """
+    Gets the number of bits, and bits set per word, of a filter
+    holding num_words words with the given false positive rate.
+
+    :param num_words: number of words
+    :type num_words: int
+    :param false_positive_rate: false positive rate
+    :type false_positive_rate: float
+    :return: number of bits and number of hashes
+    :rtype: tuple(int, int)
+    """
+    num_words = max(num_words, 1)
+    num_bits = int(math.ceil(-num_words * math.log(false_positive_rate) /
+                             (math.log(2) ** 2)))
+    num_bits = max(num_bits, 8)
+    num_hashes = max(int(round(num_bits / num_words * math.log(2))), 1)
+    return num_bits, num_hashes
+
+
+def sidecar_path(filename):
+    """
+    Gets path to sidecar of an archive.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :return: sidecar path
+    :rtype: str or unicode
+    """
+    filename = os.path.abspath(filename)
+    directory = os.environ.get(BLOOM_DIR_ENV)
+    if directory:
+        name = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+        return os.path.join(directory, name + BLOOM_SUFFIX)
+    return filename + BLOOM_SUFFIX
+
+
+def create_sidecar(units,
+                   stat,
+                   preprocess_types=PREPROCESS_TYPES,
+                   false_positive_rate=FALSE_POSITIVE_RATE):
+    """
+    Creates sidecar holding a filter of the words of each page or
+    article, as preprocessed in each way.
+
+    :param units: code and words of each page or article, as returned
+    by archive_units or issue_units
+    :type units: iterable(tuple(str or unicode, list(str or unicode)))
+    :param stat: modification time and size of archive, as returned
+    by defoe.archive_manifest.archive_stat
+    :type stat: dict(str or unicode, list(int))
+    :param preprocess_types: how words should be preprocessed
+    :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+    :param false_positive_rate: false positive rate
+    :type false_positive_rate: float
+    :return: sidecar
+    :rtype: dict
+    """
+    # Pages or articles sharing a code, as articles with no ID do,
+    # share a filter.
+    unit_words = {}
+    for code, words in units:
+        unit_words.setdefault(code, []).extend(words)
+    filters = {preprocess_type.name.lower(): {}
+               for preprocess_type in preprocess_types}
+    for code, words in unit_words.items():
+        for preprocess_type in preprocess_types:
+            bloom_filter = BloomFilter.from_words(
+                query_utils.preprocess_words(words, preprocess_type),
+                false_positive_rate)
+            filters[preprocess_type.name.lower()][code] = \
+                bloom_filter.to_list()
+    return {"version": BLOOM_VERSION,
+            "stat": stat,
+            "false_positive_rate": false_positive_rate,
+            "filters": filters}
+
+
+def write_sidecar(filename, sidecar):
+    """
+    Writes sidecar of an archive. The sidecar is written to a
+    temporary file which then replaces any existing sidecar, so
+    readers never see a partial sidecar.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :param sidecar: sidecar
+    :type sidecar: dict
+    :return: sidecar path
+    :rtype: str or unicode
+    """
+    path = sidecar_path(filename)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(sidecar, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return path
+
+
+def read_sidecar(filename):
+    """
+    Reads sidecar of an archive.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :return: sidecar, or None if there is no sidecar, or it is for
+    another version or archive modification time or size
+    :rtype: dict
+    """
+    try:
+        with open(sidecar_path(filename)) as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if sidecar.get("version") != BLOOM_VERSION:
+        return None
+    stat = sidecar.get("stat")
+    if not stat or archive_stat(filename) != stat:
+        return None
+    return sidecar
+
+
+def sidecar_false_positive_rate(sidecar):
+    """
+    Estimates the mean false positive rate of a sidecar's filters.
+
+    :param sidecar: sidecar
+    :type sidecar: dict
+    :return: false positive rate, or None if there are no filters
+    :rtype: float
+    """
+    rates = [BloomFilter.from_list(values).false_positive_rate()
+             for filters in sidecar["filters"].values()
+             for values in filters.values()]
+    if not rates:
+        return None
+    return sum(rates) / len(rates)
+
+
+def get_sidecar(filename):
+    """
+    Gets sidecar of an archive, reading it on first use. Sidecars are
+    shared by all calls within a process, which holds those of the
+    last SIDECAR_CACHE_SIZE archives read.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :return: sidecar, or None if there is no valid sidecar
+    :rtype: dict
+    """
+    if filename not in _SIDECARS:
+        if len(_SIDECARS) >= SIDECAR_CACHE_SIZE:
+            del _SIDECARS[next(iter(_SIDECARS))]
+        _SIDECARS[filename] = read_sidecar(filename)
+    return _SIDECARS[filename]
+
+
+def get_filter(filename, code, preprocess_type):
+    """
+    Gets filter of the words of a page or article.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :param code: page or article code
+    :type code: str or unicode
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :return: filter, or None if there is none
+    :rtype: defoe.bloom_filters.BloomFilter
+    """
+    sidecar = get_sidecar(filename)
+    if sidecar is None:
+        return None
+    filters = sidecar["filters"].get(preprocess_type.name.lower())
+    if filters is None or code not in filters:
+        return None
+    bloom_filter = filters[code]
+    if not isinstance(bloom_filter, BloomFilter):
+        bloom_filter = BloomFilter.from_list(bloom_filter)
+        filters[code] = bloom_filter
+    return bloom_filter
+
+
+def might_contain(filename, code, keywords, preprocess_type):
+    """
+    Checks whether a page or article may hold any keyword, or
+    keysentence, that is all the words of any keysentence.
+
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :param code: page or article code
+    :type code: str or unicode
+    :param keywords: keywords or keysentences, preprocessed
+    :type keywords: list(str or unicode)
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :return: False if the page or article definitely lacks every
+    keyword, True otherwise, including if it has no filter
+    :rtype: bool
+    """
+    bloom_filter = get_filter(filename, code, preprocess_type)
+    if bloom_filter is None:
+        return True
+    return any(all(word in bloom_filter for word in keyword.split())
+               for keyword in keywords)
+
+
+def candidate_pages(document, keywords, preprocess_type):
+    """
+    Iterate over pages of a document which may hold any keyword,
+    reading only those pages. If the document has no archive, or its
+    archive has no valid sidecar, then all pages are read.
+
+    :param document: document
+    :type document: defoe.alto.document.Document or
+    defoe.nls.document.Document
+    :param keywords: keywords or keysentences, preprocessed
+    :type keywords: list(str or unicode)
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :return: page
+    :rtype: defoe.alto.page.Page or defoe.nls.page.Page
+    """
+    archive = getattr(document, "archive", None)
+    # Records of documents, from defoe.page_records, hold their pages.
+    if archive is None or not hasattr(document, "page_codes") or \
+            get_sidecar(archive.filename) is None:
+        for page in document:
+            yield page
+        return
+    filename = archive.filename
+    for page_code in document.page_codes:
+        if might_contain(filename, page_code, keywords, preprocess_type):
+            yield document.page(page_code)
+
+
+def archive_units(archive):
+    """
+    Gets code and words of each page of an archive.
+
+    :param archive: archive
+    :type archive: defoe.alto.archive.Archive or
+    defoe.nls.archive.Archive
+    :return: page code and words
+    :rtype: iterator(tuple(str or unicode, list(str or unicode)))
+    """
+    for document in archive:
+        for page in document:
+            yield page.code, page.words
+
+
+def issue_units(issue):
+    """
+    Gets code and words of each article of a newspaper issue.
+
+    :param issue: issue
+    :type issue: defoe.papers.issue.Issue
+    :return: article code and words
+    :rtype: iterator(tuple(str or unicode, list(str or unicode)))
+    """
+    for article in issue:
+        yield article.article_id, article.words
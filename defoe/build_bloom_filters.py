@@ -0,0 +1,165 @@
+"""
+Build Bloom filter sidecars of archives, holding a filter of the
+preprocessed words of each page, or each article of a newspaper
+issue, so that queries can skip pages which definitely lack every
+keyword. See defoe.bloom_filters.
+
+    usage: build_bloom_filters.py [-h] [-n [NUM_PROCESSES]]
+                                  [-r [FALSE_POSITIVE_RATE]]
+                                  [-p [PREPROCESS]]
+                                  data_file model_name
+
+    Build Bloom filter sidecars
+
+    positional arguments:
+      data_file             Data file listing archives
+      model_name            Data model to which archives conform:
+      ['books', 'fmp', 'nls', 'nlsArticles', 'papers']
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -n [NUM_PROCESSES], --num_processes [NUM_PROCESSES]
+                            Number of processes
+      -r [FALSE_POSITIVE_RATE], --false_positive_rate [FALSE_POSITIVE_RATE]
+                            False positive rate of filters
+      -p [PREPROCESS], --preprocess [PREPROCESS]
+                            Comma-separated word preprocessing types
+
+Archives are read in parallel. Sidecars which are still valid, and
+were built with the same false positive rate and preprocessing types,
+are left as they are. Archives given as URLs have no sidecars. The
+false positive rate of the filters written, as estimated from the
+bits they set, is reported.
+"""
+
+from argparse import ArgumentParser
+from functools import partial
+import importlib
+from multiprocessing import Pool
+
+from defoe import query_utils
+from defoe.archive_manifest import archive_stat
+from defoe.bloom_filters import FALSE_POSITIVE_RATE, PREPROCESS_TYPES, \
+    archive_units, create_sidecar, issue_units, read_sidecar, \
+    sidecar_false_positive_rate, write_sidecar
+
+MODELS = ["books", "fmp", "nls", "nlsArticles", "papers"]
+""" Models whose archives have sidecars """
+
+
+def build_sidecar(model_name, preprocess_types, false_positive_rate,
+                  filename):
+    """
+    Build sidecar of an archive, if it has no valid sidecar with the
+    same false positive rate and preprocessing types.
+
+    :param model_name: data model to which archive conforms
+    :type model_name: str or unicode
+    :param preprocess_types: how words should be preprocessed
+    :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+    :param false_positive_rate: false positive rate
+    :type false_positive_rate: float
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :return: filename, sidecar path, None if the sidecar was valid, or
+    error message, and estimated false positive rate of filters
+    written
+    :rtype: tuple(str or unicode, str or unicode, float)
+    """
+    setup = importlib.import_module("defoe." + model_name + ".setup")
+    type_names = sorted(preprocess_type.name.lower()
+                        for preprocess_type in preprocess_types)
+    try:
+        sidecar = read_sidecar(filename)
+        if sidecar is not None and \
+                sidecar["false_positive_rate"] == false_positive_rate and \
+                sorted(sidecar["filters"]) == type_names:
+            return filename, None, None
+        before = archive_stat(filename)
+        archive, error = setup.filename_to_object(filename)
+        if error is not None:
+            return filename, "err: " + error, None
+        if model_name == "papers":
+            units = issue_units(archive)
+        else:
+            units = archive_units(archive)
+        sidecar = create_sidecar(units,
+                                 before,
+                                 preprocess_types,
+                                 false_positive_rate)
+        if before is None or archive_stat(filename) != before:
+            return filename, "err: archive is not local or was changed", None
+        return (filename,
+                write_sidecar(filename, sidecar),
+                sidecar_false_positive_rate(sidecar))
+    except Exception as exception:
+        return filename, "err: " + str(exception), None
+
+
+def main():
+    """
+    Build Bloom filter sidecars of archives.
+    """
+    parser = ArgumentParser(description="Build Bloom filter sidecars")
+    parser.add_argument("data_file",
+                        help="Data file listing archives")
+    parser.add_argument("model_name",
+                        help="Data model to which archives conform: " +
+                        str(MODELS))
+    parser.add_argument("-n",
+                        "--num_processes",
+                        nargs="?",
+                        type=int,
+                        default=1,
+                        help="Number of processes")
+    parser.add_argument("-r",
+                        "--false_positive_rate",
+                        nargs="?",
+                        type=float,
+                        default=FALSE_POSITIVE_RATE,
+                        help="False positive rate of filters")
+    parser.add_argument("-p",
+                        "--preprocess",
+                        nargs="?",
+                        default=",".join(preprocess_type.name.lower()
+                                         for preprocess_type
+                                         in PREPROCESS_TYPES),
+                        help="Comma-separated word preprocessing types")
+    args = parser.parse_args()
+    assert args.model_name in MODELS, ("'model' must be one of " +
+                                       str(MODELS))
+    assert 0 < args.false_positive_rate < 1, \
+        "'false_positive_rate' must be between 0 and 1"
+    preprocess_types = [query_utils.parse_preprocess_word_type(name.strip())
+                        for name in args.preprocess.split(",")]
+
+    with open(args.data_file) as f:
+        filenames = [filename.strip() for filename in f if filename.strip()]
+    num_valid = 0
+    num_errors = 0
+    rates = []
+    with Pool(args.num_processes) as pool:
+        for filename, result, rate in pool.imap_unordered(
+                partial(build_sidecar,
+                        args.model_name,
+                        preprocess_types,
+                        args.false_positive_rate),
+                filenames):
+            if result is None:
+                num_valid += 1
+            elif result.startswith("err:"):
+                num_errors += 1
+                print("{}: {}".format(filename, result))
+            else:
+                if rate is not None:
+                    rates.append(rate)
+                print("{}: {}".format(filename, result))
+    print("{} sidecars written, {} valid, {} errors".format(
+        len(filenames) - num_valid - num_errors, num_valid, num_errors))
+    if rates:
+        print("False positive rate: {:.4g} configured, {:.4g} estimated".
+              format(args.false_positive_rate, sum(rates) / len(rates)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Build manifests of archives, listing their members and documents, so
+that queries can open the archives without listing them. See
+defoe.archive_manifest.
+
+    usage: build_manifests.py [-h] [-n [NUM_PROCESSES]]
+                              data_file model_name
+
+    Build archive manifests
+
+    positional arguments:
+      data_file             Data file listing archives
+      model_name            Data model to which archives conform:
+      ['books', 'fmp', 'nls', 'nlsArticles']
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -n [NUM_PROCESSES], --num_processes [NUM_PROCESSES]
+                            Number of processes
+
+Archives are listed in parallel. Manifests which are still valid are
+left as they are. Archives given as URLs have no manifests.
+"""
+
+from argparse import ArgumentParser
+from functools import partial
+import importlib
+from multiprocessing import Pool
+
+from defoe.archive_manifest import get_archive_type, read_manifest, \
+    write_manifest
+
+MODELS = ["books", "fmp", "nls", "nlsArticles"]
+""" Models whose archives have manifests """
+
+
+def build_manifest(model_name, filename):
+    """
+    Build manifest of an archive, if it has no valid manifest.
+
+    :param model_name: data model to which archive conforms
+    :type model_name: str or unicode
+    :param filename: archive file or directory name
+    :type filename: str or unicode
+    :return: filename, and manifest path, None if the manifest was
+    valid, or error message
+    :rtype: tuple(str or unicode, str or unicode)
+    """
+    archive_module = importlib.import_module(
+        "defoe." + model_name + ".archive")
+    try:
+        archive = archive_module.Archive(filename)
+        if read_manifest(filename, get_archive_type(archive)) is not None:
+            return filename, None
+        if archive.manifest["stat"] is None:
+            return filename, "err: archive is not local or was changed"
+        return filename, write_manifest(filename, archive.manifest)
+    except Exception as exception:
+        return filename, "err: " + str(exception)
+
+
+def main():
+    """
+    Build manifests of archives.
+    """
+    parser = ArgumentParser(description="Build archive manifests")
+    parser.add_argument("data_file",
+                        help="Data file listing archives")
+    parser.add_argument("model_name",
+                        help="Data model to which archives conform: " +
+                        str(MODELS))
+    parser.add_argument("-n",
+                        "--num_processes",
+                        nargs="?",
+                        type=int,
+                        default=1,
+                        help="Number of processes")
+    args = parser.parse_args()
+    assert args.model_name in MODELS, ("'model' must be one of " +
+                                       str(MODELS))
+
+    with open(args.data_file) as f:
+        filenames = [filename.strip() for filename in f if filename.strip()]
+    num_valid = 0
+    num_errors = 0
+    with Pool(args.num_processes) as pool:
+        for filename, result in pool.imap_unordered(
+                partial(build_manifest, args.model_name), filenames):
+            if result is None:
+                num_valid += 1
+            elif result.startswith("err:"):
+                num_errors += 1
+                print("{}: {}".format(filename, result))
+            else:
+                print("{}: {}".format(filename, result))
+    print("{} manifests written, {} valid, {} errors".format(
+        len(filenames) - num_valid - num_errors, num_valid, num_errors))
+
+
+if __name__ == "__main__":
+    main()
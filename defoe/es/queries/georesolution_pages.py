@@ -5,7 +5,7 @@ Identify the locations per page and geo-resolve them.
 from operator import add
 from defoe import query_utils
 from defoe.hdfs.query_utils import get_sentences_list_matches, blank_as_null
-from defoe.nls.query_utils import georesolve_page_2
+from defoe.nls.query_utils import georesolve_page
 from pyspark.sql import SQLContext
 from pyspark.sql.functions import col, when
 
@@ -42,7 +42,9 @@ def do_query(df, config_file=None, logger=None, context=None):
     newdf=fdf.filter(fdf.source_text_clean.isNotNull()).filter(fdf["model"]=="nls").filter(df["year"]=="1828").select(fdf.year, fdf.title, fdf.edition, fdf.archive_filename, fdf.source_text_filename, fdf.text_unit_id, fdf.source_text_clean)
 
     pages=newdf.rdd.map(tuple)
-    matching_pages = pages.map(
+    spacy_pages = pages.mapPartitions(
+        lambda geo_pages: query_utils.spacy_nlp_pages(geo_pages, 6, lang_model))
+    matching_pages = spacy_pages.map(
         lambda geo_page:
         (geo_page[0],
          {"title": geo_page[1],
@@ -51,7 +53,7 @@ def do_query(df, config_file=None, logger=None, context=None):
           "page_filename": geo_page[4],
           "text_unit id": geo_page[5],
           "lang_model": lang_model, 
-          "georesolution_page": georesolve_page_2(geo_page[6],lang_model)}))
+          "georesolution_page": georesolve_page(geo_page[7])}))
     
     result = matching_pages \
         .groupByKey() \
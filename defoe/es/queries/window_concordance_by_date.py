@@ -30,6 +30,10 @@ def do_query(df, config_file=None, logger=None, context=None):
     Both keywords and words in documents are normalized, by removing
     all non-'a-z|A-Z' characters.
 
+    If the configuration file has "token_ids: True" then each page is
+    held as an array of token IDs, with defoe.token_ids, and keywords
+    and concordances are found with NumPy.
+
     Returns result of form:
           [(year, [(title, edition, archive_filename, filename, word,corcondance),
               (title, edition, archive_filename, filename, word, concordance ), ...]), ...]
@@ -48,10 +52,7 @@ def do_query(df, config_file=None, logger=None, context=None):
     window = 10
     with open(config_file, "r") as f:
         config = yaml.load(f)
-    preprocess_type = query_utils.extract_preprocess_word_type(config)
     preprocess_config = config["preprocess"]
-    data_file = query_utils.extract_data_file(config,
-                                              os.path.dirname(config_file))
     
     # Filter out the pages that are null, which model is nls, and select only 2 columns: year and the page as string (either raw or preprocessed).
     if preprocess_config == "normalize":
@@ -69,24 +70,18 @@ def do_query(df, config_file=None, logger=None, context=None):
 
 
     pages=newdf.rdd.map(tuple)
-    keysentences = []
-    with open(data_file, 'r') as f:
-        for keysentence in list(f):
-            k_split = keysentence.split()
-            sentence_word = [query_utils.preprocess_word(
-                word, preprocess_type) for word in k_split]
-            sentence_norm = ''
-            for word in sentence_word:
-                if sentence_norm == '':
-                    sentence_norm = word
-                else:
-                    sentence_norm += " " + word
-            keysentences.append(sentence_norm)
+    preprocess_type, keysentences = read_config(config_file)
     
 
     filter_pages = pages.filter(
         lambda year_page: any( keysentence in year_page[5] for keysentence in keysentences))
 
+    if query_utils.extract_token_ids(config):
+        from defoe.token_ids import TokenText
+        # [(year, title, edition, archive_filename, filename, token_text), ...]
+        filter_pages = filter_pages.map(
+            lambda year_page: year_page[:5] + (TokenText(year_page[5]),))
+
 
     # [(year, title, edition, archive_filename, filename, text, [(word, idx), (word, idx) ...]), ...]
     maching_idx = filter_pages.map(
@@ -118,3 +113,66 @@ def do_query(df, config_file=None, logger=None, context=None):
              (year_match[0], list(year_match[1]))) \
         .collect()
     return result
+
+
+def read_config(config_file):
+    """
+    Reads how words are to be preprocessed, and the keywords or
+    keysentences to search for, preprocessed likewise, from a
+    configuration file.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :return: preprocess type and keysentences
+    :rtype: tuple(defoe.query_utils.PreprocessWordType,
+    list(str or unicode))
+    """
+    with open(config_file, "r") as f:
+        config = yaml.load(f)
+    preprocess_type = query_utils.extract_preprocess_word_type(config)
+    data_file = query_utils.extract_data_file(config,
+                                              os.path.dirname(config_file))
+    keysentences = []
+    with open(data_file, 'r') as f:
+        for keysentence in list(f):
+            k_split = keysentence.split()
+            sentence_word = [query_utils.preprocess_word(
+                word, preprocess_type) for word in k_split]
+            sentence_norm = ''
+            for word in sentence_word:
+                if sentence_norm == '':
+                    sentence_norm = word
+                else:
+                    sentence_norm += " " + word
+            keysentences.append(sentence_norm)
+    return preprocess_type, keysentences
+
+
+def index_query(index, df, config_file=None, logger=None, context=None):
+    """
+    Gets concordance using a window of words, for keywords and groups
+    by date, as do_query, reading only the pages which an index lists
+    as holding keywords.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param df: data frame of pages
+    :type df: pyspark.sql.DataFrame
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: information on documents in which keywords occur grouped
+    by date, or None if the index does not hold words preprocessed as
+    configured
+    :rtype: dict
+    """
+    from defoe import inverted_index
+    preprocess_type, keysentences = read_config(config_file)
+    if preprocess_type not in index.preprocess_types():
+        return None
+    pages = inverted_index.hit_pages(index, keysentences, preprocess_type)
+    return do_query(inverted_index.select_table_pages(df, pages),
+                    config_file,
+                    logger,
+                    context)
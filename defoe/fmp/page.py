@@ -3,8 +3,11 @@ Object model representation of a page represented as an XML file in
 METS/MODS format.
 """
 
+import math
 
 from lxml import etree
+
+from defoe.alto_utils import parse_alto, tree_nbytes
 from defoe.fmp.textblock import TextBlock
 
 
@@ -14,18 +17,10 @@ class Page(object):
     in METS/MODS format.
     """
 
-    WORDS_XPATH = etree.XPath('//String/@CONTENT')
-    """ XPath query for String content """
     STRINGS_XPATH = etree.XPath('//String')
     """ XPath query for String elements """
     IMAGES_XPATH = etree.XPath('//GraphicalElement')
     """ XPath query for Graphical Element """
-    PAGE_XPATH = etree.XPath('//Page')
-    """ XPath query for Page """
-    WC_XPATH = etree.XPath('//String/@WC')
-    """ XPath query for Word Confidence  content """
-    CC_XPATH = etree.XPath('//String/@CC')
-    """ XPath query for Caracther Confidence content """
     TB_XPATH_ID = etree.XPath('//TextBlock/@ID')
     """ XPath query for Textblock ID """
     TB_XPATH = etree.XPath('//TextBlock')
@@ -48,12 +43,13 @@ class Page(object):
         if not source:
             source = document.archive.open_page(document.code, code)
         self.code = code
-        self.tree = etree.parse(source)
-        self.page_tree = self.single_query(Page.PAGE_XPATH)
-        self.width = int(self.page_tree.get("WIDTH"))
-        self.height = int(self.page_tree.get("HEIGHT"))
-        self.pc = self.page_tree.get("PC")
-        self.page_words = None
+        # Text blocks need the tree, so it is kept, but words and their
+        # attributes are still read in the same pass.
+        self.columns, root = parse_alto(source, keep_tree=True)
+        self.tree = etree.ElementTree(root)
+        self.width = int(self.columns.page["WIDTH"])
+        self.height = int(self.columns.page["HEIGHT"])
+        self.pc = self.columns.page.get("PC")
         self.page_strings = None
         self.page_images = None
         self.page_wc = None
@@ -90,42 +86,40 @@ class Page(object):
     @property
     def words(self):
         """
-        Gets all words in page. These are then saved in an attribute,
-        so the words are only retrieved once.
+        Gets all words in page.
 
         :return: words
         :rtype: list(str or unicode)
         """
-        if not self.page_words:
-            self.page_words = list(map(str, self.query(Page.WORDS_XPATH)))
-        return self.page_words
+        return self.columns.words
 
     @property
     def wc(self):
         """
-        Gets all word confidences (wc)  in page. These are then saved in an attribute,
-        so the wc are only retrieved once.
+        Gets all word confidences (wc) in page, skipping words without
+        one. These are then saved in an attribute, so the wc are only
+        retrieved once.
 
         :return: wc
-        :rtype: list(str)
+        :rtype: list(float)
         """
-        if not self.page_wc:
-            self.page_wc = list(self.query(Page.WC_XPATH))
-
+        if self.page_wc is None:
+            self.page_wc = [wc for wc in self.columns.wc
+                            if not math.isnan(wc)]
         return self.page_wc
     
     @property
     def cc(self):
         """
-        Gets all character confidences (cc)  in page. These are then saved in an attribute,
-        so the cc are only retrieved once.
+        Gets all character confidences (cc) in page, skipping words
+        without them. These are then saved in an attribute, so the cc
+        are only retrieved once.
 
         :return: cc
         :rtype: list(str)
         """
-        if not self.page_cc:
-            self.page_cc = list(self.query(Page.CC_XPATH))
-
+        if self.page_cc is None:
+            self.page_cc = [cc for cc in self.columns.cc if cc is not None]
         return self.page_cc
 
     @property
@@ -177,3 +171,13 @@ class Page(object):
         :rtype: str or unicode
         """
         return ' '.join(self.words)
+
+    @property
+    def nbytes(self):
+        """
+        Gets approximate memory held by the page.
+
+        :return: number of bytes
+        :rtype: int
+        """
+        return self.columns.nbytes + tree_nbytes(self.tree)
@@ -2,9 +2,8 @@
 Query-related utility functions.
 """
 
-from defoe import query_utils
+from defoe import bloom_filters, query_utils
 from defoe.query_utils import PreprocessWordType
-from nltk.corpus import words
 from PIL import Image
 from pathlib import Path
 import os
@@ -31,19 +30,22 @@ def get_page_matches(document,
     :return: list of tuples
     :rtype: list(tuple)
     """
+    # Scan each page once for all keywords, then list matches by
+    # keyword then page, as would scanning pages once per keyword.
+    keyword_set = set(keywords)
+    page_keywords = []
+    for page in bloom_filters.candidate_pages(document,
+                                              keywords,
+                                              preprocess_type):
+        found = keyword_set.intersection(
+            query_utils.preprocess_words(page.words, preprocess_type))
+        if found:
+            page_keywords.append((page, found))
     matches = []
     for keyword in keywords:
-        for page in document:
-            match = None
-            for word in page.words:
-                preprocessed_word = query_utils.preprocess_word(
-                    word, preprocess_type)
-                if preprocessed_word == keyword:
-                    match = (document.year, document, page, keyword)
-                    break
-            if match:
-                matches.append(match)
-                continue  # move to next page
+        for page, found in page_keywords:
+            if keyword in found:
+                matches.append((document.year, document, page, keyword))
     return matches
 
 def get_article_matches(document,
@@ -65,23 +67,20 @@ def get_article_matches(document,
     :return: list of tuples
     :rtype: list(tuple)
     """
-    matches = []
+    # Preprocess each textblock once for all keywords, then list
+    # matches by keyword then textblock, as would scanning textblocks
+    # once per keyword.
     document_articles=document.articles
+    tb_words = []
+    for article in document_articles:
+        for tb in document_articles[article]:
+            tb_preprocessed_words = query_utils.preprocess_words(tb.words, preprocess_type)
+            tb_words.append((article, tb, tb_preprocessed_words, set(tb_preprocessed_words)))
+    matches = []
     for keyword in keywords:
-        for article in document_articles:
-            for tb in document_articles[article]:
-                 match = None
-                 tb_preprocessed_words=[]
-                 for word in tb.words:
-                     preprocessed_word = query_utils.preprocess_word(word, preprocess_type)
-                     tb_preprocessed_words.append(preprocessed_word)
-                 for preprocessed_word in tb_preprocessed_words:
-                     if preprocessed_word == keyword:
-                         match = (document.year, document, article, tb.textblock_id, tb.textblock_coords, tb.textblock_page_area, tb.words, tb_preprocessed_words, tb.page_name, keyword)
-                         break
-                 if match:
-                     matches.append(match)
-                     continue  # move to next article
+        for article, tb, tb_preprocessed_words, found in tb_words:
+            if keyword in found:
+                matches.append((document.year, document, article, tb.textblock_id, tb.textblock_coords, tb.textblock_page_area, tb.words, tb_preprocessed_words, tb.page_name, keyword))
     return matches
 
 
@@ -168,13 +167,11 @@ def get_document_keywords(document,
     :return: sorted list of keywords that occur within article
     :rtype: list(str or unicode)
     """
+    keyword_set = set(keywords)
     matches = set()
     for page in document:
-        for word in page.words:
-            preprocessed_word = query_utils.preprocess_word(word,
-                                                            preprocess_type)
-            if preprocessed_word in keywords:
-                matches.add(preprocessed_word)
+        matches.update(keyword_set.intersection(
+            query_utils.preprocess_words(page.words, preprocess_type)))
     return sorted(list(matches))
 
 
@@ -194,7 +191,9 @@ def document_contains_word(document,
     :return: True if the article contains the word, false otherwise
     :rtype: bool
     """
-    for page in document:
+    for page in bloom_filters.candidate_pages(document,
+                                              [keyword],
+                                              preprocess_type):
         for word in page.words:
             preprocessed_word = query_utils.preprocess_word(word,
                                                             preprocess_type)
@@ -215,20 +214,8 @@ def calculate_words_within_dictionary(page,
     :return: matches
     :rtype: list(str or unicode)
     """
-    dictionary = words.words()
-    counter= 0
-    total_words= 0
-    for word in page.words:
-         preprocessed_word = query_utils.preprocess_word(word, preprocess_type)
-         if preprocessed_word!="":
-            total_words += 1
-            if  preprocessed_word in dictionary:
-               counter +=  1
-    try:
-       calculate_pc = str(counter*100/total_words)
-    except:
-       calculate_pc = "0" 
-    return calculate_pc
+    return query_utils.calculate_words_within_dictionary(page.words,
+                                                         preprocess_type)
 
 def calculate_words_confidence_average(page):
     """
@@ -241,14 +228,5 @@ def calculate_words_confidence_average(page):
     :return: matches
     :rtype: list(str or unicode)
     """
-    dictionary = words.words()
-    counter= 0
-    total_wc= 0
-    for wc in page.wc:
-               total_wc += float(wc)
-    try:
-       calculate_wc = str(total_wc/len(page.wc))
-    except:
-       calculate_wc = "0" 
-    return calculate_wc
+    return query_utils.calculate_words_confidence_average(page.wc)
 
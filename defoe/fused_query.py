@@ -0,0 +1,256 @@
+"""
+Fusing queries into one pass over documents and their pages.
+
+A query module may support, in addition to do_query, a function
+
+    defoe.fused_query.FusedQuery fused_query(str|unicode config_file,
+                                             py4j.java_gateway.JavaObject
+                                             logger)
+
+returning functions which map each document, and each page, to (key,
+value) pairs, a function which combines the values of a key, and a
+function which builds the query results from the combined pairs.
+run_fused_queries runs any number of such queries in one pass, so
+that each page is read once, and cleaned and preprocessed at most
+once for each way of preprocessing its words.
+"""
+
+from defoe import query_utils
+
+
+class FusedQuery(object):
+    """
+    Functions implementing a query which can be fused with others.
+    """
+
+    def __init__(self, combine, result, map_document=None, map_page=None):
+        """
+        Constructor.
+
+        :param combine: function combining two values of a key
+        :type combine: function
+        :param result: function building query results from a list
+        of (key, combined value) pairs
+        :type result: function
+        :param map_document: function mapping a document to a list
+        of (key, value) pairs, or None
+        :type map_document: function
+        :param map_page: function mapping a
+        defoe.fused_query.PageText to a list of (key, value) pairs,
+        or None
+        :type map_page: function
+        """
+        self.combine = combine
+        self.result = result
+        self.map_document = map_document
+        self.map_page = map_page
+
+
+class PageText(object):
+    """
+    Page and its text, cleaned and preprocessed on first use, and
+    shared by the queries run over the page.
+    """
+
+    def __init__(self, document, page):
+        """
+        Constructor.
+
+        :param document: document holding page
+        :type document: defoe.nls.document.Document
+        :param page: page, or its record
+        :type page: defoe.nls.page.Page or
+        defoe.page_records.PageRecord
+        """
+        self.document = document
+        self.page = page
+        self.preprocessed_words = {}
+        self.token_texts = {}
+        # A defoe.page_records.PageRecord holds its clean text.
+        self.clean_text = getattr(page, "clean_text", None)
+        self.preprocessed_clean_texts = dict(
+            getattr(page, "preprocessed_clean_texts", {}))
+
+    @property
+    def year(self):
+        """
+        Gets year of document.
+
+        :return: year
+        :rtype: int
+        """
+        return self.document.year
+
+    @property
+    def clean(self):
+        """
+        Gets page as a single string, with hyphenated words combined,
+        the long-s fixed and camel case words split.
+
+        :return: clean page words as a string
+        :rtype: str or unicode
+        """
+        if self.clean_text is None:
+            self.clean_text = " ".join(query_utils.split_camel_case_words(
+                query_utils.clean_words(self.page.words)))
+        return self.clean_text
+
+    def words(self, preprocess_type):
+        """
+        Gets preprocessed page words.
+
+        :param preprocess_type: how words should be preprocessed
+        (normalize, normalize and stem, normalize and lemmatize, none)
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :return: preprocessed words
+        :rtype: list(str or unicode)
+        """
+        if preprocess_type not in self.preprocessed_words:
+            self.preprocessed_words[preprocess_type] = \
+                query_utils.preprocess_words(self.page.words, preprocess_type)
+        return self.preprocessed_words[preprocess_type]
+
+    def token_text(self, preprocess_type):
+        """
+        Gets preprocessed page words as token IDs.
+
+        :param preprocess_type: how words should be preprocessed
+        (normalize, normalize and stem, normalize and lemmatize, none)
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :return: token IDs
+        :rtype: defoe.token_ids.TokenText
+        """
+        if preprocess_type not in self.token_texts:
+            from defoe.token_ids import TokenText
+            self.token_texts[preprocess_type] = \
+                TokenText(self.words(preprocess_type))
+        return self.token_texts[preprocess_type]
+
+    def preprocessed_clean(self, preprocess_type):
+        """
+        Gets preprocessed words of clean page as a single string.
+
+        :param preprocess_type: how words should be preprocessed
+        (normalize, normalize and stem, normalize and lemmatize, none)
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :return: preprocessed clean page words as a string
+        :rtype: str or unicode
+        """
+        if preprocess_type not in self.preprocessed_clean_texts:
+            self.preprocessed_clean_texts[preprocess_type] = \
+                query_utils.join_words(query_utils.preprocess_words(
+                    self.clean.split(" "), preprocess_type))
+        return self.preprocessed_clean_texts[preprocess_type]
+
+
+def extend_list(list1, list2):
+    """
+    Extends a list with another, in place, so that a query collecting
+    values in lists combines each value once, rather than copying the
+    values combined so far, as operator.concat would, for each value.
+
+    :param list1: list, extended
+    :type list1: list
+    :param list2: list
+    :type list2: list
+    :return: list1
+    :rtype: list
+    """
+    list1.extend(list2)
+    return list1
+
+
+def group_pairs(pairs, group_index=0):
+    """
+    Groups pairs with two-part keys by one part of their keys, as
+    the results of queries which group by year or word.
+
+    For example, given [((1771, "a"), 1), ((1771, "b"), 2)], return
+    [(1771, [("a", 1), ("b", 2)])], or, if group_index is 1, return
+    [("a", [(1771, 1)]), ("b", [(1771, 2)])].
+
+    :param pairs: ((key, key), value) pairs
+    :type pairs: list(tuple(tuple(object, object), object))
+    :param group_index: index of key part to group by
+    :type group_index: int
+    :return: (key, [(key, value), ...]) pairs
+    :rtype: list(tuple(object, list(tuple(object, object))))
+    """
+    groups = {}
+    for key, value in pairs:
+        groups.setdefault(key[group_index], []).append(
+            (key[1 - group_index], value))
+    return list(groups.items())
+
+
+def map_archive(archive, queries):
+    """
+    Maps documents and pages of an archive to (key, value) pairs with
+    each query. Keys and values are tagged with the index of their
+    query.
+
+    :param archive: archive
+    :type archive: defoe.nls.archive.Archive
+    :param queries: queries
+    :type queries: list(defoe.fused_query.FusedQuery)
+    :return: ((query index, key), (query index, value)) pairs
+    :rtype: iterator(tuple(tuple(int, object), tuple(int, object)))
+    """
+    for document in archive:
+        for index, query in enumerate(queries):
+            if query.map_document is not None:
+                for key, value in query.map_document(document):
+                    yield (index, key), (index, value)
+        if not any(query.map_page is not None for query in queries):
+            continue
+        for page in document:
+            page_text = PageText(document, page)
+            for index, query in enumerate(queries):
+                if query.map_page is not None:
+                    for key, value in query.map_page(page_text):
+                        yield (index, key), (index, value)
+
+
+def combine_tagged(queries, tagged_value1, tagged_value2):
+    """
+    Combines two values of a key, tagged with the index of their
+    query, with the query's combine function.
+
+    :param queries: queries
+    :type queries: list(defoe.fused_query.FusedQuery)
+    :param tagged_value1: query index and value
+    :type tagged_value1: tuple(int, object)
+    :param tagged_value2: query index and value
+    :type tagged_value2: tuple(int, object)
+    :return: query index and combined value
+    :rtype: tuple(int, object)
+    """
+    index = tagged_value1[0]
+    return index, queries[index].combine(tagged_value1[1], tagged_value2[1])
+
+
+def run_fused_queries(archives, queries):
+    """
+    Runs queries in one pass over the documents and pages of
+    archives.
+
+    :param archives: RDD of archives
+    :type archives: pyspark.rdd.PipelinedRDD
+    :param queries: queries
+    :type queries: list(defoe.fused_query.FusedQuery)
+    :return: results of each query
+    :rtype: list
+    """
+    # [((index, key), (index, value)), ...]
+    # =>
+    # [((index, key), (index, combined_value)), ...]
+    pairs = archives \
+        .flatMap(lambda archive: map_archive(archive, queries)) \
+        .reduceByKey(lambda value1, value2:
+                     combine_tagged(queries, value1, value2)) \
+        .collect()
+    query_pairs = [[] for _ in queries]
+    for (index, key), (_, value) in pairs:
+        query_pairs[index].append((key, value))
+    return [query.result(query_pairs[index])
+            for index, query in enumerate(queries)]
@@ -5,6 +5,7 @@ Object model representation of an XML document.
 import os.path
 from lxml import etree
 
+from defoe.parse_on_use import ParseOnUse
 from defoe.spark_utils import open_stream
 
 
@@ -13,9 +14,10 @@ SCHEMA_LOCATION = etree.QName(XSI_NS, "schemaLocation")
 NO_NS_SCHEMA_LOCATION = etree.QName(XSI_NS, "noNamespaceSchemaLocation")
 
 
-class Document(object):
+class Document(ParseOnUse):
     """
-    Object model representation of an XML document.
+    Object model representation of an XML document. The XML document
+    is parsed on first use.
     """
 
     def __init__(self, filename):
@@ -26,7 +28,14 @@ class Document(object):
         :type: filename: str or unicode
         """
         self.filename = filename
-        self.filesize = os.path.getsize(filename)
+        self.parsed = False
+
+    def parse(self):
+        """
+        Parses the XML document.
+        """
+        self.parsed = True
+        self.filesize = os.path.getsize(self.filename)
 
         stream = open_stream(self.filename)
         self.document_tree = None
@@ -45,6 +54,25 @@ class Document(object):
         self.no_ns_schema_location = self.root_element.get(
             NO_NS_SCHEMA_LOCATION.text)
 
+    def __getstate__(self):
+        """
+        Gets state for pickling: the filename. The file is parsed again
+        on first use once unpickled.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"filename": self.filename}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.__init__(state["filename"])
+
     def query(self, query):
         """
         Run XPath query.
@@ -0,0 +1,71 @@
+"""
+Builds a positional inverted index over pages read from HDFS, by
+year and word preprocessing type.
+"""
+
+from defoe import inverted_index
+
+
+def do_query(df, config_file=None, logger=None, context=None):
+    """
+    Read pages from HDFS and index the preprocessed words of each
+    page, from the source_text_clean, source_text_norm,
+    source_text_stem or source_text_lemmatize column, writing the
+    index segments and manifest, as described in
+    defoe.inverted_index. Only pages whose model is nls are indexed,
+    as queried by the other queries over these tables. Pages are
+    identified by their archive_filename and source_text_filename.
+
+    config_file must be the path to a configuration file of form:
+
+        index: <INDEX_DIRECTORY>
+        preprocess: none|normalize|stem|lemmatize, or a list of these
+        pages_per_segment: <NUM_PAGES>
+
+    Returns result of form:
+
+        {
+          "archives":
+          {
+            <ARCHIVE_FILENAME>: {"": [<MTIME_NS>, <SIZE>]} | None,
+            ...
+          },
+          "preprocess":
+          {
+            <INDEX_NAME>:
+            {
+              <YEAR>:
+              {
+                "pages": <NUM_PAGES>,
+                "terms": <NUM_TERMS>,
+                "postings": <NUM_POSTINGS>,
+                "segments": [<SEGMENT>, ...]
+              },
+              ...
+            },
+            ...
+          }
+        }
+
+    :param df: data frame of pages
+    :type df: pyspark.sql.DataFrame
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: summary of index
+    :rtype: dict
+    """
+    # Page tables hold only clean text, so raw_preprocess is ignored.
+    path, preprocess_types, _, pages_per_segment = \
+        inverted_index.read_build_config(config_file)
+    columns = ["year", "archive_filename", "source_text_filename"] + \
+        [inverted_index.TABLE_COLUMNS[preprocess_type]
+         for preprocess_type in preprocess_types]
+    # [(index_name, year, archive_filename, page_code, words), ...]
+    pages = df.filter(df["model"] == inverted_index.TABLE_MODEL) \
+        .select(*columns).rdd.flatMap(
+            lambda row: inverted_index.row_to_pages(row, preprocess_types))
+    filenames = inverted_index.table_archive_filenames(df)
+    return inverted_index.build_index(pages, filenames, path,
+                                      pages_per_segment)
@@ -0,0 +1,932 @@
+"""
+Positional inverted indexes, mapping each term to the pages holding
+it and its positions in each, so that pages holding keywords are
+found without reading archives.
+
+An index is a directory holding a manifest, index.yml, and segments,
+each indexing a set of pages of one year, with words preprocessed in
+one way, and named as given by index_name:
+
+    <index>/index.yml
+    <index>/<name>/<year>/<segment>/terms.txt.gz
+    <index>/<name>/<year>/<segment>/pages.json.gz
+    <index>/<name>/<year>/<segment>/term_offsets.npy
+    <index>/<name>/<year>/<segment>/postings.npy
+    <index>/<name>/<year>/<segment>/position_offsets.npy
+    <index>/<name>/<year>/<segment>/positions.npy
+
+terms.txt.gz holds the segment's terms, sorted, one per line, and
+pages.json.gz a list of [archive filename, page code] pairs. Postings
+of the i-th term are postings[term_offsets[i]:term_offsets[i + 1]],
+the index of each page holding the term. Positions of the j-th
+posting are positions[position_offsets[j]:position_offsets[j + 1]],
+delta-encoded in the smallest unsigned integer type which holds
+them. The arrays are memory-mapped when read.
+
+The manifest lists the archives indexed, with the modification time
+and size of each when indexed, so an index is only used to query the
+same, unchanged, archives.
+
+Pages are indexed by the words of their clean text, preprocessed, as
+matched by keysearch_by_year, and as held by the hdfs, psql and es
+page tables, so positions are those of words in the text split on
+whitespace. Pages of archives may also be indexed by their raw words,
+preprocessed, as matched by keyword_by_year and
+keyword_concordance_by_year, omitting words which are not terms, as
+given by is_term.
+
+This module imports NumPy, so should only be imported by queries
+which build or use indexes.
+"""
+
+from bisect import bisect_left
+import gzip
+import json
+import os
+import os.path
+
+import numpy as np
+import yaml
+
+from defoe import query_utils
+from defoe.archive_manifest import archive_stat
+from defoe.fused_query import PageText
+
+MANIFEST_FILE = "index.yml"
+""" Name of index manifest file """
+PAGES_PER_SEGMENT = 10000
+""" Default maximum number of pages per segment """
+TABLE_COLUMNS = {
+    query_utils.PreprocessWordType.NONE: "source_text_clean",
+    query_utils.PreprocessWordType.NORMALIZE: "source_text_norm",
+    query_utils.PreprocessWordType.STEM: "source_text_stem",
+    query_utils.PreprocessWordType.LEMMATIZE: "source_text_lemmatize"
+}
+""" hdfs, psql and es page table column for each PreprocessWordType """
+TABLE_MODEL = "nls"
+""" Model of the hdfs, psql and es page table rows which are indexed """
+RAW_PREFIX = "raw_"
+""" Prefix of names of segments indexing raw page words """
+
+
+def index_name(preprocess_type, raw=False):
+    """
+    Gets name of the segments indexing pages by words preprocessed in
+    a way.
+
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :param raw: if True, the raw words of pages, else the words of
+    their clean text
+    :type raw: bool
+    :return: name
+    :rtype: str or unicode
+    """
+    name = preprocess_type.name.lower()
+    if raw:
+        return RAW_PREFIX + name
+    return name
+
+
+def is_term(word):
+    """
+    Checks whether a word can be indexed: it is not empty and holds
+    no whitespace.
+
+    :param word: word
+    :type word: str or unicode
+    :return: True if the word can be indexed
+    :rtype: bool
+    """
+    return word.split() == [word]
+
+
+class SegmentWriter(object):
+    """
+    Postings of a set of pages, to be written as a segment.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.pages = []
+        self.postings = {}
+
+    def __len__(self):
+        """
+        Gets number of pages.
+
+        :return: number of pages
+        :rtype: int
+        """
+        return len(self.pages)
+
+    def add_page(self, archive, page, words):
+        """
+        Adds postings of a page's words.
+
+        :param archive: archive filename
+        :type archive: str or unicode
+        :param page: page code
+        :type page: str or unicode
+        :param words: preprocessed words of page
+        :type words: list(str or unicode)
+        """
+        page_index = len(self.pages)
+        self.pages.append([archive, page])
+        term_positions = {}
+        for position, word in enumerate(words):
+            term_positions.setdefault(word, []).append(position)
+        for term, positions in term_positions.items():
+            self.postings.setdefault(term, []).append((page_index,
+                                                       positions))
+
+    def write(self, path):
+        """
+        Writes segment.
+
+        :param path: segment directory, created if it does not exist
+        :type path: str or unicode
+        :return: number of terms and postings
+        :rtype: tuple(int, int)
+        """
+        terms = sorted(self.postings)
+        term_offsets = [0]
+        postings = []
+        position_offsets = [0]
+        positions = []
+        for term in terms:
+            for page_index, term_positions in self.postings[term]:
+                postings.append(page_index)
+                previous = 0
+                for position in term_positions:
+                    positions.append(position - previous)
+                    previous = position
+                position_offsets.append(len(positions))
+            term_offsets.append(len(postings))
+        if not os.path.exists(path):
+            os.makedirs(path)
+        with gzip.open(os.path.join(path, "terms.txt.gz"), "wt",
+                       encoding="utf-8") as f:
+            f.write("\n".join(terms))
+        with gzip.open(os.path.join(path, "pages.json.gz"), "wt",
+                       encoding="utf-8") as f:
+            json.dump(self.pages, f)
+        positions_type = np.min_scalar_type(max(positions, default=0))
+        np.save(os.path.join(path, "term_offsets.npy"),
+                np.array(term_offsets, dtype=np.int64))
+        np.save(os.path.join(path, "postings.npy"),
+                np.array(postings, dtype=np.uint32))
+        np.save(os.path.join(path, "position_offsets.npy"),
+                np.array(position_offsets, dtype=np.int64))
+        np.save(os.path.join(path, "positions.npy"),
+                np.array(positions, dtype=positions_type))
+        return len(terms), len(postings)
+
+
+class Segment(object):
+    """
+    Segment of an index, read on first use, with postings and
+    positions memory-mapped.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor.
+
+        :param path: segment directory
+        :type path: str or unicode
+        """
+        self.path = path
+        self.terms = None
+        self.pages = None
+        self.arrays = None
+
+    def open(self):
+        """
+        Reads terms and pages and memory-maps postings and positions,
+        if not already done.
+        """
+        if self.terms is not None:
+            return
+        with gzip.open(os.path.join(self.path, "terms.txt.gz"), "rt",
+                       encoding="utf-8") as f:
+            text = f.read()
+        self.terms = text.split("\n") if text else []
+        with gzip.open(os.path.join(self.path, "pages.json.gz"), "rt",
+                       encoding="utf-8") as f:
+            self.pages = json.load(f)
+        self.arrays = {
+            name: np.load(os.path.join(self.path, name + ".npy"),
+                          mmap_mode="r")
+            for name in ["term_offsets", "postings",
+                         "position_offsets", "positions"]}
+
+    def postings(self, term):
+        """
+        Gets postings of a term.
+
+        :param term: term
+        :type term: str or unicode
+        :return: index of each page holding the term, and its
+        positions in the page
+        :rtype: list(tuple(int, list(int)))
+        """
+        self.open()
+        index = bisect_left(self.terms, term)
+        if index == len(self.terms) or self.terms[index] != term:
+            return []
+        arrays = self.arrays
+        start, end = arrays["term_offsets"][index:index + 2].tolist()
+        position_offsets = arrays["position_offsets"][start:end + 1].tolist()
+        positions = arrays["positions"]
+        postings = []
+        for posting, page_index in enumerate(
+                arrays["postings"][start:end].tolist()):
+            deltas = positions[position_offsets[posting]:
+                               position_offsets[posting + 1]]
+            postings.append((page_index,
+                             np.cumsum(deltas, dtype=np.int64).tolist()))
+        return postings
+
+    def lookup(self, term):
+        """
+        Gets pages holding a term, and its positions in each.
+
+        :param term: term
+        :type term: str or unicode
+        :return: archive filename, page code and positions of each
+        page holding the term
+        :rtype: list(tuple(str or unicode, str or unicode, list(int)))
+        """
+        return [tuple(self.pages[page_index]) + (positions,)
+                for page_index, positions in self.postings(term)]
+
+    def lookup_phrase(self, phrase):
+        """
+        Gets pages holding a phrase, and the positions at which it
+        starts in each. The phrase matches whole words, as
+        defoe.query_utils.KeysentenceMatcher does.
+
+        :param phrase: phrase, one or more space-separated terms
+        :type phrase: str or unicode
+        :return: archive filename, page code and positions of each
+        page holding the phrase
+        :rtype: list(tuple(str or unicode, str or unicode, list(int)))
+        """
+        terms = phrase.split()
+        if not terms:
+            return []
+        postings = [self.postings(term) for term in terms]
+        if not all(postings):
+            return []
+        # Positions of each later term, by page.
+        later_positions = [dict(term_postings)
+                           for term_postings in postings[1:]]
+        hits = []
+        for page_index, positions in postings[0]:
+            if not all(page_index in term_positions
+                       for term_positions in later_positions):
+                continue
+            offset_positions = [set(term_positions[page_index])
+                                for term_positions in later_positions]
+            starts = [position for position in positions
+                      if all(position + offset in next_positions
+                             for offset, next_positions
+                             in enumerate(offset_positions, 1))]
+            if starts:
+                hits.append(tuple(self.pages[page_index]) + (starts,))
+        return hits
+
+
+class InvertedIndex(object):
+    """
+    Index, read as described by its manifest, with segments opened
+    on first use.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor.
+
+        :param path: index directory
+        :type path: str or unicode
+        :raises: IOError if the index has no manifest
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), "r") as f:
+            self.manifest = yaml.safe_load(f)
+        self.segments = {}
+
+    def preprocess_types(self, raw=False):
+        """
+        Gets ways in which words of indexed pages are preprocessed.
+
+        :param raw: if True, the raw words of pages, else the words of
+        their clean text
+        :type raw: bool
+        :return: word preprocessing types
+        :rtype: list(defoe.query_utils.PreprocessWordType)
+        """
+        names = [name for name in sorted(self.manifest["preprocess"])
+                 if name.startswith(RAW_PREFIX) == raw]
+        if raw:
+            names = [name[len(RAW_PREFIX):] for name in names]
+        return [query_utils.parse_preprocess_word_type(name)
+                for name in names]
+
+    def years(self, preprocess_type, raw=False):
+        """
+        Gets years of indexed pages.
+
+        :param preprocess_type: how words were preprocessed
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :param raw: if True, the raw words of pages, else the words of
+        their clean text
+        :type raw: bool
+        :return: years
+        :rtype: list(str or unicode)
+        """
+        return sorted(self.manifest["preprocess"].get(
+            index_name(preprocess_type, raw), {}))
+
+    def year_segments(self, preprocess_type, year, raw=False):
+        """
+        Gets segments indexing pages of a year.
+
+        :param preprocess_type: how words were preprocessed
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :param year: year
+        :type year: str or unicode
+        :param raw: if True, the raw words of pages, else the words of
+        their clean text
+        :type raw: bool
+        :return: segments
+        :rtype: list(defoe.inverted_index.Segment)
+        """
+        name = index_name(preprocess_type, raw)
+        key = (name, year)
+        if key not in self.segments:
+            year_path = os.path.join(self.path, name, year)
+            self.segments[key] = [
+                Segment(os.path.join(year_path, segment))
+                for segment in
+                self.manifest["preprocess"][name][year]["segments"]]
+        return self.segments[key]
+
+    def matches(self, filenames):
+        """
+        Checks whether the index is over the given archives, as they
+        now are. Archives which cannot be found, such as URLs, or the
+        archive filenames of page table rows, are matched by filename
+        only.
+
+        :param filenames: archive filenames
+        :type filenames: list(str or unicode)
+        :return: True if the index lists the same archives, each with
+        the same modification time and size
+        :rtype: bool
+        """
+        archives = self.manifest.get("archives")
+        if not isinstance(archives, dict) or set(archives) != set(filenames):
+            return False
+        return all(archives[filename] == archive_stat(filename)
+                   for filename in archives)
+
+    def lookup(self, term, preprocess_type, years=None, raw=False):
+        """
+        Gets pages holding a term, and its positions in each.
+
+        :param term: term, preprocessed as the indexed pages were
+        :type term: str or unicode
+        :param preprocess_type: how words were preprocessed
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :param years: years to search, or None for all years
+        :type years: list(str or unicode)
+        :param raw: if True, search the raw words of pages, else the
+        words of their clean text
+        :type raw: bool
+        :return: year, archive filename, page code and positions of
+        each page holding the term
+        :rtype: iterator(tuple(str or unicode, str or unicode,
+        str or unicode, list(int)))
+        """
+        for year in self.select_years(preprocess_type, years, raw):
+            for segment in self.year_segments(preprocess_type, year, raw):
+                for archive, page, positions in segment.lookup(term):
+                    yield year, archive, page, positions
+
+    def lookup_phrase(self, phrase, preprocess_type, years=None,
+                      raw=False):
+        """
+        Gets pages holding a phrase, and the positions at which it
+        starts in each.
+
+        :param phrase: phrase, one or more space-separated terms,
+        preprocessed as the indexed pages were
+        :type phrase: str or unicode
+        :param preprocess_type: how words were preprocessed
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :param years: years to search, or None for all years
+        :type years: list(str or unicode)
+        :param raw: if True, search the raw words of pages, else the
+        words of their clean text
+        :type raw: bool
+        :return: year, archive filename, page code and positions of
+        each page holding the phrase
+        :rtype: iterator(tuple(str or unicode, str or unicode,
+        str or unicode, list(int)))
+        """
+        for year in self.select_years(preprocess_type, years, raw):
+            for segment in self.year_segments(preprocess_type, year, raw):
+                for archive, page, positions in \
+                        segment.lookup_phrase(phrase):
+                    yield year, archive, page, positions
+
+    def select_years(self, preprocess_type, years=None, raw=False):
+        """
+        Gets indexed years, of those given.
+
+        :param preprocess_type: how words were preprocessed
+        :type preprocess_type: defoe.query_utils.PreprocessWordType
+        :param years: years, or None for all years
+        :type years: list(str or unicode)
+        :param raw: if True, the raw words of pages, else the words of
+        their clean text
+        :type raw: bool
+        :return: years
+        :rtype: list(str or unicode)
+        """
+        indexed_years = self.years(preprocess_type, raw)
+        if years is None:
+            return indexed_years
+        years = [str(year) for year in years]
+        return [year for year in indexed_years if year in years]
+
+
+def archive_to_pages(archive, preprocess_types, raw_preprocess_types=()):
+    """
+    Gets words of each page of an archive of an ALTO-based model, as
+    preprocessed in each way, to be indexed.
+
+    :param archive: archive
+    :type archive: defoe.nls.archive.Archive
+    :param preprocess_types: how words of the clean text of pages
+    should be preprocessed
+    :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+    :param raw_preprocess_types: how raw words of pages should be
+    preprocessed
+    :type raw_preprocess_types:
+    list(defoe.query_utils.PreprocessWordType)
+    :return: index name, year, archive filename, page code and words
+    of each page
+    :rtype: iterator(tuple(str or unicode, str or unicode,
+    str or unicode, str or unicode, list(str or unicode)))
+    """
+    for document in archive:
+        for page in document:
+            page_text = PageText(document, page)
+            for preprocess_type in preprocess_types:
+                yield (index_name(preprocess_type),
+                       str(document.year),
+                       document.archive.filename,
+                       page.code,
+                       page_text.preprocessed_clean(preprocess_type).split())
+            for preprocess_type in raw_preprocess_types:
+                yield (index_name(preprocess_type, True),
+                       str(document.year),
+                       document.archive.filename,
+                       page.code,
+                       [word for word in page_text.words(preprocess_type)
+                        if is_term(word)])
+
+
+def row_to_pages(row, preprocess_types):
+    """
+    Gets words of a page from a row of an hdfs, psql or es page
+    table, as preprocessed in each way, to be indexed.
+
+    :param row: row
+    :type row: pyspark.sql.Row
+    :param preprocess_types: how words should be preprocessed
+    :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+    :return: index name, year, archive filename, page code and words
+    of page
+    :rtype: list(tuple(str or unicode, str or unicode,
+    str or unicode, str or unicode, list(str or unicode)))
+    """
+    return [(index_name(preprocess_type),
+             str(row["year"]),
+             row["archive_filename"],
+             row["source_text_filename"],
+             (row[TABLE_COLUMNS[preprocess_type]] or "").split())
+            for preprocess_type in preprocess_types]
+
+
+def write_segments(path, partition, pages, pages_per_segment):
+    """
+    Writes segments indexing pages, with each segment holding at most
+    pages_per_segment pages of one year, preprocessed in one way.
+    Segments are named after the partition, so as not to clash with
+    those written by other partitions.
+
+    :param path: index directory
+    :type path: str or unicode
+    :param partition: partition index
+    :type partition: int
+    :param pages: index name, year, archive filename, page code and
+    words of each page, as returned by archive_to_pages
+    :type pages: iterable(tuple)
+    :param pages_per_segment: maximum number of pages per segment
+    :type pages_per_segment: int
+    :return: index name, year, segment name, and number of
+    pages, terms and postings of each segment
+    :rtype: iterator(tuple(str or unicode, str or unicode,
+    str or unicode, int, int, int))
+    """
+    writers = {}
+    num_segments = {}
+
+    def write(key):
+        name, year = key
+        writer = writers.pop(key)
+        segment = "{:05d}-{:05d}".format(partition,
+                                         num_segments.get(key, 0))
+        num_segments[key] = num_segments.get(key, 0) + 1
+        num_terms, num_postings = writer.write(
+            os.path.join(path, name, year, segment))
+        return name, year, segment, len(writer), num_terms, num_postings
+
+    for name, year, archive, page, words in pages:
+        key = (name, year)
+        writer = writers.setdefault(key, SegmentWriter())
+        writer.add_page(archive, page, words)
+        if len(writer) >= pages_per_segment:
+            yield write(key)
+    for key in list(writers):
+        yield write(key)
+
+
+def build_index(pages, filenames, path,
+                pages_per_segment=PAGES_PER_SEGMENT):
+    """
+    Builds an index over pages, each partition writing its own
+    segments, then writes the manifest listing them, and the archives
+    indexed. Any existing manifest is removed first, so that an index
+    is only used once fully built. path must be on a file system
+    shared by all Spark workers.
+
+    Returns a summary of form:
+
+        {
+          "archives":
+          {
+            <ARCHIVE_FILENAME>: {"": [<MTIME_NS>, <SIZE>]} | None,
+            ...
+          },
+          "preprocess":
+          {
+            <INDEX_NAME>:
+            {
+              <YEAR>:
+              {
+                "pages": <NUM_PAGES>,
+                "terms": <NUM_TERMS>,
+                "postings": <NUM_POSTINGS>,
+                "segments": [<SEGMENT>, ...]
+              },
+              ...
+            },
+            ...
+          }
+        }
+
+    where terms are counted per segment, archives are as given by
+    defoe.archive_manifest.archive_stat, and index names are as given
+    by index_name.
+
+    :param pages: RDD of index name, year, archive filename, page
+    code and words of each page, as returned by archive_to_pages
+    :type pages: pyspark.rdd.PipelinedRDD
+    :param filenames: filenames of the archives indexed, including
+    any without pages
+    :type filenames: list(str or unicode)
+    :param path: index directory
+    :type path: str or unicode
+    :param pages_per_segment: maximum number of pages per segment
+    :type pages_per_segment: int
+    :return: summary, as written to the manifest
+    :rtype: dict
+    """
+    manifest_file = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+    segments = pages.mapPartitionsWithIndex(
+        lambda partition, partition_pages:
+        write_segments(path, partition, partition_pages, pages_per_segment)) \
+        .collect()
+    manifest = {"archives": archives_to_manifest(filenames),
+                "preprocess": segments_to_manifest(segments)}
+    if not os.path.exists(path):
+        os.makedirs(path)
+    with open(manifest_file, "w") as f:
+        f.write(yaml.safe_dump(manifest))
+    return manifest
+
+
+def archives_to_manifest(filenames):
+    """
+    Gets modification times and sizes of archives, as listed in an
+    index manifest.
+
+    :param filenames: archive filenames
+    :type filenames: list(str or unicode)
+    :return: modification time and size, as returned by
+    defoe.archive_manifest.archive_stat, keyed by archive filename
+    :rtype: dict
+    """
+    return {filename: archive_stat(filename) for filename in set(filenames)}
+
+
+def segments_to_manifest(segments):
+    """
+    Summarises segments, as listed in an index manifest.
+
+    :param segments: segments, as returned by write_segments
+    :type segments: list(tuple)
+    :return: summary
+    :rtype: dict
+    """
+    manifest = {}
+    for name, year, segment, num_pages, num_terms, num_postings \
+            in sorted(segments):
+        summary = manifest.setdefault(name, {}).setdefault(
+            year, {"pages": 0, "terms": 0, "postings": 0, "segments": []})
+        summary["pages"] += num_pages
+        summary["terms"] += num_terms
+        summary["postings"] += num_postings
+        summary["segments"].append(segment)
+    return manifest
+
+
+def read_build_config(config_file):
+    """
+    Reads configuration of an index build job. The configuration
+    file is of form:
+
+        index: <INDEX_DIRECTORY>
+        preprocess: none|normalize|stem|lemmatize, or a list of these
+        raw_preprocess: none|normalize|stem|lemmatize, or a list of these
+        pages_per_segment: <NUM_PAGES>
+
+    A relative index directory is relative to the configuration
+    file. preprocess, how words of the clean text of pages are
+    preprocessed, defaults to normalize. raw_preprocess, how raw words
+    of pages are preprocessed, defaults to none of these, so raw words
+    are not indexed. pages_per_segment defaults to
+    defoe.inverted_index.PAGES_PER_SEGMENT.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :return: index directory, clean and raw word preprocessing types
+    and maximum number of pages per segment
+    :rtype: tuple(str or unicode,
+    list(defoe.query_utils.PreprocessWordType),
+    list(defoe.query_utils.PreprocessWordType), int)
+    :raises: KeyError if "index" is not in config
+    """
+    with open(config_file, "r") as f:
+        config = yaml.safe_load(f)
+    path = config["index"]
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(config_file), path)
+    preprocess_types = []
+    raw_preprocess_types = []
+    for key, default, types in [("preprocess", "normalize", preprocess_types),
+                                ("raw_preprocess", [], raw_preprocess_types)]:
+        preprocess = config.get(key, default)
+        if not isinstance(preprocess, list):
+            preprocess = [preprocess]
+        types.extend(query_utils.parse_preprocess_word_type(name)
+                     for name in preprocess)
+    pages_per_segment = int(config.get("pages_per_segment",
+                                       PAGES_PER_SEGMENT))
+    return path, preprocess_types, raw_preprocess_types, pages_per_segment
+
+
+def find_index(data_file, config_file=None, filenames=None):
+    """
+    Finds an index over the data listed in a data file. This is the
+    directory given by "index" in the query configuration, relative
+    to the configuration file, if any, or else <data_file>.index. An
+    index is only found once built, with its manifest written, and
+    only if it is over the archives queried, unchanged since they
+    were indexed.
+
+    :param data_file: data file listing data files to query
+    :type data_file: str or unicode
+    :param config_file: query configuration file, or None
+    :type config_file: str or unicode
+    :param filenames: archive filenames queried, or None if these are
+    those listed in the data file
+    :type filenames: list(str or unicode)
+    :return: index, or None if there is none
+    :rtype: defoe.inverted_index.InvertedIndex
+    """
+    path = data_file + ".index"
+    if config_file is not None:
+        # Some queries' configuration files are word lists, not YAML.
+        try:
+            with open(config_file, "r") as f:
+                config = yaml.safe_load(f)
+        except yaml.YAMLError:
+            config = None
+        if isinstance(config, dict) and "index" in config:
+            path = config["index"]
+            if not os.path.isabs(path):
+                path = os.path.join(os.path.dirname(config_file), path)
+    if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return None
+    if filenames is None:
+        filenames = [filename.strip() for filename in list(open(data_file))]
+    index = InvertedIndex(path)
+    if not index.matches(filenames):
+        return None
+    return index
+
+
+def table_archive_filenames(df):
+    """
+    Gets archive filenames of the rows of an hdfs, psql or es page
+    table which are indexed, those whose model is TABLE_MODEL.
+
+    :param df: data frame of pages
+    :type df: pyspark.sql.DataFrame
+    :return: archive filenames
+    :rtype: list(str or unicode)
+    """
+    return [row["archive_filename"] for row in
+            df.filter(df["model"] == TABLE_MODEL)
+            .select("archive_filename").distinct().collect()]
+
+
+def parse_year(year):
+    """
+    Parses an indexed year, as held by ALTO-based model documents.
+
+    :param year: year
+    :type year: str or unicode
+    :return: year, or None if the indexed pages have no year
+    :rtype: int
+    """
+    if year == "None":
+        return None
+    return int(year)
+
+
+def count_terms(index, terms, preprocess_type, raw=False):
+    """
+    Counts occurrences of terms in indexed pages, by year.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param terms: terms, preprocessed as the indexed pages were. A
+    term listed more than once is counted once
+    :type terms: list(str or unicode)
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :param raw: if True, count raw words of pages, else words of their
+    clean text
+    :type raw: bool
+    :return: ((year, term), number of occurrences) pairs
+    :rtype: list(tuple(tuple(str or unicode, str or unicode), int))
+    """
+    counts = {}
+    for term in set(terms):
+        for year, _, _, positions in index.lookup(term, preprocess_type,
+                                                  raw=raw):
+            key = (year, term)
+            counts[key] = counts.get(key, 0) + len(positions)
+    return list(counts.items())
+
+
+def count_phrases(index, phrases, preprocess_type):
+    """
+    Counts occurrences of phrases in indexed pages, by year, as
+    keysearch_by_year counts keysentences.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param phrases: phrases, preprocessed as the indexed pages were.
+    A phrase listed more than once is counted once for each time it is
+    listed
+    :type phrases: list(str or unicode)
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :return: ((year, phrase), number of occurrences) pairs
+    :rtype: list(tuple(tuple(str or unicode, str or unicode), int))
+    """
+    counts = {}
+    for phrase in phrases:
+        for year, _, _, positions in index.lookup_phrase(phrase,
+                                                         preprocess_type):
+            key = (year, phrase)
+            counts[key] = counts.get(key, 0) + len(positions)
+    return list(counts.items())
+
+
+def hit_pages(index, phrases, preprocess_type, raw=False):
+    """
+    Gets pages holding any of a list of phrases.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param phrases: phrases, or terms, preprocessed as the indexed
+    pages were
+    :type phrases: list(str or unicode)
+    :param preprocess_type: how words were preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :param raw: if True, search raw words of pages, else words of
+    their clean text
+    :type raw: bool
+    :return: page codes of pages holding phrases, by archive filename
+    :rtype: dict(str or unicode, set(str or unicode))
+    """
+    pages = {}
+    for phrase in set(phrases):
+        for _, archive, page, _ in index.lookup_phrase(phrase,
+                                                       preprocess_type,
+                                                       raw=raw):
+            pages.setdefault(archive, set()).add(page)
+    return pages
+
+
+def open_pages(filename, page_codes, filename_to_object):
+    """
+    Opens an archive restricted to some of its pages.
+
+    :param filename: archive filename
+    :type filename: str or unicode
+    :param page_codes: page codes
+    :type page_codes: list(str or unicode)
+    :param filename_to_object: function creating an archive from a
+    filename, as in defoe.nls.setup
+    :type filename_to_object: function
+    :return: archive, holding only documents with those pages, each
+    holding only those pages, or no archive if it cannot be read
+    :rtype: list(defoe.nls.archive.Archive)
+    """
+    archive, error = filename_to_object(filename)
+    if error is not None:
+        return []
+    archive.select_page_codes(page_codes)
+    return [archive]
+
+
+def select_archives(context, pages, filename_to_object):
+    """
+    Creates an RDD of archives, restricted to the given pages, one
+    archive per partition. Archives which cannot be read are skipped.
+
+    :param context: Spark Context
+    :type context: pyspark.context.SparkContext
+    :param pages: page codes by archive filename, as returned by
+    hit_pages
+    :type pages: dict(str or unicode, set(str or unicode))
+    :param filename_to_object: function creating an archive from a
+    filename, as in defoe.nls.setup
+    :type filename_to_object: function
+    :return: RDD of archives
+    :rtype: pyspark.rdd.PipelinedRDD
+    """
+    archive_pages = sorted((filename, sorted(page_codes))
+                           for filename, page_codes in pages.items())
+    return context.parallelize(archive_pages, max(len(archive_pages), 1)) \
+        .flatMap(lambda filename_pages:
+                 open_pages(filename_pages[0],
+                            filename_pages[1],
+                            filename_to_object))
+
+
+def select_table_pages(df, pages):
+    """
+    Selects rows of an hdfs, psql or es page table for the given
+    pages, filtering by archive filename and page code so that the
+    filters can be pushed down to the data source. Rows of other pages
+    may be selected, whose archive filename is that of one given page
+    and page code that of another, so queries must still match the
+    text of each row.
+
+    :param df: data frame of pages
+    :type df: pyspark.sql.DataFrame
+    :param pages: page codes by archive filename, as returned by
+    hit_pages
+    :type pages: dict(str or unicode, set(str or unicode))
+    :return: data frame of those pages
+    :rtype: pyspark.sql.DataFrame
+    """
+    page_codes = sorted(set(page_code for page_codes in pages.values()
+                            for page_code in page_codes))
+    return df.filter(df["archive_filename"].isin(sorted(pages))) \
+        .filter(df["source_text_filename"].isin(page_codes))
@@ -19,6 +19,8 @@ where:
 * <FILE_CODE> is [0-9_]*
 """
 
+import io
+
 from defoe.nls.archive_combine import AltoArchive
 from defoe.spark_utils import open_stream
 
@@ -78,11 +80,14 @@ class Archive(AltoArchive):
 
     def open_document(self, document_code):
         """
-        Opens metadata file.
+        Opens metadata file, or its content if given to
+        select_pages.
         :param document_code: document file code
         :type document_code: str or unicode
         :return: stream
         """
+        if document_code in self.document_metadata:
+            return io.BytesIO(self.document_metadata[document_code])
         if ".zip" in self.filename:
             return self.zip.open(document_code + '-mets.xml')
         else:
@@ -3,9 +3,12 @@ Object model representation of a page represented as an XML file in
 METS/MODS format.
 """
 
+import math
 
 from lxml import etree
 
+from defoe.alto_utils import NAMESPACED_ALTO_TAGS, parse_alto, tree_nbytes
+
 
 class Page(object):
     """
@@ -27,116 +30,90 @@ class Page(object):
         open the file holding the page via the given "document"
         :type source: zipfile.ZipExt or another file-like object
         """
-        if not source:
-            source = document.archive.open_page(document.code, code)
+        self.document = document
         self.code = code
-        self.tree, self.namespaces = self.alto_parse(source)
-        self.page_tree = self.alto_page()
-        self.width = self.alto_page_width()
-        self.height = self.alto_page_height()
-        self.pc = self.alto_page_pc()
-        self.page_id = self.alto_page_id()
-        self.image_nr = self.alto_image_nr()
-        self.page_words = None
+        self.source = source
+        if not source:
+            source = self.open()
+        self.columns, _ = parse_alto(source, tags=NAMESPACED_ALTO_TAGS)
+        self.width = self.alto_page_int('WIDTH')
+        self.height = self.alto_page_int('HEIGHT')
+        self.pc = self.columns.page.get('PC')
+        self.page_id = self.columns.page.get('ID')
+        self.image_nr = self.columns.page.get('PHYSICAL_IMG_NR')
+        self.page_xml = None
         self.page_strings = None
         self.page_images = None
         self.page_wc = None
         self.page_cc = None
-   
-
 
-    def alto_parse(self, source):
-        xml = etree.parse(source)
-        xmlns = xml.getroot().tag.split('}')[0].strip('{')
-        return xml, xmlns
-
-    def alto_page(self):
-        try:
-            return self.tree.find('//{%s}Page' % self.namespaces)
-        except:
-            return 0 
+    def open(self):
+        """
+        Opens the file holding the page. If a stream was given to the
+        constructor then it is rewound and returned.
 
-    def alto_page_width(self):
+        :return: file name or stream
+        :rtype: str or unicode or file-like object
+        """
+        if not self.source:
+            return self.document.archive.open_page(self.document.code,
+                                                   self.code)
+        if hasattr(self.source, "seek"):
+            self.source.seek(0)
+        return self.source
+
+    def alto_page_int(self, name):
         try:
-            return int(self.page_tree.attrib.get('WIDTH'))
-        except:
+            return int(self.columns.page.get(name))
+        except (TypeError, ValueError):
             return 0
 
-    def alto_page_id(self):
-        try:
-            return self.page_tree.attrib.get('ID')
-        except:
-            return '0'
-    
-    def alto_image_nr(self):
-        try:
-            return self.page_tree.attrib.get('PHYSICAL_IMG_NR')
-        except:
-            return '0'
-
-    def alto_page_height(self):
-        try:
-            return int(self.page_tree.attrib.get('HEIGHT'))
-        except:
-            return 0 
+    @property
+    def tree(self):
+        """
+        Gets the page's XML tree. The tree is only parsed, from a
+        second read of the page, for queries which need elements, such
+        as strings and images.
 
-    def alto_page_pc(self):
-        try:
-            return self.page_tree.attrib.get('PC')
-        except:
-            return '0' 
+        :return: tree
+        :rtype: lxml.etree._ElementTree
+        """
+        if self.page_xml is None:
+            self.page_xml = etree.parse(self.open())
+            page_cache = getattr(self.document, "page_cache", None)
+            if page_cache is not None:
+                page_cache.update(self.code)
+        return self.page_xml
 
     @property
     def words(self):
-        if not self.page_words:
-            page_words=[]
-            for lines in self.tree.iterfind('.//{%s}TextLine' % self.namespaces):
-                for line in lines.findall('{%s}String' % self.namespaces):
-                    text = line.attrib.get('CONTENT')
-                    page_words.append(text)
-            self.page_words = list(map(str,page_words))
-        return self.page_words
+        return self.columns.words
 
     @property
     def wc(self):
-        if not self.page_wc:
-            try:
-                for lines in self.tree.iterfind('.//{%s}TextLine' % self.namespaces):
-                    for line in lines.findall('{%s}String' % self.namespaces):
-                        text = line.attrib.get('WC')
-                        self.page_wc.append(text)
-            except:
-                pass
+        if self.page_wc is None:
+            self.page_wc = [wc for wc in self.columns.wc
+                            if not math.isnan(wc)]
         return self.page_wc
 
     @property
     def cc(self):
-         if not self.page_cc:
-             try:
-                 for lines in self.tree.iterfind('.//{%s}TextLine' % self.namespaces):
-                     for line in lines.findall('{%s}String' % self.namespaces):
-                         text = line.attrib.get('CC')
-                         self.page_cc.append(text)
-             except:
-                 pass
-         return self.page_cc
+        if self.page_cc is None:
+            self.page_cc = [cc for cc in self.columns.cc if cc is not None]
+        return self.page_cc
 
     @property
     def strings(self):
-         if not self.page_strings:
-             try:
-                 for lines in self.tree.iterfind('.//{%s}TextLine' % self.namespaces):
-                     for line in lines.findall('{%s}String' % self.namespaces):
-                         self.page_strings.append(line)
-             except:
-                 pass
-         return self.page_strings
+        if self.page_strings is None:
+            self.page_strings = self.tree.findall('.//{*}TextLine/{*}String')
+        return self.page_strings
 
     @property
     def images(self):
-         if not self.page_images:
+         if self.page_images is None:
+             self.page_images = []
              try:
-                 for graphical in self.tree.iterfind('.//{%s}GraphicalElement' % self.namespaces):
+                 for graphical in self.tree.iterfind('.//{*}GraphicalElement'):
                      graphical_id = graphical.attrib.get('ID')
                      graphical_coords = (graphical.attrib.get('HEIGHT') + ','
                             + graphical.attrib.get('WIDTH') + ','
@@ -159,3 +136,16 @@ class Page(object):
         :rtype: str or unicode
         """
         return ' '.join(self.words)
+
+    @property
+    def nbytes(self):
+        """
+        Gets approximate memory held by the page.
+
+        :return: number of bytes
+        :rtype: int
+        """
+        nbytes = self.columns.nbytes
+        if self.page_xml is not None:
+            nbytes += tree_nbytes(self.page_xml)
+        return nbytes
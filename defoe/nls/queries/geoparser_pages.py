@@ -21,13 +21,21 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     :param archives: RDD of defoe.nls.archive.Archive
     :type archives: pyspark.rdd.PipelinedRDD
-    :param config_file: query configuration file
+    :param config_file: query configuration file, optionally giving
+    batch_size, the number of pages geoparsed by one geoparser run
     :type config_file: str or unicode
     :param logger: logger (unused)
     :type logger: py4j.java_gateway.JavaObject
     :return: "0"
     :rtype: string
     """
+    batch_size = query_utils.GEOPARSER_BATCH_SIZE
+    if config_file is not None and\
+       os.path.exists(config_file) and\
+       os.path.isfile(config_file):
+        with open(config_file, "r") as f:
+            config = yaml.load(f)
+        batch_size = config.get("batch_size", batch_size)
     
     documents = archives.flatMap(
         lambda archive: [(document.year, document.title, document.edition, \
@@ -40,9 +48,8 @@ def do_query(archives, config_file=None, logger=None, context=None):
         lambda year_document: [(year_document[0], year_document[1], year_document[2],\
                                 year_document[3], page.code, page.page_id, clean_page_as_string(page)) for page in year_document[4]])
 
-    geo_xml_pages = pages_clean.flatMap(
-        lambda clean_page: [(clean_page[0], clean_page[1], clean_page[2],\
-                               clean_page[3], clean_page[4], clean_page[5], query_utils.geoparser_cmd(clean_page[6]))])
+    geo_xml_pages = pages_clean.mapPartitions(
+        lambda clean_pages: query_utils.geoparser_resolve_pages(clean_pages, 6, batch_size))
     
      
     matching_pages = geo_xml_pages.map(
@@ -54,7 +61,7 @@ def do_query(archives, config_file=None, logger=None, context=None):
           "page_filename": geo_page[4],
           "text_unit id": geo_page[5],
           "lang_model": "geoparser_original", 
-          "georesolution_page": query_utils.geoparser_coord_xml(geo_page[6])}))
+          "georesolution_page": geo_page[7]}))
 
     
     result = matching_pages \
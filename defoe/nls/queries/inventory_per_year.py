@@ -2,6 +2,8 @@
 Get the editions per year.
 """
 
+from defoe.fused_query import FusedQuery, extend_list
+
 
 def do_query(archives, config_file=None, logger=None, context=None):
     """
@@ -36,3 +38,23 @@ def do_query(archives, config_file=None, logger=None, context=None):
     return result
 
      
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Gets the title and editions per year, as do_query, in a form
+    which can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file (unused)
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    return FusedQuery(
+        extend_list,
+        list,
+        map_document=lambda document: [(document.year,
+                                        [(document.title, document.edition)])])
@@ -7,6 +7,7 @@ from operator import add
 from defoe import query_utils
 from defoe.nls.query_utils import preprocess_clean_page, clean_page_as_string
 from defoe.nls.query_utils import get_sentences_list_matches
+from defoe.fused_query import FusedQuery, group_pairs
 
 import yaml, os
 
@@ -41,24 +42,7 @@ def do_query(archives, config_file=None, logger=None, context=None):
     :return: number of occurrences of keywords grouped by year
     :rtype: dict
     """
-    with open(config_file, "r") as f:
-        config = yaml.load(f)
-    preprocess_type = query_utils.extract_preprocess_word_type(config)
-    data_file = query_utils.extract_data_file(config,
-                                              os.path.dirname(config_file))
-    keysentences = []
-    with open(data_file, 'r') as f:
-        for keysentence in list(f):
-            k_split = keysentence.split()
-            sentence_word = [query_utils.preprocess_word(
-                word, preprocess_type) for word in k_split]
-            sentence_norm = ''
-            for word in sentence_word:
-                if sentence_norm == '':
-                    sentence_norm = word
-                else:
-                    sentence_norm += " " + word
-            keysentences.append(sentence_norm)
+    preprocess_type, keysentences = read_config(config_file)
     # [(year, document), ...]
     documents = archives.flatMap(
         lambda archive: [(document.year, document) for document in list(archive)])
@@ -73,16 +57,14 @@ def do_query(archives, config_file=None, logger=None, context=None):
                                     preprocess_clean_page(cl_page[1], preprocess_type))]) 
     # [(year, page_string)
     # [(year, page_string)
-    filter_pages = pages.filter(
-        lambda year_page: any(
-            keysentence in year_page[1] for keysentence in keysentences))
+    matcher = context.broadcast(query_utils.KeysentenceMatcher(keysentences))
     
     # [(year, [keysentence, keysentence]), ...]
-    matching_pages = filter_pages.map(
+    matching_pages = pages.map(
         lambda year_page: (year_page[0],
                               get_sentences_list_matches(
                                   year_page[1],
-                                  keysentences)))
+                                  matcher.value)))
 
     # [[(year, keysentence), 1) ((year, keysentence), 1) ] ...]
     matching_sentences = matching_pages.flatMap(
@@ -105,3 +87,104 @@ def do_query(archives, config_file=None, logger=None, context=None):
              (year_sentencecount[0], list(year_sentencecount[1]))) \
         .collect()
     return result
+
+
+def read_config(config_file):
+    """
+    Reads how words are to be preprocessed, and the keywords or
+    keysentences to search for, preprocessed likewise, from a
+    configuration file.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :return: preprocess type and keysentences
+    :rtype: tuple(defoe.query_utils.PreprocessWordType,
+    list(str or unicode))
+    """
+    with open(config_file, "r") as f:
+        config = yaml.load(f)
+    preprocess_type = query_utils.extract_preprocess_word_type(config)
+    data_file = query_utils.extract_data_file(config,
+                                              os.path.dirname(config_file))
+    keysentences = []
+    with open(data_file, 'r') as f:
+        for keysentence in list(f):
+            k_split = keysentence.split()
+            sentence_word = [query_utils.preprocess_word(
+                word, preprocess_type) for word in k_split]
+            sentence_norm = ''
+            for word in sentence_word:
+                if sentence_norm == '':
+                    sentence_norm = word
+                else:
+                    sentence_norm += " " + word
+            keysentences.append(sentence_norm)
+    return preprocess_type, keysentences
+
+
+def map_page(page_text, preprocess_type, matcher):
+    """
+    Counts keysentences in a page, for fused_query.
+
+    :param page_text: page and its text
+    :type page_text: defoe.fused_query.PageText
+    :param preprocess_type: how words should be preprocessed
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :param matcher: keysentences matcher
+    :type matcher: defoe.query_utils.KeysentenceMatcher
+    :return: ((year, keysentence), 1) pairs
+    :rtype: list(tuple(tuple(int, str or unicode), int))
+    """
+    text = page_text.preprocessed_clean(preprocess_type)
+    return [((page_text.year, sentence), 1)
+            for sentence in get_sentences_list_matches(text, matcher)]
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Counts number of occurrences of keywords or keysentences and
+    groups by year, as do_query, in a form which can be fused with
+    other queries by defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    preprocess_type, keysentences = read_config(config_file)
+    matcher = query_utils.KeysentenceMatcher(keysentences)
+    return FusedQuery(
+        add,
+        group_pairs,
+        map_page=lambda page_text: map_page(page_text,
+                                            preprocess_type,
+                                            matcher))
+
+
+def index_query(index, archives, config_file=None, logger=None, context=None):
+    """
+    Counts number of occurrences of keywords or keysentences and
+    groups by year, as do_query, from the postings of an index rather
+    than by reading archives.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param archives: RDD of defoe.nls.archive.Archive (unused)
+    :type archives: pyspark.rdd.PipelinedRDD
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: number of occurrences of keywords grouped by year, or
+    None if the index does not hold words preprocessed as configured
+    :rtype: dict
+    """
+    from defoe import inverted_index
+    preprocess_type, keysentences = read_config(config_file)
+    if preprocess_type not in index.preprocess_types():
+        return None
+    counts = inverted_index.count_phrases(index, keysentences, preprocess_type)
+    return group_pairs([((inverted_index.parse_year(year), sentence), count)
+                        for (year, sentence), count in counts])
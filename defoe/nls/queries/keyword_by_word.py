@@ -5,6 +5,7 @@ Counts number of occurrences of keywords and groups by word.
 from operator import add
 
 from defoe import query_utils
+from defoe.fused_query import FusedQuery, group_pairs
 
 
 def do_query(archives, config_file=None, logger=None, context=None):
@@ -69,3 +70,27 @@ def do_query(archives, config_file=None, logger=None, context=None):
              (year_wordcount[0], list(year_wordcount[1]))) \
         .collect()
     return result
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Counts number of occurrences of keywords and groups by word, as
+    do_query, in a form which can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    with open(config_file, "r") as f:
+        keywords = set(query_utils.normalize(word) for word in list(f))
+    normalize = query_utils.PreprocessWordType.NORMALIZE
+    return FusedQuery(
+        add,
+        lambda pairs: group_pairs(pairs, 1),
+        map_page=lambda page_text: [
+            ((page_text.year, word), 1)
+            for word in page_text.words(normalize) if word in keywords])
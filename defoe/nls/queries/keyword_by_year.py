@@ -5,6 +5,7 @@ Counts number of occurrences of keywords and groups by year.
 from operator import add
 
 from defoe import query_utils
+from defoe.fused_query import FusedQuery, group_pairs
 
 import yaml, os
 
@@ -15,6 +16,9 @@ def do_query(archives, config_file=None, logger=None, context=None):
     of the keywords to search for, one per line.
     Both keywords and words in documents are normalized, by removing
     all non-'a-z|A-Z' characters.
+    If the configuration file has "token_ids: True" then the words of
+    each page are held as an array of token IDs, with defoe.token_ids,
+    and keywords are counted with NumPy.
     Returns result of form:
         {
           <YEAR>:
@@ -34,27 +38,31 @@ def do_query(archives, config_file=None, logger=None, context=None):
     :return: number of occurrences of keywords grouped by year
     :rtype: dict
     """
-    with open(config_file, "r") as f:
-        config = yaml.load(f)
-    preprocess_type = query_utils.extract_preprocess_word_type(config)
-    data_file = query_utils.extract_data_file(config,
-                                              os.path.dirname(config_file))
-    keywords = []
-    with open(data_file, 'r') as f:
-        keywords = [query_utils.preprocess_word(
-            word, preprocess_type) for word in list(f)]
+    preprocess_type, keywords, token_ids = read_config(config_file)
     # [(year, document), ...]
     documents = archives.flatMap(
         lambda archive: [(document.year, document) for document in list(archive)])
-    # [((year, word), 1), ...]
-    words = documents.flatMap(
-        lambda year_document: [
-            ((year_document[0], query_utils.preprocess_word(word, preprocess_type)), 1)
-             for page in year_document[1] for word in page.words
-        ])
-    # [((year, word), 1), ...]
-    matching_words = words.filter(
-        lambda yearword_count: yearword_count[0][1] in keywords)
+    if token_ids:
+        from defoe.token_ids import TokenText
+        # [((year, word), num_words), ...]
+        matching_words = documents.flatMap(
+            lambda year_document: [
+                ((year_document[0], word), count)
+                for page in year_document[1]
+                for word, count in TokenText(query_utils.preprocess_words(
+                    page.words, preprocess_type)).keyword_counts(
+                        keywords).items()
+            ])
+    else:
+        # [((year, word), 1), ...]
+        words = documents.flatMap(
+            lambda year_document: [
+                ((year_document[0], query_utils.preprocess_word(word, preprocess_type)), 1)
+                 for page in year_document[1] for word in page.words
+            ])
+        # [((year, word), 1), ...]
+        matching_words = words.filter(
+            lambda yearword_count: yearword_count[0][1] in keywords)
     # [((year, word), num_words), ...]
     # =>
     # [(year, (word, num_words)), ...]
@@ -70,3 +78,90 @@ def do_query(archives, config_file=None, logger=None, context=None):
              (year_wordcount[0], list(year_wordcount[1]))) \
         .collect()
     return result
+
+
+def read_config(config_file):
+    """
+    Reads how words are to be preprocessed, the keywords to search
+    for, preprocessed likewise, and whether words are to be matched as
+    token IDs, from a configuration file.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :return: preprocess type, keywords, and whether to use token IDs
+    :rtype: tuple(defoe.query_utils.PreprocessWordType,
+    list(str or unicode), bool)
+    """
+    with open(config_file, "r") as f:
+        config = yaml.load(f)
+    preprocess_type = query_utils.extract_preprocess_word_type(config)
+    data_file = query_utils.extract_data_file(config,
+                                              os.path.dirname(config_file))
+    with open(data_file, 'r') as f:
+        keywords = [query_utils.preprocess_word(
+            word, preprocess_type) for word in list(f)]
+    return preprocess_type, keywords, query_utils.extract_token_ids(config)
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Counts number of occurrences of keywords and groups by year, as
+    do_query, in a form which can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    preprocess_type, keywords, token_ids = read_config(config_file)
+    if token_ids:
+        return FusedQuery(
+            add,
+            group_pairs,
+            map_page=lambda page_text: [
+                ((page_text.year, word), count)
+                for word, count in page_text.token_text(
+                    preprocess_type).keyword_counts(keywords).items()])
+    keywords = set(keywords)
+    return FusedQuery(
+        add,
+        group_pairs,
+        map_page=lambda page_text: [
+            ((page_text.year, word), 1)
+            for word in page_text.words(preprocess_type) if word in keywords])
+
+
+def index_query(index, archives, config_file=None, logger=None, context=None):
+    """
+    Counts number of occurrences of keywords and groups by year, as
+    do_query, from the postings of an index of the raw words of pages
+    rather than by reading archives. Counts from an index of the clean
+    text of pages would differ from do_query's, so the query is only
+    run from an index of raw words preprocessed as configured.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param archives: RDD of defoe.nls.archive.Archive (unused)
+    :type archives: pyspark.rdd.PipelinedRDD
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: number of occurrences of keywords grouped by year, or
+    None if the index does not hold raw words preprocessed as
+    configured, or a keyword is not a term, as given by
+    defoe.inverted_index.is_term
+    :rtype: dict
+    """
+    from defoe import inverted_index
+    preprocess_type, keywords, _ = read_config(config_file)
+    if preprocess_type not in index.preprocess_types(raw=True) or \
+            not all(inverted_index.is_term(word) for word in keywords):
+        return None
+    counts = inverted_index.count_terms(index, keywords, preprocess_type,
+                                        raw=True)
+    return group_pairs([((inverted_index.parse_year(year), word), count)
+                        for (year, word), count in counts])
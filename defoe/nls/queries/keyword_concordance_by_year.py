@@ -4,6 +4,7 @@ Gets concordance for keywords and groups by year.
 
 from defoe import query_utils
 from defoe.nls.query_utils import get_page_matches
+from defoe.nls.setup import filename_to_object
 
 
 def do_query(archives, config_file=None, logger=None, context=None):
@@ -83,3 +84,43 @@ def do_query(archives, config_file=None, logger=None, context=None):
              (year_context[0], list(year_context[1]))) \
         .collect()
     return result
+
+
+def index_query(index, archives, config_file=None, logger=None, context=None):
+    """
+    Gets concordance for keywords and groups by year, as do_query,
+    reading only the pages which an index of the raw words of pages
+    lists as holding keywords. An index of the clean text of pages
+    would miss pages whose keywords are only found before cleaning,
+    so the query is only run from an index of normalized raw words.
+    Archives are opened by the filenames the index lists, which
+    defoe.inverted_index.find_index checks are those of the archives
+    queried.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param archives: RDD of defoe.nls.archive.Archive (unused)
+    :type archives: pyspark.rdd.PipelinedRDD
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: information on documents in which keywords occur grouped
+    by year, or None if the index does not hold normalized raw words,
+    or a keyword is not a term, as given by
+    defoe.inverted_index.is_term
+    :rtype: dict
+    """
+    from defoe import inverted_index
+    preprocess_type = query_utils.PreprocessWordType.NORMALIZE
+    with open(config_file, "r") as f:
+        keywords = [query_utils.normalize(word) for word in list(f)]
+    if preprocess_type not in index.preprocess_types(raw=True) or \
+            not all(inverted_index.is_term(word) for word in keywords):
+        return None
+    pages = inverted_index.hit_pages(index, keywords, preprocess_type,
+                                     raw=True)
+    archives = inverted_index.select_archives(context,
+                                              pages,
+                                              filename_to_object)
+    return do_query(archives, config_file, logger, context)
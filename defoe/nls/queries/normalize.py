@@ -5,6 +5,8 @@ This can be useful if wanting to see how the average number of
 documents, pages and words change over time, for example.
 """
 
+from defoe.fused_query import FusedQuery
+
 
 def do_query(archives, config_file=None, logger=None, context=None):
     """
@@ -42,3 +44,25 @@ def do_query(archives, config_file=None, logger=None, context=None):
         .map(lambda year_data: (year_data[0], list(year_data[1]))) \
         .collect()
     return result
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Counts total number of documents, pages and words per year, as
+    do_query, in a form which can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file (unused)
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    return FusedQuery(
+        lambda x, y: [i + j for i, j in zip(x, y)],
+        list,
+        map_document=lambda document: [(document.year,
+                                        [1, document.num_pages, 0])],
+        map_page=lambda page_text: [(page_text.year,
+                                     [0, 0, len(page_text.page.words)])])
@@ -3,6 +3,8 @@ Gets measure of OCR quality for each page and groups by year.
 """
 
 from operator import concat
+
+from defoe.fused_query import FusedQuery, extend_list
 from defoe.nls.query_utils import calculate_words_within_dictionary
 
 def do_query(archives, config_file=None, logger=None, context=None):
@@ -38,3 +40,26 @@ def do_query(archives, config_file=None, logger=None, context=None):
              (year_q[0], list(year_q[1]))) \
         .collect()
     return result
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Gets measure of OCR quality (PC), and calculates the number of
+    words found in a dictionary for each page and groups by year, as
+    do_query, in a form which can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file (unused)
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    return FusedQuery(
+        extend_list,
+        list,
+        map_page=lambda page_text: [
+            (page_text.year,
+             [[page_text.page.pc,
+               calculate_words_within_dictionary(page_text.page)]])])
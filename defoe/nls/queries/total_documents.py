@@ -2,6 +2,10 @@
 Counts total number of documents.
 """
 
+from operator import add
+
+from defoe.fused_query import FusedQuery
+
 
 def do_query(archives, config_file=None, logger=None, context=None):
     """
@@ -23,3 +27,22 @@ def do_query(archives, config_file=None, logger=None, context=None):
     documents = archives.flatMap(lambda archive: list(archive))
     num_documents = documents.count()
     return {"num_documents": num_documents}
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Counts total number of documents, as do_query, in a form which
+    can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file (unused)
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    return FusedQuery(
+        add,
+        lambda pairs: dict({"num_documents": 0}, **dict(pairs)),
+        map_document=lambda document: [("num_documents", 1)])
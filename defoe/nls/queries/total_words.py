@@ -4,6 +4,8 @@ Counts total number of words.
 
 from operator import add
 
+from defoe.fused_query import FusedQuery
+
 
 def do_query(archives, config_file=None, logger=None, context=None):
     """
@@ -33,3 +35,23 @@ def do_query(archives, config_file=None, logger=None, context=None):
     result = [documents.count(), num_words.reduce(add)]
     return {"num_documents": result[0],
             "num_words": result[1]}
+
+
+def fused_query(config_file=None, logger=None):
+    """
+    Counts total number of documents and total number of words, as
+    do_query, in a form which can be fused with other queries by
+    defoe.fused_query.run_fused_queries.
+
+    :param config_file: query configuration file (unused)
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: query
+    :rtype: defoe.fused_query.FusedQuery
+    """
+    return FusedQuery(
+        add,
+        lambda pairs: dict({"num_documents": 0, "num_words": 0}, **dict(pairs)),
+        map_document=lambda document: [("num_documents", 1)],
+        map_page=lambda page_text: [("num_words", len(page_text.page.words))])
@@ -22,3 +22,63 @@ def filename_to_object(filename):
     except Exception as exception:
         result = (filename, str(exception))
     return result
+
+
+def filename_to_work_units(filename, pages_per_unit):
+    """
+    Given a filename, create a defoe.nls.archive.Archive and split
+    its documents into work units of at most pages_per_unit pages,
+    reading each document's metadata once. If an error arises this is
+    caught and returned as a string.
+
+    :param filename: filename
+    :type filename: str or unicode
+    :param pages_per_unit: maximum number of pages per work unit
+    :type pages_per_unit: int
+    :return: tuple of form ((work units, metadata), None) or
+    (filename, error message), if there was an error creating Archive,
+    where work units are as returned by Archive.list_work_units and
+    metadata is metadata file content keyed by document code
+    :rtype: tuple(tuple(list(tuple), dict(str or unicode, bytes)) |
+    str or unicode, str or unicode)
+    """
+    try:
+        archive = Archive(filename)
+        metadata = {document_code: archive.read_document_metadata(document_code)
+                    for document_code in archive.document_codes}
+        result = ((archive.list_work_units(pages_per_unit), metadata), None)
+    except Exception as exception:
+        result = (filename, str(exception))
+    return result
+
+
+def work_unit_to_object(work_unit, document_metadata):
+    """
+    Given a work unit, create a defoe.nls.archive.Archive restricted
+    to its pages. If an error arises during its creation this is
+    caught and returned as a string.
+
+    :param work_unit: archive filename, document code, and start and
+    end index of pages
+    :type work_unit: tuple(str or unicode, str or unicode, int, int)
+    :param document_metadata: metadata file content keyed by archive
+    filename and document code
+    :type document_metadata: dict(tuple(str or unicode, str or unicode),
+    bytes)
+    :return: tuple of form (Archive, None) or (work unit, error
+    message), if there was an error creating Archive
+    :rtype: tuple(defoe.nls.archive.Archive | str or unicode, str or
+    unicode)
+    """
+    filename, document_code, start, end = work_unit
+    try:
+        archive = Archive(filename)
+        archive.select_pages(document_code,
+                             start,
+                             end,
+                             document_metadata.get((filename, document_code)))
+        result = (archive, None)
+    except Exception as exception:
+        result = ("{}:{}:{}-{}".format(filename, document_code, start, end),
+                  str(exception))
+    return result
@@ -7,10 +7,9 @@ import abc
 import re
 import zipfile
 
+from defoe.archive_manifest import directory_members, get_manifest, zip_members
 from defoe.nlsArticles.document import Document
 from defoe.spark_utils import open_stream
-from os import listdir
-from os.path import isfile, join
 
 
 class AltoArchive(object, metaclass=abc.ABCMeta):
@@ -27,28 +26,150 @@ class AltoArchive(object, metaclass=abc.ABCMeta):
         :type: filename: str or unicode
         """
         self.filename = filename
-        if ".zip" in self.filename:
+        self.archive_zip = None
+        self.manifest = get_manifest(self)
+        self.filenames = self.manifest["filenames"]
+        self.members = self.manifest["members"]
+        self.document_codes = self.manifest["document_codes"]
+        self.document_metadata = {}
+
+    @property
+    def zip(self):
+        """
+        Gets ZIP file, opening it on first use, so an archive whose
+        manifest has been read only reads the ZIP file once a member
+        is opened.
+
+        :return: ZIP file
+        :rtype: zipfile.ZipFile
+        """
+        if self.archive_zip is None:
             stream = open_stream(self.filename)
-            self.zip = zipfile.ZipFile(stream)
-            self.filenames = [entry.filename for entry in self.zip.infolist()]
-        else:
-             self.filenames= []
-             for entry in listdir(self.filename):
-                  if not isfile(join(self.filename, entry)):
-                      for i in listdir(join(self.filename,entry)):
-                          self.filenames.append(entry+"/"+i)
-                  else:
-                      self.filenames.append(entry)
+            self.archive_zip = zipfile.ZipFile(stream)
+        return self.archive_zip
+
+    def __getstate__(self):
+        """
+        Gets state for pickling: the archive's filename and manifest,
+        and any pages and metadata selected with select_pages. The ZIP
+        file, if open, is reopened on first use after unpickling.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"filename": self.filename,
+                "manifest": self.manifest,
+                "document_codes": self.document_codes,
+                "document_metadata": self.document_metadata}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.filename = state["filename"]
+        self.archive_zip = None
+        self.manifest = state["manifest"]
+        self.filenames = self.manifest["filenames"]
+        self.members = self.manifest["members"]
+        self.document_codes = state["document_codes"]
+        self.document_metadata = state["document_metadata"]
+
+    def list_members(self):
+        """
+        Lists members of archive.
+
+        :return: member names, offset, compressed size and size keyed by
+        member name, and directories within archive directory
+        :rtype: tuple(list(str or unicode), dict(str or unicode,
+        list(int)), list(str or unicode))
+        """
+        if ".zip" in self.filename:
+            filenames, members = zip_members(self.zip)
+            return filenames, members, []
+        return directory_members(self.filename, recurse=True)
+
+    def find_document_codes(self, filenames):
+        """
+        Finds documents and their pages in archive members, with
+        each document's pages sorted by Document.sorter.
+
+        :param filenames: member names
+        :type filenames: list(str or unicode)
+        :return: sorted page codes keyed by document code
+        :rtype: dict(str or unicode, list(str or unicode))
+        """
         document_pattern = re.compile(self.get_document_pattern())
         page_pattern = re.compile(self.get_page_pattern())
         document_matches = [
-            _f for _f in [document_pattern.match(name) for name in self.filenames] if _f]
+            _f for _f in [document_pattern.match(name) for name in filenames] if _f]
         page_matches = [
-            _f for _f in [page_pattern.match(name) for name in self.filenames] if _f]
-        self.document_codes = {match.group(1): [] for match in document_matches}
-        document_name=list(self.document_codes.keys())[0]
+            _f for _f in [page_pattern.match(name) for name in filenames] if _f]
+        document_codes = {match.group(1): [] for match in document_matches}
+        document_name=list(document_codes.keys())[0]
         for match in page_matches:
-            self.document_codes[document_name].append(match.group(0))
+            document_codes[document_name].append(match.group(0))
+        for page_codes in document_codes.values():
+            page_codes.sort(key=Document.sorter)
+        return document_codes
+
+    def list_work_units(self, pages_per_unit):
+        """
+        Splits each document into work units of consecutive pages, in
+        page order, which can be queried independently. A document
+        with no pages has one work unit.
+
+        :param pages_per_unit: maximum number of pages per work unit
+        :type pages_per_unit: int
+        :return: archive filename, document code, and start and end
+        index of pages, for each work unit
+        :rtype: list(tuple(str or unicode, str or unicode, int, int))
+        """
+        work_units = []
+        for document_code, page_codes in self.document_codes.items():
+            num_pages = len(page_codes)
+            for start in range(0, max(num_pages, 1), pages_per_unit):
+                work_units.append((self.filename,
+                                   document_code,
+                                   start,
+                                   min(start + pages_per_unit, num_pages)))
+        return work_units
+
+    def read_document_metadata(self, document_code):
+        """
+        Reads metadata file.
+
+        :param document_code: document file code
+        :type document_code: str or unicode
+        :return: metadata file content
+        :rtype: bytes
+        """
+        with self.open_document(document_code) as f:
+            return f.read()
+
+    def select_pages(self, document_code, start, end, metadata=None):
+        """
+        Restricts archive to a range of pages of one document, so
+        that iterating over the archive yields that document holding
+        only those pages.
+
+        :param document_code: document file code
+        :type document_code: str or unicode
+        :param start: index of first page, in page order
+        :type start: int
+        :param end: index after last page
+        :type end: int
+        :param metadata: metadata file content, as returned by
+        read_document_metadata, used in place of the metadata file
+        :type metadata: bytes
+        """
+        page_codes = sorted(self.document_codes[document_code],
+                            key=Document.sorter)
+        self.document_codes = {document_code: page_codes[start:end]}
+        if metadata is not None:
+            self.document_metadata[document_code] = metadata
 
     def __getitem__(self, index):
         """
@@ -6,12 +6,15 @@ import re
 
 from lxml import etree
 from defoe.nlsArticles.page import Page
+from defoe.page_cache import PageCache
+from defoe.parse_on_use import ParseOnUse
 
 
-class Document(object):
+class Document(ParseOnUse):
     """
     Object model representation of a document represented as a
-    collection of XML files in METS/MODS format.
+    collection of XML files in METS/MODS format. Its metadata is parsed
+    on first use.
     """
 
     def __init__(self, code, archive):
@@ -29,14 +32,22 @@ class Document(object):
         }
         self.archive = archive
         self.code = code
-        self.num_pages = 0
+        self.page_cache = PageCache()
+        self.page_codes = sorted(self.archive.document_codes[self.code], key=Document.sorter)
+        self.num_pages = len(self.page_codes)
+        self.document_type = "book"
+        self.model = "nlsArticles"
+        self.parsed = False
+
+    def parse(self):
+        """
+        Parses the document's metadata.
+        """
+        self.parsed = True
         self.metadata = self.archive.open_document(self.code)
         self.metadata_tree = etree.parse(self.metadata)
         self.title = self.single_query('//mods:title/text()')
         self.edition = self.single_query('//mods:partName/text()')
-        self.page_codes = sorted(self.archive.document_codes[self.code], key=Document.sorter)
-        #sorted(self.archive.document_codes[self.code], key=Document.sorter)
-        self.num_pages = len(self.page_codes)
         self.years = \
             Document.parse_year(self.single_query('//mods:dateIssued/text()'))
         self.publisher = self.single_query('//mods:publisher/text()')
@@ -49,8 +60,26 @@ class Document(object):
         else:
             self.year = None
         self.date = self.single_query('//mods:dateIssued/text()')
-        self.document_type = "book"
-        self.model = "nlsArticles"
+
+    def __getstate__(self):
+        """
+        Gets state for pickling: the document's code and archive. The
+        document's metadata and pages are parsed again on first use once
+        unpickled.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"code": self.code, "archive": self.archive}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.__init__(state["code"], state["archive"])
 
     @staticmethod
     def parse_year(text):
@@ -134,6 +163,19 @@ class Document(object):
         return str(result[0])
 
     def page(self, code):
+        """
+        Given a page code, return a Page object. Pages are cached, so
+        a page is only parsed again if it has been evicted from the
+        cache.
+
+        :param code: page code
+        :type code: str or unicode
+        :return: Page object
+        :rtype: defoe.alto.page.Page
+        """
+        return self.page_cache.get(code, self.load_page)
+
+    def load_page(self, code):
         """
         Given a page code, return a new Page object.
 
@@ -168,7 +210,7 @@ class Document(object):
 
     def __getitem__(self, index):
         """
-        Given a page index, return a new Page object.
+        Given a page index, return a Page object.
 
         :param index: page index
         :type index: int
@@ -179,7 +221,7 @@ class Document(object):
 
     def __iter__(self):
         """
-        Iterate over page codes, returning new Page objects.
+        Iterate over page codes, returning Page objects.
 
         :return: Page object
         :rtype: defoe.alto.page.Page
@@ -6,6 +6,8 @@ METS/MODS format.
 
 from lxml import etree
 
+from defoe.alto_utils import tree_nbytes
+
 
 class Page(object):
     """
@@ -251,3 +253,13 @@ class Page(object):
         :rtype: str or unicode
         """
         return ' '.join(self.words)
+
+    @property
+    def nbytes(self):
+        """
+        Gets approximate memory held by the page.
+
+        :return: number of bytes
+        :rtype: int
+        """
+        return tree_nbytes(self.tree)
@@ -0,0 +1,69 @@
+"""
+Builds a positional inverted index over pages, by year and word
+preprocessing type.
+"""
+
+from defoe import inverted_index
+
+
+def do_query(archives, config_file=None, logger=None, context=None):
+    """
+    Iterate through archives and index the clean, preprocessed words
+    of each page, writing the index segments and manifest, as
+    described in defoe.inverted_index.
+
+    config_file must be the path to a configuration file of form:
+
+        index: <INDEX_DIRECTORY>
+        preprocess: none|normalize|stem|lemmatize, or a list of these
+        raw_preprocess: none|normalize|stem|lemmatize, or a list of these
+        pages_per_segment: <NUM_PAGES>
+
+    preprocess gives how words of the clean text of pages are
+    preprocessed, and raw_preprocess how raw page words are.
+
+    Returns result of form:
+
+        {
+          "archives":
+          {
+            <ARCHIVE_FILENAME>: {"": [<MTIME_NS>, <SIZE>]} | None,
+            ...
+          },
+          "preprocess":
+          {
+            <INDEX_NAME>:
+            {
+              <YEAR>:
+              {
+                "pages": <NUM_PAGES>,
+                "terms": <NUM_TERMS>,
+                "postings": <NUM_POSTINGS>,
+                "segments": [<SEGMENT>, ...]
+              },
+              ...
+            },
+            ...
+          }
+        }
+
+    :param archives: RDD of defoe.nlsArticles.archive.Archive
+    :type archives: pyspark.rdd.PipelinedRDD
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: summary of index
+    :rtype: dict
+    """
+    path, preprocess_types, raw_preprocess_types, pages_per_segment = \
+        inverted_index.read_build_config(config_file)
+    # [(index_name, year, archive_filename, page_code, words), ...]
+    pages = archives.flatMap(
+        lambda archive: inverted_index.archive_to_pages(
+            archive, preprocess_types, raw_preprocess_types))
+    # [archive_filename, ...]
+    filenames = archives.map(lambda archive: archive.filename) \
+        .distinct().collect()
+    return inverted_index.build_index(pages, filenames, path,
+                                      pages_per_segment)
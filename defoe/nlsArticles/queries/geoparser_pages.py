@@ -21,13 +21,21 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     :param archives: RDD of defoe.nls.archive.Archive
     :type archives: pyspark.rdd.PipelinedRDD
-    :param config_file: query configuration file
+    :param config_file: query configuration file, optionally giving
+    batch_size, the number of pages geoparsed by one geoparser run
     :type config_file: str or unicode
     :param logger: logger (unused)
     :type logger: py4j.java_gateway.JavaObject
     :return: "0"
     :rtype: string
     """
+    batch_size = query_utils.GEOPARSER_BATCH_SIZE
+    if config_file is not None and\
+       os.path.exists(config_file) and\
+       os.path.isfile(config_file):
+        with open(config_file, "r") as f:
+            config = yaml.load(f)
+        batch_size = config.get("batch_size", batch_size)
     
     documents = archives.flatMap(
         lambda archive: [(document.title, document.edition, document.year, \
@@ -41,9 +49,8 @@ def do_query(archives, config_file=None, logger=None, context=None):
                                page.code, page.page_id, clean_page_as_string(page)) for page in year_document[3]])
 
     
-    geo_xml_pages = pages_clean.flatMap(
-        lambda clean_page: [(clean_page[0], clean_page[1], clean_page[2],\
-                               clean_page[3], clean_page[4], query_utils.geoparser_cmd(clean_page[5]))])
+    geo_xml_pages = pages_clean.mapPartitions(
+        lambda clean_pages: query_utils.geoparser_resolve_pages(clean_pages, 5, batch_size))
     
     
     matching_pages = geo_xml_pages.map(
@@ -54,7 +61,7 @@ def do_query(archives, config_file=None, logger=None, context=None):
           "page_filename": geo_page[3],
           "text_unit id": geo_page[4],
           "lang_model": "geoparser_original",
-          "georesolution_page": query_utils.geoparser_coord_xml(geo_page[5])}))
+          "georesolution_page": geo_page[6]}))
 
     
     result = matching_pages \
@@ -21,13 +21,21 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     :param archives: RDD of defoe.nls.archive.Archive
     :type archives: pyspark.rdd.PipelinedRDD
-    :param config_file: query configuration file
+    :param config_file: query configuration file, optionally giving
+    batch_size, the number of pages geoparsed by one geoparser run
     :type config_file: str or unicode
     :param logger: logger (unused)
     :type logger: py4j.java_gateway.JavaObject
     :return: "0"
     :rtype: string
     """
+    batch_size = query_utils.GEOPARSER_BATCH_SIZE
+    if config_file is not None and\
+       os.path.exists(config_file) and\
+       os.path.isfile(config_file):
+        with open(config_file, "r") as f:
+            config = yaml.load(f)
+        batch_size = config.get("batch_size", batch_size)
     
     text_unit = "page"
     # [(tittle, edition, year, place, archive filename, num pages, 
@@ -47,13 +55,10 @@ def do_query(archives, config_file=None, logger=None, context=None):
                                clean_page_as_string(page)) for page in year_document[8]])
     
     # [(tittle, edition, year, place, archive filename, page filename, text_unit, text_unit_id, 
-    #   num_text_unit, type of archive, type of disribution, model, clean_page, georesolution_xml_page)]
+    #   num_text_unit, type of archive, type of disribution, model, clean_page, georesolution_page)]
     
-    geo_xml_pages = pages_clean.flatMap(
-        lambda clean_page: [(clean_page[0], clean_page[1], clean_page[2],\
-                               clean_page[3], clean_page[4], clean_page[5], clean_page[6], clean_page[7], \
-                               clean_page[8], clean_page[9], clean_page[10], clean_page[11],\
-                               query_utils.geoparser_cmd(clean_page[11]))])
+    geo_xml_pages = pages_clean.mapPartitions(
+        lambda clean_pages: query_utils.geoparser_resolve_pages(clean_pages, 11, batch_size))
     
     
     #matching_pages = geo_xml_pages.map(
@@ -82,7 +87,7 @@ def do_query(archives, config_file=None, logger=None, context=None):
           "page_filename": geo_page[5],
           "text_unit id": geo_page[7],
           "lang_model": "geoparser_original",
-          "georesolution_page": query_utils.geoparser_coord_xml(geo_page[12])}))
+          "georesolution_page": geo_page[12]}))
 
     
     result = matching_pages \
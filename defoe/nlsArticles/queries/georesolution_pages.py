@@ -3,7 +3,7 @@ Identify the locations per page and geo-resolve them.
 """
 
 from defoe import query_utils
-from defoe.nls.query_utils import clean_page_as_string, georesolve_page_2
+from defoe.nls.query_utils import clean_page_as_string, georesolve_page
 from pyspark.sql import Row, SparkSession, SQLContext
 
 import yaml, os
@@ -21,7 +21,9 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     :param archives: RDD of defoe.nls.archive.Archive
     :type archives: pyspark.rdd.PipelinedRDD
-    :param config_file: query configuration file
+    :param config_file: query configuration file, giving lang_model and
+    optionally batch_size and n_process, the number of pages per batch and
+    of processes used by spaCy
     :type config_file: str or unicode
     :param logger: logger (unused)
     :type logger: py4j.java_gateway.JavaObject
@@ -32,6 +34,8 @@ def do_query(archives, config_file=None, logger=None, context=None):
         config = yaml.load(f)
     
     lang_model = config["lang_model"]
+    batch_size = config.get("batch_size", query_utils.SPACY_BATCH_SIZE)
+    n_process = config.get("n_process", 1)
     documents = archives.flatMap(
         lambda archive: [(document.title, document.edition, document.year, \
                           document) for document in list(archive)])
@@ -40,7 +44,10 @@ def do_query(archives, config_file=None, logger=None, context=None):
         lambda year_document: [(year_document[0], year_document[1], year_document[2],\
                                page.code, page.page_id, clean_page_as_string(page)) for page in year_document[3]])
 
-    matching_pages = pages_clean.map(
+    spacy_pages = pages_clean.mapPartitions(
+        lambda clean_pages: query_utils.spacy_nlp_pages(clean_pages, 5, lang_model, batch_size=batch_size, n_process=n_process))
+
+    matching_pages = spacy_pages.map(
         lambda geo_page:
         (geo_page[0],
          {"edition": geo_page[1],
@@ -48,7 +55,7 @@ def do_query(archives, config_file=None, logger=None, context=None):
           "page_filename": geo_page[3],
           "text_unit id": geo_page[4],
           "lang_model": lang_model,
-          "georesolution_page": georesolve_page_2(geo_page[5],lang_model)}))
+          "georesolution_page": georesolve_page(geo_page[6])}))
     
     result = matching_pages \
         .groupByKey() \
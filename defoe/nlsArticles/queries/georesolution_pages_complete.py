@@ -21,7 +21,9 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     :param archives: RDD of defoe.nls.archive.Archive
     :type archives: pyspark.rdd.PipelinedRDD
-    :param config_file: query configuration file
+    :param config_file: query configuration file, giving lang_model and
+    optionally batch_size and n_process, the number of pages per batch and
+    of processes used by spaCy
     :type config_file: str or unicode
     :param logger: logger (unused)
     :type logger: py4j.java_gateway.JavaObject
@@ -32,6 +34,8 @@ def do_query(archives, config_file=None, logger=None, context=None):
         config = yaml.load(f)
     
     lang_model = config["lang_model"]
+    batch_size = config.get("batch_size", query_utils.SPACY_BATCH_SIZE)
+    n_process = config.get("n_process", 1)
     text_unit = "page"
     # [(tittle, edition, year, place, archive filename, num pages, 
     # type of archive, model, document)]
@@ -51,11 +55,8 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     # [(tittle, edition, year, place, archive filename, page filename, text_unit, text_unit_id, 
     #   num_text_unit, type of archive, type of disribution, model, clean_page, georesolution_loc)]
-    spacy_docs = pages_clean.flatMap(
-        lambda clean_page: [(clean_page[0], clean_page[1], clean_page[2],\
-                               clean_page[3], clean_page[4], clean_page[5], clean_page[6], clean_page[7], \
-                               clean_page[8], clean_page[9], clean_page[10], clean_page[11],\
-                               query_utils.spacy_nlp(clean_page[11], lang_model))])
+    spacy_docs = pages_clean.mapPartitions(
+        lambda clean_pages: query_utils.spacy_nlp_pages(clean_pages, 11, lang_model, batch_size=batch_size, n_process=n_process))
 
     matching_docs = spacy_docs.map(
         lambda spacy_doc:
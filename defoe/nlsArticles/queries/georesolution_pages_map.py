@@ -48,11 +48,8 @@ def do_query(archives, config_file=None, logger=None, context=None):
 
     # [(tittle, edition, year, place, archive filename, page filename, text_unit, text_unit_id, 
     #   num_text_unit, type of archive, type of disribution, model, clean_page, georesolution_loc)]
-    spacy_docs = pages_clean.flatMap(
-        lambda clean_page: [(clean_page[0], clean_page[1], clean_page[2],\
-                               clean_page[3], clean_page[4], clean_page[5], clean_page[6], clean_page[7], \
-                               clean_page[8], clean_page[9], clean_page[10], clean_page[11],\
-                               query_utils.spacy_nlp(clean_page[11]))])
+    spacy_docs = pages_clean.mapPartitions(
+        lambda clean_pages: query_utils.spacy_nlp_pages(clean_pages, 11))
 
     matching_docs = spacy_docs.map(
         lambda spacy_doc:
@@ -73,16 +73,14 @@ def do_query(archives, config_file=None, logger=None, context=None):
                                     preprocess_clean_page(cl_page[1], preprocess_type))]) 
     # [(year, page_string)
     # [(year, page_string)
-    filter_pages = pages.filter(
-        lambda year_page: any(
-            keysentence in year_page[1] for keysentence in keysentences))
+    matcher = context.broadcast(query_utils.KeysentenceMatcher(keysentences))
     
     # [(year, [keysentence, keysentence]), ...]
-    matching_pages = filter_pages.map(
+    matching_pages = pages.map(
         lambda year_page: (year_page[0],
                               get_sentences_list_matches(
                                   year_page[1],
-                                  keysentences)))
+                                  matcher.value)))
 
     # [[(year, keysentence), 1) ((year, keysentence), 1) ] ...]
     matching_sentences = matching_pages.flatMap(
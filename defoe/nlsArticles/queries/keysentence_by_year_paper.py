@@ -12,7 +12,7 @@ import yaml
 
 from defoe import query_utils
 from defoe.papers.query_utils import get_article_as_string
-from defoe.papers.query_utils import get_sentences_list_matches
+from defoe.query_utils import get_sentences_list_matches
 
 
 def do_query(archives, config_file=None, logger=None, context=None):
@@ -79,16 +79,14 @@ def do_query(archives, config_file=None, logger=None, context=None):
             article, preprocess_type)) for article in issue.articles])
 
     # [(year, article_string)
-    filter_articles = articles.filter(
-        lambda year_article: any(
-            keysentence in year_article[1] for keysentence in keysentences))
+    matcher = context.broadcast(query_utils.KeysentenceMatcher(keysentences))
 
     # [(year, [keysentence, keysentence]), ...]
-    matching_articles = filter_articles.map(
+    matching_articles = articles.map(
         lambda year_article: (year_article[0],
                               get_sentences_list_matches(
                                   year_article[1],
-                                  keysentences)))
+                                  matcher.value)))
 
     # [[(year, keysentence), 1) ((year, keysentence), 1) ] ...]
     matching_sentences = matching_articles.flatMap(
@@ -4,6 +4,7 @@ Pages as string to HDFS CSv files (using dataframes), and some metadata associat
 
 from defoe import query_utils
 from defoe.nls.query_utils import get_page_as_string, clean_page_as_string, preprocess_clean_page
+from pyspark import StorageLevel
 from pyspark.sql import Row, SparkSession, SQLContext
 
 import yaml, os
@@ -47,6 +48,11 @@ def do_query(archives, config_file=None, logger=None, context=None):
                                year_document[3], year_document[4], page.code, text_unit, page.page_id, \
                                year_document[5], year_document[6], year_document[7], get_page_as_string(page, preprocess_none), \
                                clean_page_as_string(page), len(page.words)) for page in year_document[8]])
+    # Keep clean pages for both the vocabulary and the write.
+    pages_clean.persist(StorageLevel.MEMORY_AND_DISK)
+    # {stem|lemmatize: {normalized word: preprocessed word}}
+    vocabulary_maps = query_utils.build_vocabulary_maps(
+        pages_clean.map(lambda clean_page: clean_page[12]), context)
     # [(tittle, edition, year, place, archive filename, page filename, text_unit, text_unit_id, 
     #   num_text_unit, type of archive, type of disribution, model, raw_page, clean_page, clean_norm_page, clean_lemma_page, clean_stemm_page, num_words)]
     pages = pages_clean.flatMap(
@@ -54,11 +60,12 @@ def do_query(archives, config_file=None, logger=None, context=None):
                                clean_page[3], clean_page[4], clean_page[5], clean_page[6], clean_page[7], \
                                clean_page[8], clean_page[9], clean_page[10], clean_page[11],\
                                clean_page[12], preprocess_clean_page(clean_page[12], preprocess_normalize),\
-                               preprocess_clean_page(clean_page[12], preprocess_lemmatize), preprocess_clean_page(clean_page[12], preprocess_stem), clean_page[13])])
+                               preprocess_clean_page(clean_page[12], preprocess_lemmatize, vocabulary_maps.value), preprocess_clean_page(clean_page[12], preprocess_stem, vocabulary_maps.value), clean_page[13])])
 
     nlsRow=Row("title",  "edition", "year", "place", "archive_filename",  "source_text_filename", "text_unit", "text_unit_id", "num_text_unit", "type_archive", "model", "source_text_raw", "source_text_clean", "source_text_norm", "source_text_lemmatize", "source_text_stem", "num_words")
    
     sqlContext = SQLContext(context)
     df = sqlContext.createDataFrame(pages,nlsRow)
     df.write.mode('overwrite').option("header","true").csv("hdfs:///user/at003/rosa/nls_demo.csv")
+    pages_clean.unpersist()
     return "0"
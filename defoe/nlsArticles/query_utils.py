@@ -2,15 +2,11 @@
 Query-related utility functions.
 """
 
-from defoe import query_utils
-from defoe.query_utils import PreprocessWordType, longsfix_sentence, xml_geo_entities, georesolve_cmd,  coord_xml, geomap_cmd, geoparser_cmd, geoparser_coord_xml
-from nltk.corpus import words
+from defoe import bloom_filters, query_utils
+from defoe.query_utils import PreprocessWordType, xml_geo_entities, geomap_cmd
+from defoe.query_utils import geo_entities, georesolve_toponyms, geoparser_resolve, spacy_nlp
 import re
-import spacy
-from spacy.tokens import Doc
-from spacy.vocab import Vocab
 NON_AZ_REGEXP = re.compile('[^a-z]')
-from nltk.corpus import words
 
 
 
@@ -65,19 +61,22 @@ def get_page_matches(document,
     :return: list of tuples
     :rtype: list(tuple)
     """
+    # Scan each page once for all keywords, then list matches by
+    # keyword then page, as would scanning pages once per keyword.
+    keyword_set = set(keywords)
+    page_keywords = []
+    for page in bloom_filters.candidate_pages(document,
+                                              keywords,
+                                              preprocess_type):
+        found = keyword_set.intersection(
+            query_utils.preprocess_words(page.words, preprocess_type))
+        if found:
+            page_keywords.append((page, found))
     matches = []
     for keyword in keywords:
-        for page in document:
-            match = None
-            for word in page.words:
-                preprocessed_word = query_utils.preprocess_word(
-                    word, preprocess_type)
-                if preprocessed_word == keyword:
-                    match = (document.year, document, page, keyword)
-                    break
-            if match:
-                matches.append(match)
-                continue  # move to next page
+        for page, found in page_keywords:
+            if keyword in found:
+                matches.append((document.year, document, page, keyword))
     return matches
 
 
@@ -97,13 +96,11 @@ def get_document_keywords(document,
     :return: sorted list of keywords that occur within article
     :rtype: list(str or unicode)
     """
+    keyword_set = set(keywords)
     matches = set()
     for page in document:
-        for word in page.words:
-            preprocessed_word = query_utils.preprocess_word(word,
-                                                            preprocess_type)
-            if preprocessed_word in keywords:
-                matches.add(preprocessed_word)
+        matches.update(keyword_set.intersection(
+            query_utils.preprocess_words(page.words, preprocess_type)))
     return sorted(list(matches))
 
 
@@ -123,7 +120,9 @@ def document_contains_word(document,
     :return: True if the article contains the word, false otherwise
     :rtype: bool
     """
-    for page in document:
+    for page in bloom_filters.candidate_pages(document,
+                                              [keyword],
+                                              preprocess_type):
         for word in page.words:
             preprocessed_word = query_utils.preprocess_word(word,
                                                             preprocess_type)
@@ -144,20 +143,8 @@ def calculate_words_within_dictionary(page,
     :return: matches
     :rtype: list(str or unicode)
     """
-    dictionary = words.words()
-    counter= 0
-    total_words= 0
-    for word in page.words:
-         preprocessed_word = query_utils.preprocess_word(word, preprocess_type)
-         if preprocessed_word!="":
-            total_words += 1
-            if  preprocessed_word in dictionary:
-               counter +=  1
-    try:
-       calculate_pc = str(counter*100/total_words)
-    except:
-       calculate_pc = "0" 
-    return calculate_pc
+    return query_utils.calculate_words_within_dictionary(page.words,
+                                                         preprocess_type)
 
 def calculate_words_confidence_average(page):
     """
@@ -170,16 +157,7 @@ def calculate_words_confidence_average(page):
     :return: matches
     :rtype: list(str or unicode)
     """
-    dictionary = words.words()
-    counter= 0
-    total_wc= 0
-    for wc in page.wc:
-               total_wc += float(wc)
-    try:
-       calculate_wc = str(total_wc/len(page.wc))
-    except:
-       calculate_wc = "0" 
-    return calculate_wc
+    return query_utils.calculate_words_confidence_average(page.wc)
 
 def get_page_as_string(page,
                           preprocess_type=PreprocessWordType.LEMMATIZE):
@@ -194,15 +172,8 @@ def get_page_as_string(page,
     :return: page words as a string
     :rtype: string or unicode
     """
-    page_string = ''
-    for word in page.words:
-        preprocessed_word = query_utils.preprocess_word(word,
-                                                         preprocess_type)
-        if page_string == '':
-            page_string = preprocessed_word
-        else:
-            page_string += (' ' + preprocessed_word)
-    return page_string
+    return query_utils.join_words(
+        query_utils.preprocess_words(page.words, preprocess_type))
 
 
 def clean_text_as_string(text, flag):
@@ -210,45 +181,19 @@ def clean_text_as_string(text, flag):
     Clean a text as a single string,
     Handling hyphenated words: combine and split and also fixing the long-s
 
+    :param text: words
+    :type text: list(str or unicode)
+    :param flag: 0 to join the clean words with ' ', 1 to concatenate
+    them (used for headers)
+    :type flag: int
+    :return: clean text
+    :rtype: string or unicode
     """
-    text_string = ''
-    for word in text:
-        if text_string == '':
-            text_string = word 
-        else:
-            text_string += (' ' + word)
-
-   
-    text_separeted = text_string.split('- ')
-    text_combined = ''.join(text_separeted)
-   
-    if (len(text_combined) > 1) and ('f' in text_combined): 
-       
-       text_clean = longsfix_sentence(text_combined) 
-    else:
-        text_clean= text_combined
-
-    text_final=text_clean.split()
-    text_string_final = ''
-    for word in text_final:
-        if flag == 0 :
-            if "." not in word:
-                separated_str = re.sub(r'([a-z](?=[A-Z])|[A-Z](?=[A-Z][a-z]))', r'\1 ', word)
-            else:
-                separated_str = word
-
-            if text_string_final == '':
-                 text_string_final = separated_str
-            else:
-                text_string_final += (' ' + separated_str)
-        else:
-            separated_str = re.sub(r'([a-z](?=[A-Z])|[A-Z](?=[A-Z][a-z]))', r'\1 ', word)
-            if text_string_final == '':
-                 text_string_final = separated_str
-            else:
-                text_string_final += separated_str
-
-    return text_string_final
+    text_final = query_utils.clean_words(text)
+    if flag == 0:
+        return ' '.join(query_utils.split_camel_case_words(text_final))
+    return ''.join(query_utils.CAMEL_CASE_REGEXP.sub(r'\1 ', word)
+                   for word in text_final)
 
 def clean_headers_page_as_string(page):
     """
@@ -269,45 +214,43 @@ def clean_headers_page_as_string(page):
     return header_left_string_final, header_right_string_final, page_string_final
 
 def preprocess_clean_page(clean_page,
-                          preprocess_type=PreprocessWordType.LEMMATIZE):
-
+                          preprocess_type=PreprocessWordType.LEMMATIZE,
+                          vocabulary_maps=None):
+    """
+    Preprocess the words of a clean page.
 
-    clean_list = clean_page.split(' ') 
-    page_string = ''
-    for word in clean_list:
-        preprocessed_word = query_utils.preprocess_word(word,
-                                                         preprocess_type)
-        if page_string == '':
-            page_string = preprocessed_word
-        else:
-            page_string += (' ' + preprocessed_word)
-    return page_string
+    :param clean_page: clean page, as returned by clean_page_as_string
+    :type clean_page: string or unicode
+    :param preprocess_type: how words should be preprocessed
+    (normalize, normalize and stem, normalize and lemmatize, none)
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :param vocabulary_maps: precomputed preprocessed words, as built
+    by defoe.query_utils.build_vocabulary_maps, or None
+    :type vocabulary_maps: dict
+    :return: preprocessed page words as a string
+    :rtype: string or unicode
+    """
+    clean_list = clean_page.split(' ')
+    return query_utils.join_words(
+        query_utils.preprocess_words(clean_list,
+                                     preprocess_type,
+                                     vocabulary_maps))
 
 def get_sentences_list_matches(text, keysentence):
     """
-    Check which key-sentences from occurs within a string
-    and return the list of matches.
+    Check which key-sentences occur, as whole words, within a string
+    and return the list of matches. See
+    defoe.query_utils.KeysentenceMatcher.
 
     :param text: text
     :type text: str or unicode
-    :type: list(str or uniocde)
-    :return: Set of sentences
-    :rtype: set(str or unicode)
+    :param keysentence: key-sentences, or their matcher
+    :type keysentence: list(str or unicode) or
+    defoe.query_utils.KeysentenceMatcher
+    :return: matching key-sentences, once per match, sorted
+    :rtype: list(str or unicode)
     """
-    match = []
-    text_list= text.split()
-    for sentence in keysentence:
-        if len(sentence.split()) > 1:
-            if sentence in text:
-                count = text.count(sentence)
-                for i in range(0, count):
-                    match.append(sentence)
-        else:
-            pattern = re.compile(r'^%s$'%sentence)
-            for word in text_list:
-                if re.search(pattern, word):
-                    match.append(sentence)
-    return sorted(match)
+    return query_utils.get_sentences_list_matches(text, keysentence)
 
 
 def preprocess_clean_page_spacy(clean_page,
@@ -315,20 +258,12 @@ def preprocess_clean_page_spacy(clean_page,
 
 
     clean_list = clean_page.split(' ')
-    page_string = ''
-    for word in clean_list:
-        preprocessed_word = query_utils.preprocess_word(word,
-                                                         preprocess_type)
-        if page_string == '':
-            page_string = preprocessed_word
-        else:
-            page_string += (' ' + preprocessed_word)
-    return page_string
+    return query_utils.join_words(
+        query_utils.preprocess_words(clean_list, preprocess_type))
 
 
 def preprocess_clean_page_spacy(clean_page):
-    nlp = spacy.load('en')
-    doc = nlp(clean_page)
+    doc = spacy_nlp(clean_page)
     page_nlp_spacy=[]
     for i, word in enumerate(doc):
         word_normalized=re.sub(NON_AZ_REGEXP, '', word.text.lower())
@@ -338,13 +273,11 @@ def preprocess_clean_page_spacy(clean_page):
 
 
 def georesolve_page_2(text, lang_model):
-    nlp = spacy.load(lang_model)
-    doc = nlp(text)
+    doc = spacy_nlp(text, lang_model)
     if doc.ents:
-        flag,in_xml = xml_geo_entities(doc)
-        if flag == 1:
-            geo_xml=georesolve_cmd(in_xml)
-            dResolved_loc= coord_xml(geo_xml)
+        toponyms = geo_entities(doc)
+        if toponyms:
+            dResolved_loc= georesolve_toponyms(toponyms)
             return dResolved_loc
         else:
            return {}
@@ -353,10 +286,9 @@ def georesolve_page_2(text, lang_model):
 
 def georesolve_page(doc):
     if doc.ents:
-        flag,in_xml = xml_geo_entities(doc)
-        if flag == 1:
-            geo_xml=georesolve_cmd(in_xml)
-            dResolved_loc= coord_xml(geo_xml)
+        toponyms = geo_entities(doc)
+        if toponyms:
+            dResolved_loc= georesolve_toponyms(toponyms)
             print(dResolved_loc)
             return dResolved_loc
         else:
@@ -365,9 +297,7 @@ def georesolve_page(doc):
         return {}
 
 def geoparser_page(text):
-    geo_xml=geoparser_cmd(text)
-    dResolved_loc= geoparser_coord_xml(geo_xml)
-    return dResolved_loc
+    return geoparser_resolve(text)
 
 
 
@@ -387,13 +317,15 @@ def get_text_keyword_idx(text,
     Gets a list of keywords (and their position indices) within an
     article.
 
-    :param text: text
-    :type article: string
+    :param text: text, or its token IDs
+    :type article: string or defoe.token_ids.TokenText
     :param keywords: keywords
     :type keywords: list(str or unicode)
     :return: sorted list of keywords and their indices
     :rtype: list(tuple(str or unicode, int))
     """
+    if not isinstance(text, str):
+        return text.keyword_positions(keywords)
     text_list= text.split()
     matches = set()
     for idx, word in enumerate(text_list):
@@ -410,8 +342,8 @@ def get_concordance(text,
     For a given keyword (and its position in an article), return
     the concordance of words (before and after) using a window.
 
-    :param text: text
-    :type text: string 
+    :param text: text, or its token IDs
+    :type text: string or defoe.token_ids.TokenText
     :param keyword: keyword
     :type keyword: str or unicode
     :param idx: keyword index (position) in list of article's words
@@ -421,6 +353,8 @@ def get_concordance(text,
     :return: concordance
     :rtype: list(str or unicode)
     """
+    if not isinstance(text, str):
+        return text.concordance(idx, window)
     text_list= text.split()
     text_size = len(text_list)
 
@@ -518,6 +452,7 @@ def get_header_eb(header_left, header_right):
     return type, header
 
 def get_articles_page(text, text_list, terms_view, num_words):
+        from nltk.corpus import words
         articles_page={}
         latin_view=[s in words.words() for s in text_list]
         key='previous_page'
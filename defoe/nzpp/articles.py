@@ -6,13 +6,15 @@ New Zealand Papers Past represented as an XML document.
 from lxml import etree
 
 from defoe.nzpp.article import Article
+from defoe.parse_on_use import ParseOnUse
 from defoe.spark_utils import open_stream
 
 
-class Articles(object):
+class Articles(ParseOnUse):
     """
     Object model representation of a collaction of articles from
-    New Zealand Papers Past represented as an XML document.
+    New Zealand Papers Past represented as an XML document. The XML
+    document is parsed on first use.
     """
 
     def __init__(self, filename):
@@ -23,13 +25,39 @@ class Articles(object):
         :type: filename: str or unicode
         """
         self.filename = filename
+        self.document_type = "newspaper"
+        self.model = "nzpp"
+        self.parsed = False
+
+    def parse(self):
+        """
+        Parses the XML document.
+        """
+        self.parsed = True
         stream = open_stream(self.filename)
         parser = etree.XMLParser(recover=True)
         self.xml_tree = etree.parse(stream, parser)
         self.articles = [Article(article, self.filename)
                          for article in self.query('.//result')]
-        self.document_type = "newspaper"
-        self.model = "nzpp"
+
+    def __getstate__(self):
+        """
+        Gets state for pickling: the filename. The file is parsed again
+        on first use once unpickled.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"filename": self.filename}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.__init__(state["filename"])
 
     def query(self, query):
         """
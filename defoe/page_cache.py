@@ -0,0 +1,121 @@
+"""
+Cache of the pages of a document, so a document can be iterated more
+than once without parsing its pages again.
+"""
+
+from collections import OrderedDict
+import os
+
+PAGE_CACHE_ENV = "DEFOE_PAGE_CACHE_BYTES"
+""" Environment variable giving page cache size in bytes """
+PAGE_CACHE_BYTES = 32 * 1024 * 1024
+""" Page cache size in bytes per document, if PAGE_CACHE_ENV is unset """
+
+
+def get_page_cache_bytes():
+    """
+    Gets page cache size from the DEFOE_PAGE_CACHE_BYTES environment
+    variable, or PAGE_CACHE_BYTES if it is unset or invalid. A size of
+    0 disables caching.
+
+    :return: number of bytes
+    :rtype: int
+    """
+    try:
+        return max(0, int(os.environ.get(PAGE_CACHE_ENV, PAGE_CACHE_BYTES)))
+    except ValueError:
+        return PAGE_CACHE_BYTES
+
+
+class PageCache(object):
+    """
+    Least-recently-used cache of pages, bounded by the approximate
+    memory the pages hold, as given by their nbytes property. Pages
+    larger than the cache are not cached. Pages which grow once
+    cached, for example by parsing their XML tree, are measured again
+    by update.
+    """
+
+    def __init__(self, max_bytes=None):
+        """
+        Constructor.
+
+        :param max_bytes: cache size in bytes. If None then
+        get_page_cache_bytes() is used
+        :type max_bytes: int
+        """
+        if max_bytes is None:
+            max_bytes = get_page_cache_bytes()
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        """
+        Gets number of cached pages.
+
+        :return: number of pages
+        :rtype: int
+        """
+        return len(self._pages)
+
+    def get(self, code, load):
+        """
+        Gets a page, loading it, and caching it, if it is not cached.
+
+        :param code: page code
+        :type code: str or unicode
+        :param load: function to load page given its code
+        :type load: function
+        :return: page
+        """
+        if code in self._pages:
+            self.hits += 1
+            self._pages.move_to_end(code)
+            return self._pages[code][0]
+        self.misses += 1
+        page = load(code)
+        if self.max_bytes == 0:
+            return page
+        self._add(code, page)
+        return page
+
+    def update(self, code):
+        """
+        Measures a cached page again, evicting pages, including this
+        one, if the cache has grown too large.
+
+        :param code: page code
+        :type code: str or unicode
+        """
+        if code not in self._pages:
+            return
+        page, nbytes = self._pages.pop(code)
+        self.nbytes -= nbytes
+        self._add(code, page)
+
+    def _add(self, code, page):
+        """
+        Adds a page, if it is no larger than the cache, evicting
+        least-recently-used pages to stay within size.
+
+        :param code: page code
+        :type code: str or unicode
+        :param page: page
+        """
+        nbytes = page.nbytes
+        if nbytes <= self.max_bytes:
+            self._pages[code] = (page, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._pages.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def clear(self):
+        """
+        Removes all pages from the cache.
+        """
+        self._pages.clear()
+        self.nbytes = 0
@@ -0,0 +1,176 @@
+"""
+Compact, picklable records of documents and their pages, holding the
+metadata, words and clean text that queries use most, so that a
+parsed corpus can be persisted by Spark and reused by a list of
+queries without reading and parsing its archives again.
+
+A list of document records stands in for an archive, a document
+record for a document and a page record for a page, for queries
+which use only the attributes recorded.
+"""
+
+import sys
+
+from defoe import query_utils
+
+DOCUMENT_ATTRIBUTES = ["code", "title", "edition", "years", "year",
+                       "publisher", "place", "date", "document_type",
+                       "model", "num_pages"]
+""" Document attributes recorded, if the document has them """
+PAGE_ATTRIBUTES = ["code", "page_id", "pc", "width", "height", "image_nr"]
+""" Page attributes recorded, if the page has them """
+PREPROCESS_TYPES = [query_utils.PreprocessWordType.NORMALIZE]
+"""
+Types of preprocessing applied to the clean text of each page when it
+is recorded. Others are applied on first use.
+"""
+
+
+class ArchiveRecord(object):
+    """
+    Record of the archive holding a document.
+    """
+
+    def __init__(self, filename):
+        """
+        Constructor.
+
+        :param filename: archive filename
+        :type filename: str or unicode
+        """
+        self.filename = filename
+
+
+class DocumentRecord(object):
+    """
+    Record of a document and its pages.
+    """
+
+    def __init__(self, document, preprocess_types=PREPROCESS_TYPES):
+        """
+        Constructor. Reads all of the document's pages.
+
+        :param document: document
+        :type document: defoe.nls.document.Document
+        :param preprocess_types: types of preprocessing to apply to
+        the clean text of each page
+        :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+        """
+        for name in DOCUMENT_ATTRIBUTES:
+            setattr(self, name, getattr(document, name, None))
+        self.archive = ArchiveRecord(document.archive.filename)
+        self.pages = [PageRecord(self, page, preprocess_types)
+                      for page in document]
+
+    def __iter__(self):
+        """
+        Iterate over page records.
+
+        :return: page record
+        :rtype: defoe.page_records.PageRecord
+        """
+        return iter(self.pages)
+
+    def scan_words(self):
+        """
+        Iterate over words in pages.
+
+        :return: page record and word
+        :rtype: tuple(defoe.page_records.PageRecord, str or unicode)
+        """
+        for page in self.pages:
+            for word in page.words:
+                yield page, word
+
+    def words(self):
+        """
+        Iterate over words.
+
+        :return: word
+        :rtype: str or unicode
+        """
+        for _, word in self.scan_words():
+            yield word
+
+    @property
+    def nbytes(self):
+        """
+        Gets approximate memory held by the record's pages.
+
+        :return: number of bytes
+        :rtype: int
+        """
+        return sum(page.nbytes for page in self.pages)
+
+
+class PageRecord(object):
+    """
+    Record of a page's attributes, words, word confidences, and clean
+    text, as preprocessed by defoe.fused_query.PageText.
+    """
+
+    def __init__(self, document, page, preprocess_types=PREPROCESS_TYPES):
+        """
+        Constructor.
+
+        :param document: record of document holding page
+        :type document: defoe.page_records.DocumentRecord
+        :param page: page
+        :type page: defoe.nls.page.Page
+        :param preprocess_types: types of preprocessing to apply to
+        the clean text
+        :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+        """
+        self.document = document
+        for name in PAGE_ATTRIBUTES:
+            setattr(self, name, getattr(page, name, None))
+        self.words = list(page.words)
+        self.wc = list(page.wc)
+        self.clean_text = " ".join(query_utils.split_camel_case_words(
+            query_utils.clean_words(self.words)))
+        clean_words = self.clean_text.split(" ")
+        self.preprocessed_clean_texts = {
+            preprocess_type: query_utils.join_words(
+                query_utils.preprocess_words(clean_words, preprocess_type))
+            for preprocess_type in preprocess_types}
+
+    @property
+    def content(self):
+        """
+        Gets all words in page and concatenates together using ' ' as
+        delimiter.
+
+        :return: content
+        :rtype: str or unicode
+        """
+        return " ".join(self.words)
+
+    @property
+    def nbytes(self):
+        """
+        Gets approximate memory held by the record.
+
+        :return: number of bytes
+        :rtype: int
+        """
+        nbytes = sum(sys.getsizeof(word) for word in self.words)
+        nbytes += 8 * (len(self.words) + len(self.wc))
+        nbytes += sys.getsizeof(self.clean_text)
+        return nbytes + sum(sys.getsizeof(text) for text in
+                            self.preprocessed_clean_texts.values())
+
+
+def archive_to_records(archive, preprocess_types=PREPROCESS_TYPES):
+    """
+    Reads all documents and pages of an archive into records.
+
+    :param archive: archive
+    :type archive: defoe.nls.archive.Archive
+    :param preprocess_types: types of preprocessing to apply to the
+    clean text of each page
+    :type preprocess_types: list(defoe.query_utils.PreprocessWordType)
+    :return: document records
+    :rtype: list(defoe.page_records.DocumentRecord)
+    """
+    return [DocumentRecord(document, preprocess_types)
+            for document in archive]
@@ -19,26 +19,37 @@ from datetime import datetime
 from lxml import etree
 
 from defoe.papers.article import Article
+from defoe.parse_on_use import ParseOnUse
 from defoe.spark_utils import open_stream
 
 
-class Issue(object):
+class Issue(ParseOnUse):
     """
     Object model representation of an issue of a newspaper represented
-    as an XML document.
+    as an XML document. The XML document is parsed on first use.
     """
 
     def __init__(self, filename):
         """
-        Constructor. If the filename cannot be parsed into valid XML
-        an empty document is created.
+        Constructor.
 
         :param filename: XML filename
         :type: filename: str or unicode
         """
         self.filename = filename
-        stream = open_stream(self.filename)
+        self.document_type = "newspaper"
+        self.model = "papers"
+        self.parsed = False
+
+    def parse(self):
+        """
+        Parses the XML document. If it is invalid XML, as much of it
+        as can be is parsed.
 
+        :raises Exception: if the document has no issue element
+        """
+        self.parsed = True
+        stream = open_stream(self.filename)
         self.issue_tree = None
         self.issue = ''
         self.newspaper_id = ''
@@ -46,8 +57,6 @@ class Issue(object):
         self.date = datetime.now()
         self.page_count = 0
         self.day_of_week = ''
-        self.document_type = "newspaper"
-        self.model = "papers"
         # Attempt to parse the file, even if its XML is invalid e.g:
         # <wd ...>.../wd>
         parser = etree.XMLParser(recover=True)
@@ -85,6 +94,25 @@ class Issue(object):
         except Exception:
             pass
 
+    def __getstate__(self):
+        """
+        Gets state for pickling: the filename. The file is parsed again
+        on first use once unpickled.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"filename": self.filename}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.__init__(state["filename"])
+
     def query(self, query):
         """
         Run XPath query.
@@ -2,9 +2,7 @@
 Query-related utility functions.
 """
 
-from nltk.corpus import stopwords
-
-from defoe import query_utils
+from defoe import bloom_filters, query_utils
 from defoe.query_utils import PreprocessWordType, longsfix_sentence
 from defoe.query_utils import PreprocessWordType
 import re
@@ -90,6 +88,11 @@ def article_contains_word(article,
     :return: True if the article contains the word, false otherwise
     :rtype: bool
     """
+    if not bloom_filters.might_contain(article.filename,
+                                       article.article_id,
+                                       [keyword],
+                                       preprocess_type):
+        return False
     for word in article.words:
         preprocessed_word = query_utils.preprocess_word(word,
                                                         preprocess_type)
@@ -111,6 +114,7 @@ def article_stop_words_removal(article,
     :return: article words without stop words
     :rtype: list(str or unicode)
     """
+    from nltk.corpus import stopwords
     stop_words = set(stopwords.words('english'))
     article_words = []
     for word in article.words:
@@ -133,14 +137,8 @@ def get_article_as_string(article,
     :return: article words as a string
     :rtype: string or unicode
     """
-    article_string = ''
-    for word in article.words:
-        preprocessed_word = query_utils.preprocess_word(word, preprocess_type)
-        if article_string == '':
-            article_string = preprocessed_word
-        else:
-            article_string += (' ' + preprocessed_word)
-    return article_string
+    return query_utils.join_words(
+        query_utils.preprocess_words(article.words, preprocess_type))
 
 
 def get_sentences_list_matches_2(text, keysentence):
@@ -242,16 +240,7 @@ def clean_article_as_string(article):
     :return: clean article words as a string
     :rtype: string or unicode
     """
-    article_string = ''
-    for word in article.words:
-        if article_string == '':
-            article_string = word
-        else:
-            article_string += (' ' + word)
-
-    article_separete = article_string.split('- ')
-    article_combined = ''.join(article_separete)
-   
+    article_combined = query_utils.join_words(article.words).replace('- ', '')
     if (len(article_combined) > 1) and ('f' in article_combined): 
        article_clean = longsfix_sentence(article_combined) 
        return article_clean
@@ -260,18 +249,21 @@ def clean_article_as_string(article):
 
 def preprocess_clean_article(clean_article,
                           preprocess_type=PreprocessWordType.LEMMATIZE):
+    """
+    Preprocess the words of a clean article.
 
-
-    clean_list = clean_article.split(' ') 
-    article_string = ''
-    for word in clean_list:
-        preprocessed_word = query_utils.preprocess_word(word,
-                                                         preprocess_type)
-        if article_string == '':
-            article_string = preprocessed_word
-        else:
-            article_string += (' ' + preprocessed_word)
-    return article_string
+    :param clean_article: clean article, as returned by
+    clean_article_as_string
+    :type clean_article: string or unicode
+    :param preprocess_type: how words should be preprocessed
+    (normalize, normalize and stem, normalize and lemmatize, none)
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :return: preprocessed article words as a string
+    :rtype: string or unicode
+    """
+    clean_list = clean_article.split(' ')
+    return query_utils.join_words(
+        query_utils.preprocess_words(clean_list, preprocess_type))
 
 def get_sentences_list_matches(text, sentence):
     """
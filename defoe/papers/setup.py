@@ -9,7 +9,8 @@ def filename_to_object(filename):
     """
     Given a filename create a defoe.papers.issue.Issue.  If an error
     arises during its creation this is caught and returned as a
-    string.
+    string. The file is parsed on first use, as by
+    defoe.parse_on_use.parse_or_error.
 
     :param filename: filename
     :type filename: str or unicode
@@ -0,0 +1,57 @@
+"""
+Objects which parse their XML on first use, rather than when they are
+created or unpickled, so that a persisted RDD of them can be read
+without parsing every file again.
+"""
+
+
+class ParseOnUse(object):
+    """
+    Base class of objects whose attributes are read from XML by their
+    parse method. Subclass constructors set parsed to False, and parse
+    sets it to True, so parse is called on first use of any attribute
+    the object does not yet have.
+    """
+
+    def __getattr__(self, name):
+        """
+        Parses the XML, on first use of an attribute it sets.
+
+        :param name: attribute name
+        :type name: str or unicode
+        :return: attribute value
+        :raises AttributeError: if the XML has been, or is being,
+        parsed and the object has no such attribute
+        """
+        if name.startswith("__") or self.__dict__.get("parsed", True):
+            raise AttributeError(name)
+        self.parse()
+        return getattr(self, name)
+
+    def parse(self):
+        """
+        Parses the XML, setting the attributes read from it.
+        """
+        raise NotImplementedError
+
+
+def parse_or_error(result):
+    """
+    Parses an object created by a setup module's filename_to_object,
+    if it parses its XML on first use and has not yet done so, so that
+    invalid files are found as the object is first used.
+
+    :param result: tuple of form (object, None) or (filename, error
+    message)
+    :type result: tuple(Object | str or unicode, str or unicode)
+    :return: tuple of form (object, None) or (filename, error
+    message), if there was an error parsing object
+    :rtype: tuple(Object | str or unicode, str or unicode)
+    """
+    obj, error = result
+    if error is None and isinstance(obj, ParseOnUse) and not obj.parsed:
+        try:
+            obj.parse()
+        except Exception as exception:
+            return (obj.filename, str(exception))
+    return result
@@ -50,9 +50,6 @@ def do_query(df, config_file=None, logger=None, context=None):
     with open(config_file, "r") as f:
         config = yaml.load(f)
     preprocess_config = config["preprocess"]
-    preprocess_type = query_utils.extract_preprocess_word_type(config)
-    data_file = query_utils.extract_data_file(config,
-                                              os.path.dirname(config_file))
     
     # Filter out the pages that are null, which model is nls, and select only 2 columns: year and the page as string (either raw or preprocessed).
     if preprocess_config == "normalize":
@@ -69,31 +66,18 @@ def do_query(df, config_file=None, logger=None, context=None):
         newdf=fdf.filter(fdf.source_text_clean.isNotNull()).filter(fdf["model"]=="nls").select(fdf.year, fdf.source_text_clean)
    
     pages=newdf.rdd.map(tuple)
-    keysentences = []
-    with open(data_file, 'r') as f:
-        for keysentence in list(f):
-            k_split = keysentence.split()
-            sentence_word = [query_utils.preprocess_word(
-                word, preprocess_type) for word in k_split]
-            sentence_norm = ''
-            for word in sentence_word:
-                if sentence_norm == '':
-                    sentence_norm = word
-                else:
-                    sentence_norm += " " + word
-            keysentences.append(sentence_norm)
+    preprocess_type, keysentences = read_config(config_file)
     
 
-    filter_pages = pages.filter(
-        lambda year_page: any( keysentence in year_page[1] for keysentence in keysentences))
+    matcher = context.broadcast(query_utils.KeysentenceMatcher(keysentences))
     
     # [(year, [keysentence, keysentence]), ...]
     # We also need to convert the string as an integer spliting first the '.
-    matching_pages = filter_pages.map(
+    matching_pages = pages.map(
         lambda year_page: (year_page[0],
                               get_sentences_list_matches(
                                   year_page[1],
-                                  keysentences)))
+                                  matcher.value)))
     
 
     # [[(year, keysentence), 1) ((year, keysentence), 1) ] ...]
@@ -117,3 +101,64 @@ def do_query(df, config_file=None, logger=None, context=None):
              (year_sentencecount[0], list(year_sentencecount[1]))) \
         .collect()
     return result
+
+
+def read_config(config_file):
+    """
+    Reads how words are to be preprocessed, and the keywords or
+    keysentences to search for, preprocessed likewise, from a
+    configuration file.
+
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :return: preprocess type and keysentences
+    :rtype: tuple(defoe.query_utils.PreprocessWordType,
+    list(str or unicode))
+    """
+    with open(config_file, "r") as f:
+        config = yaml.load(f)
+    preprocess_type = query_utils.extract_preprocess_word_type(config)
+    data_file = query_utils.extract_data_file(config,
+                                              os.path.dirname(config_file))
+    keysentences = []
+    with open(data_file, 'r') as f:
+        for keysentence in list(f):
+            k_split = keysentence.split()
+            sentence_word = [query_utils.preprocess_word(
+                word, preprocess_type) for word in k_split]
+            sentence_norm = ''
+            for word in sentence_word:
+                if sentence_norm == '':
+                    sentence_norm = word
+                else:
+                    sentence_norm += " " + word
+            keysentences.append(sentence_norm)
+    return preprocess_type, keysentences
+
+
+def index_query(index, df, config_file=None, logger=None, context=None):
+    """
+    Counts number of occurrences of keywords or keysentences and
+    groups by year, as do_query, from the postings of an index rather
+    than by reading pages.
+
+    :param index: index
+    :type index: defoe.inverted_index.InvertedIndex
+    :param df: data frame of pages (unused)
+    :type df: pyspark.sql.DataFrame
+    :param config_file: query configuration file
+    :type config_file: str or unicode
+    :param logger: logger (unused)
+    :type logger: py4j.java_gateway.JavaObject
+    :return: number of occurrences of keywords grouped by year, or
+    None if the index does not hold words preprocessed as configured
+    :rtype: dict
+    """
+    from defoe import inverted_index
+    from defoe.fused_query import group_pairs
+    preprocess_type, keysentences = read_config(config_file)
+    if preprocess_type not in index.preprocess_types():
+        return None
+    return group_pairs(inverted_index.count_phrases(index,
+                                                    keysentences,
+                                                    preprocess_type))
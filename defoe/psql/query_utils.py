@@ -1,35 +1,24 @@
 """
 Query-related utility functions.
 """
-import re
 from defoe import query_utils
 from pyspark.sql.functions import col, when
 
 def get_sentences_list_matches(text, keysentence):
     """
-    Check which key-sentences from occurs within a string
-    and return the list of matches.
+    Check which key-sentences occur, as whole words, within a string
+    and return the list of matches. See
+    defoe.query_utils.KeysentenceMatcher.
 
     :param text: text
     :type text: str or unicode
-    :type: list(str or uniocde)
-    :return: Set of sentences
-    :rtype: set(str or unicode)
+    :param keysentence: key-sentences, or their matcher
+    :type keysentence: list(str or unicode) or
+    defoe.query_utils.KeysentenceMatcher
+    :return: matching key-sentences, once per match, sorted
+    :rtype: list(str or unicode)
     """
-    match = []
-    text_list= text.split()
-    for sentence in keysentence:
-        if len(sentence.split()) > 1:
-            if sentence in text:
-                count = text.count(sentence)
-                for i in range(0, count):
-                    match.append(sentence)
-        else:
-            pattern = re.compile(r'^%s$'%sentence)
-            for word in text_list:
-                if re.search(pattern, word):
-                    match.append(sentence)
-    return sorted(match)
+    return query_utils.get_sentences_list_matches(text, keysentence)
 
 def blank_as_null(x):
     return when(col(x) != "", col(x)).otherwise(None)
@@ -2,19 +2,63 @@
 Query-related utility functions and types.
 """
 
+import datetime
+import hashlib
 import os
-import subprocess
 import re
 import enum
+from collections import deque
+from functools import lru_cache
+from itertools import dropwhile, islice, tee
+from xml.sax.saxutils import escape
 from lxml import etree
-from nltk.stem import PorterStemmer, WordNetLemmatizer
-import spacy
-from spacy import displacy
-import time
-from spacy.tokens import Doc
-from spacy.vocab import Vocab
+
+import defoe
+from defoe import file_utils
+from defoe.tool_utils import get_tool_pool
+from defoe.toponym_cache import content_key, get_toponym_cache
 
 NON_AZ_REGEXP = re.compile('[^a-z]')
+CAMEL_CASE_REGEXP = re.compile(r'([a-z](?=[A-Z])|[A-Z](?=[A-Z][a-z]))')
+
+PREPROCESS_CACHE_SIZE = 65536
+""" Maximum number of words memoized per PreprocessWordType """
+
+_STEMMER = None
+_LEMMATIZER = None
+_DICTIONARY = None
+
+LONG_S_LEXICON_FILE = "f-to-s.lex"
+""" Long-s lexicon, mapping misspellings to words, in defoe package """
+LONG_S_WORD_REGEXP = re.compile(r'(?<![A-Za-z])[A-Za-z]*[fF][A-Za-z]*')
+""" ASCII letter runs holding 'f', the only runs in the lexicon """
+
+_LONG_S_LEXICON = None
+
+SPACY_LANG_MODEL = "en"
+""" Default spaCy language model """
+SPACY_BATCH_SIZE = 64
+""" Default number of texts per batch sent through a spaCy pipeline """
+
+_SPACY_MODELS = {}
+
+GEO_BOUNDING_BOX = ["-lb", "-7.54296875,", "54.689453125,",
+                    "-0.774267578125,", "60.8318847656", "2"]
+""" Scotland bounding box and score for geoground and geoparser """
+GEOGROUND_CMD = ["./georesolve/scripts/geoground",
+                 "-g", "unlockgeonames"] + GEO_BOUNDING_BOX + ["-top"]
+GEOMAP_CMD = ["./georesolve/bin/sys-i386-64/lxt",
+              "-s", "./georesolve/lib/georesolve/gazmap-leaflet.xsl"]
+GEOPARSER_CMD = ["./geoparser-v1.1/scripts/run", "-t", "ltgxml",
+                 "-g", "unlockgeonames"] + GEO_BOUNDING_BOX + ["-top"]
+GEOPARSER_BATCH_SIZE = 1
+""" Default number of texts geoparsed by one geoparser run """
+GEOPARSER_TEXT_TIMEOUT = 30
+""" Seconds allowed for each text after the first in one geoparser run """
+XML_INVALID_REGEXP = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+""" Control characters not allowed in XML """
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday",
+            "Saturday", "Sunday"]
 
 
 class PreprocessWordType(enum.Enum):
@@ -115,6 +159,23 @@ def extract_window_size(config, default=10):
         raise ValueError('window must be at least 1')
     return window
 
+
+def extract_token_ids(config, default=False):
+    """
+    Extract whether texts are to be matched as arrays of token IDs,
+    with defoe.token_ids, from "token_ids" dictionary value in query
+    configuration.
+
+    :param config: config
+    :type config: dict
+    :param default: default value if "token_ids" is not found
+    :type default: bool
+    :return: True if texts are to be matched as token IDs
+    :rtype: bool
+    """
+    return bool(config.get("token_ids", default))
+
+
 def extract_years_filter(config):
     """
     Extract min and max years to filter data from "years_filter" dictionary value the query
@@ -192,8 +253,7 @@ def stem(word):
     :return: normalized word
     :rtype word: str or unicode
     """
-    stemmer = PorterStemmer()
-    return stemmer.stem(word)
+    return get_stemmer().stem(word)
 
 
 def lemmatize(word):
@@ -211,8 +271,60 @@ def lemmatize(word):
     :return: normalized word
     :rtype word: str or unicode
     """
-    lemmatizer = WordNetLemmatizer()
-    return lemmatizer.lemmatize(word)
+    return get_lemmatizer().lemmatize(word)
+
+
+def get_stemmer():
+    """
+    Gets the stemmer shared by all calls within this process,
+    creating it on first use.
+
+    :return: stemmer
+    :rtype: nltk.stem.PorterStemmer
+    """
+    global _STEMMER
+    if _STEMMER is None:
+        from nltk.stem import PorterStemmer
+        _STEMMER = PorterStemmer()
+    return _STEMMER
+
+
+def get_lemmatizer():
+    """
+    Gets the lemmatizer shared by all calls within this process,
+    creating it on first use.
+
+    :return: lemmatizer
+    :rtype: nltk.stem.WordNetLemmatizer
+    """
+    global _LEMMATIZER
+    if _LEMMATIZER is None:
+        from nltk.stem import WordNetLemmatizer
+        _LEMMATIZER = WordNetLemmatizer()
+    return _LEMMATIZER
+
+
+@lru_cache(maxsize=PREPROCESS_CACHE_SIZE)
+def _normalize_cached(word):
+    return normalize(word)
+
+
+@lru_cache(maxsize=PREPROCESS_CACHE_SIZE)
+def _stem_cached(word):
+    return stem(normalize(word))
+
+
+@lru_cache(maxsize=PREPROCESS_CACHE_SIZE)
+def _lemmatize_cached(word):
+    return lemmatize(normalize(word))
+
+
+_PREPROCESSORS = {
+    PreprocessWordType.NORMALIZE: _normalize_cached,
+    PreprocessWordType.STEM: _stem_cached,
+    PreprocessWordType.LEMMATIZE: _lemmatize_cached
+}
+""" Memoized preprocessing function for each PreprocessWordType """
 
 
 def preprocess_word(word, preprocess_type=PreprocessWordType.NONE):
@@ -220,6 +332,10 @@ def preprocess_word(word, preprocess_type=PreprocessWordType.NONE):
     Preprocess a word by applying different treatments
     e.g. normalization, stemming, lemmatization.
 
+    Results are memoized per preprocessing type in a bounded LRU
+    cache of PREPROCESS_CACHE_SIZE words, as the same words recur
+    many times across the pages of a corpus.
+
     :param word: word
     :type word: string or unicode
     :param preprocess_type: normalize, normalize and stem, normalize
@@ -228,51 +344,484 @@ def preprocess_word(word, preprocess_type=PreprocessWordType.NONE):
     :return: preprocessed word
     :rtype: string or unicode
     """
-    if preprocess_type == PreprocessWordType.NORMALIZE:
-        normalized_word = normalize(word)
-        preprocessed_word = normalized_word
-    elif preprocess_type == PreprocessWordType.STEM:
-        normalized_word = normalize(word)
-        preprocessed_word = stem(normalized_word)
-    elif preprocess_type == PreprocessWordType.LEMMATIZE:
-        normalized_word = normalize(word)
-        preprocessed_word = lemmatize(normalized_word)
-    else:  # PreprocessWordType.NONE or unknown
-        preprocessed_word = word
-    return preprocessed_word
+    preprocessor = _PREPROCESSORS.get(preprocess_type)
+    if preprocessor is None:  # PreprocessWordType.NONE or unknown
+        return word
+    return preprocessor(word)
+
+
+def preprocess_words(words,
+                     preprocess_type=PreprocessWordType.NONE,
+                     vocabulary_maps=None):
+    """
+    Preprocess a list of words by applying different treatments
+    e.g. normalization, stemming, lemmatization.
+
+    If vocabulary maps, as built by build_vocabulary_maps, are given
+    then stemmed and lemmatized words are looked up in these rather
+    than computed. Words missing from the maps are preprocessed as
+    usual.
+
+    :param words: words
+    :type words: list(string or unicode)
+    :param preprocess_type: normalize, normalize and stem, normalize
+    and lemmatize, none (default)
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :param vocabulary_maps: dictionary from preprocessing type to
+    dictionary from normalized word to preprocessed word
+    :type vocabulary_maps: dict(defoe.query_utils.PreprocessWordType,
+    dict(str or unicode, str or unicode))
+    :return: preprocessed words
+    :rtype: list(string or unicode)
+    """
+    preprocessor = _PREPROCESSORS.get(preprocess_type)
+    if preprocessor is None:  # PreprocessWordType.NONE or unknown
+        return list(words)
+    if not vocabulary_maps or preprocess_type not in vocabulary_maps:
+        return [preprocessor(word) for word in words]
+    vocabulary_map = vocabulary_maps[preprocess_type]
+    preprocessed_words = []
+    for word in words:
+        preprocessed_word = vocabulary_map.get(_normalize_cached(word))
+        if preprocessed_word is None:
+            preprocessed_word = preprocessor(word)
+        preprocessed_words.append(preprocessed_word)
+    return preprocessed_words
+
+
+def build_vocabulary_maps(texts, context):
+    """
+    Gather the distinct normalized words of a collection of texts,
+    stem and lemmatize each of these once, in parallel, and broadcast
+    the results to the executors.
+
+    Stemming or lemmatizing a text with the broadcast maps (see
+    preprocess_words) is then a dictionary lookup per word.
+
+    :param texts: texts, with words separated by ' '
+    :type texts: pyspark.rdd.PipelinedRDD
+    :param context: Spark Context
+    :type context: pyspark.context.SparkContext
+    :return: broadcast dictionary from PreprocessWordType.STEM and
+    PreprocessWordType.LEMMATIZE to dictionary from normalized word to
+    preprocessed word
+    :rtype: pyspark.broadcast.Broadcast
+    """
+    # [(normalized word, stemmed word, lemmatized word), ...]
+    vocabulary = texts \
+        .flatMap(lambda text: set(preprocess_words(
+            text.split(' '), PreprocessWordType.NORMALIZE))) \
+        .distinct() \
+        .map(lambda word: (word, stem(word), lemmatize(word))) \
+        .collect()
+    vocabulary_maps = {
+        PreprocessWordType.STEM:
+        {word: stemmed for word, stemmed, _ in vocabulary},
+        PreprocessWordType.LEMMATIZE:
+        {word: lemmatized for word, _, lemmatized in vocabulary}
+    }
+    return context.broadcast(vocabulary_maps)
+
+
+def clear_preprocess_caches():
+    """
+    Empty the memoized results of preprocess_word and
+    preprocess_words.
+    """
+    for preprocessor in _PREPROCESSORS.values():
+        preprocessor.cache_clear()
+
+
+def get_dictionary():
+    """
+    Gets the dictionary of English words used to assess OCR quality,
+    loading it from the NLTK words corpus on first use. The dictionary
+    is shared by all calls within this process.
+
+    :return: dictionary
+    :rtype: frozenset(str or unicode)
+    """
+    global _DICTIONARY
+    if _DICTIONARY is None:
+        from nltk.corpus import words
+        _DICTIONARY = frozenset(words.words())
+    return _DICTIONARY
+
+
+def calculate_words_within_dictionary(
+        words, preprocess_type=PreprocessWordType.NORMALIZE):
+    """
+    Calculates the % of words within the dictionary, ignoring words
+    that are empty after preprocessing.
+
+    :param words: words
+    :type words: list(str or unicode)
+    :param preprocess_type: how words should be preprocessed
+    (normalize, normalize and stem, normalize and lemmatize, none)
+    :type preprocess_type: defoe.query_utils.PreprocessWordType
+    :return: % of words within the dictionary, or "0" if there are no
+    words
+    :rtype: str or unicode
+    """
+    dictionary = get_dictionary()
+    total_words = 0
+    counter = 0
+    for preprocessed_word in preprocess_words(words, preprocess_type):
+        if preprocessed_word != "":
+            total_words += 1
+            if preprocessed_word in dictionary:
+                counter += 1
+    if total_words == 0:
+        return "0"
+    return str(counter * 100 / total_words)
+
+
+def calculate_words_confidence_average(wcs):
+    """
+    Calculates the average of word confidences.
+
+    :param wcs: word confidences
+    :type wcs: list(str or unicode or float)
+    :return: average word confidence, or "0" if there are no words
+    :rtype: str or unicode
+    """
+    if len(wcs) == 0:
+        return "0"
+    return str(sum(float(wc) for wc in wcs) / len(wcs))
+
+
+def join_words(words):
+    """
+    Join words into a single string using ' ' as delimiter. Empty
+    words before the first non-empty word are skipped.
+
+    :param words: words
+    :type words: iterable(str or unicode)
+    :return: words as a string
+    :rtype: str or unicode
+    """
+    return ' '.join(dropwhile(lambda word: word == '', words))
+
+
+def split_camel_case_words(words):
+    """
+    Insert a space into words where a lower-case letter is followed
+    by an upper-case letter, or where an upper-case letter is followed
+    by an upper-case then a lower-case letter, for example
+    "ofEdinburgh" becomes "of Edinburgh". Words holding '.' are left
+    as they are.
+
+    :param words: words
+    :type words: iterable(str or unicode)
+    :return: words
+    :rtype: generator(str or unicode)
+    """
+    for word in words:
+        # Only words with an upper-case letter after the first
+        # letter and a lower-case letter anywhere can be split.
+        if ("." in word) or word[1:].islower() or word.isupper():
+            yield word
+        else:
+            yield CAMEL_CASE_REGEXP.sub(r'\1 ', word)
+
+
+def clean_words(words):
+    """
+    Clean words by rejoining hyphenated words and fixing the long-s,
+    returning the resulting words with no empty words.
+
+    :param words: words
+    :type words: iterable(str or unicode)
+    :return: clean words
+    :rtype: list(str or unicode)
+    """
+    text = join_words(words).replace('- ', '')
+    if (len(text) > 1) and ('f' in text):
+        text = longsfix_sentence(text)
+    return text.split()
+
+
+class KeysentenceMatcher(object):
+    """
+    Aho-Corasick automaton over words, matching any number of
+    keysentences, each one or more space-separated words, in one pass
+    over the words of a text. Keysentences only match whole words, and
+    overlapping matches are all found.
+
+    The automaton holds only lists and dictionaries, so can be pickled
+    and broadcast to Spark workers. Queries build it once, on the
+    driver, and broadcast it, rather than building it for each text.
+    """
+
+    def __init__(self, keysentences):
+        """
+        Constructor. Builds automaton.
+
+        :param keysentences: keysentences. Empty keysentences never
+        match, and a keysentence listed more than once is matched once
+        for each time it is listed
+        :type keysentences: list(str or unicode)
+        """
+        self.keysentences = list(keysentences)
+        # Transitions, failure transition and matching keysentence
+        # indices of each state, where state 0 is the initial state.
+        self.transitions = [{}]
+        self.failures = [0]
+        self.outputs = [[]]
+        for index, keysentence in enumerate(self.keysentences):
+            words = keysentence.split()
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                next_state = self.transitions[state].get(word)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions.append({})
+                    self.failures.append(0)
+                    self.outputs.append([])
+                    self.transitions[state][word] = next_state
+                state = next_state
+            self.outputs[state].append(index)
+        # Failure transitions are set breadth-first, so each state's
+        # failure state, which is shallower, is complete beforehand.
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                failure = self.failures[state]
+                while failure and word not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                failure = self.transitions[failure].get(word, 0)
+                self.failures[next_state] = failure
+                self.outputs[next_state] = \
+                    self.outputs[next_state] + self.outputs[failure]
+
+    def scan(self, text):
+        """
+        Iterate over keysentences matching in a text.
+
+        :param text: text
+        :type text: str or unicode
+        :return: index of last matching word and keysentence index
+        :rtype: iterator(tuple(int, int))
+        """
+        transitions = self.transitions
+        failures = self.failures
+        outputs = self.outputs
+        state = 0
+        for position, word in enumerate(text.split()):
+            while state and word not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(word, 0)
+            for index in outputs[state]:
+                yield position, index
+
+    def matches(self, text):
+        """
+        Gets keysentences matching in a text, once per match.
+
+        :param text: text
+        :type text: str or unicode
+        :return: keysentences, sorted
+        :rtype: list(str or unicode)
+        """
+        return sorted(self.keysentences[index]
+                      for _, index in self.scan(text))
+
+    def contains_any(self, text):
+        """
+        Checks whether any keysentence matches in a text.
+
+        :param text: text
+        :type text: str or unicode
+        :return: True if any keysentence matches
+        :rtype: bool
+        """
+        return next(self.scan(text), None) is not None
+
+
+@lru_cache(maxsize=16)
+def _get_keysentence_matcher(keysentences):
+    return KeysentenceMatcher(keysentences)
+
+
+def get_keysentence_matcher(keysentences):
+    """
+    Gets matcher for keysentences, building it once per process for
+    each list of keysentences. If given a matcher, returns it.
+
+    :param keysentences: keysentences, or their matcher
+    :type keysentences: list(str or unicode) or
+    defoe.query_utils.KeysentenceMatcher
+    :return: matcher
+    :rtype: defoe.query_utils.KeysentenceMatcher
+    """
+    if isinstance(keysentences, KeysentenceMatcher):
+        return keysentences
+    return _get_keysentence_matcher(tuple(keysentences))
+
+
+def get_sentences_list_matches(text, keysentences):
+    """
+    Gets keysentences matching whole words in a text, once per match.
+
+    :param text: text
+    :type text: str or unicode
+    :param keysentences: keysentences, or their matcher
+    :type keysentences: list(str or unicode) or
+    defoe.query_utils.KeysentenceMatcher
+    :return: keysentences, sorted
+    :rtype: list(str or unicode)
+    """
+    return get_keysentence_matcher(keysentences).matches(text)
+
+
+def get_long_s_lexicon():
+    """
+    Get long-s lexicon, loading it on first call. The lexicon is
+    shared by all calls within a process.
+
+    :return: lexicon mapping lower-case misspellings to words
+    :rtype: dict(str or unicode, str or unicode)
+    """
+    global _LONG_S_LEXICON
+    if _LONG_S_LEXICON is None:
+        lexicon_file = file_utils.get_path(defoe, LONG_S_LEXICON_FILE)
+        lexicon = etree.parse(lexicon_file).getroot()
+        _LONG_S_LEXICON = {lex.get("word"): lex.get("good")
+                           for lex in lexicon.iter("lex")}
+    return _LONG_S_LEXICON
+
+
+def _fix_long_s_word(match):
+    """
+    Replace a letter run with its spelling from the long-s lexicon,
+    following the rules of fix-spelling.gr: runs starting with an
+    upper-case letter get an upper-case first letter, others are
+    replaced as in the lexicon.
+
+    :param match: letter run
+    :type match: re.Match
+    :return: corrected letter run
+    :rtype: str or unicode
+    """
+    word = match.group(0)
+    if len(word) < 2:
+        return word
+    good = get_long_s_lexicon().get(word.lower())
+    if good is None:
+        return word
+    if word[0].isupper():
+        return good[:1].upper() + good[1:]
+    return good
+
+
+def fix_long_s(text):
+    """
+    Correct words in text where OCR misread a long-s as 'f', using the
+    long-s lexicon. This gives the same output as running
+    lxtransduce with f-to-s.lex and fix-spelling.gr, without starting
+    a process.
+
+    :param text: text
+    :type text: str or unicode
+    :return: corrected text
+    :rtype: str or unicode
+    """
+    return LONG_S_WORD_REGEXP.sub(_fix_long_s_word, text)
+
 
 def longsfix_sentence(sentence):
-    if "'" in sentence:
-        sentence=sentence.replace("'", "\'\\\'\'")
-    cmd = 'printf \'%s\' \''+ sentence + '\' | ./long_s_fix/lxtransduce -l spelling=./long_s_fix/f-to-s.lex ./long_s_fix/fix-spelling.gr'
-    #cmd = 'echo " + sentence + " | ./long_s_fix/lxtransduce -l spelling=./long_s_fix/f-to-s.lex ./long_s_fix/fix-spelling.gr'
-    proc=subprocess.Popen(cmd.encode('utf-8'), shell=True,
-                        stdin=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE)
-    stdout, stderr = proc.communicate()
-    if "Error" in str(stderr):
-        print("---Err: '{}'".format(stderr))
-        stdout_value = sentence
-    else:
-        stdout_value = stdout
+    """
+    Correct long-s misspellings in the first line of sentence, and
+    replace 'fs' by 'ss' if the line holds a vowel followed by 'fs'.
 
-    proc.terminate()
-    fix_s= stdout_value.decode('utf-8').split('\n')[0]
+    :param sentence: sentence
+    :type sentence: str or unicode
+    :return: corrected sentence
+    :rtype: str or unicode
+    """
+    fix_s = fix_long_s(sentence.split('\n')[0])
     if re.search('[aeiou]fs', fix_s):
-        fix_final=re.sub('fs', 'ss', fix_s)
+        fix_final = re.sub('fs', 'ss', fix_s)
     else:
         fix_final = fix_s
     return fix_final
 
-def spacy_nlp(text, lang_model):
-   nlp = spacy.load(lang_model)
-   doc = nlp(text)
-   return doc
+
+def get_spacy_model(lang_model=SPACY_LANG_MODEL, disable=()):
+    """
+    Get spaCy language model, loading it on first call. Models are
+    shared by all calls within a process, keyed by model name and
+    disabled pipeline components.
+
+    :param lang_model: spaCy language model name
+    :type lang_model: str or unicode
+    :param disable: names of pipeline components to disable
+    :type disable: list(str or unicode)
+    :return: spaCy language model
+    :rtype: spacy.language.Language
+    """
+    key = (lang_model, tuple(sorted(disable)))
+    if key not in _SPACY_MODELS:
+        import spacy
+        _SPACY_MODELS[key] = spacy.load(lang_model, disable=list(key[1]))
+    return _SPACY_MODELS[key]
+
+
+def spacy_nlp(text, lang_model=SPACY_LANG_MODEL):
+    """
+    Apply spaCy language model to text.
+
+    :param text: text
+    :type text: str or unicode
+    :param lang_model: spaCy language model name
+    :type lang_model: str or unicode
+    :return: spaCy document
+    :rtype: spacy.tokens.Doc
+    """
+    return get_spacy_model(lang_model)(text)
+
+
+def spacy_nlp_pages(pages,
+                    text_index,
+                    lang_model=SPACY_LANG_MODEL,
+                    disable=(),
+                    batch_size=SPACY_BATCH_SIZE,
+                    n_process=1):
+    """
+    Apply spaCy language model to the text of each page, sending
+    texts through the model's pipe in batches. For use with
+    RDD.mapPartitions.
+
+    :param pages: pages, each a tuple
+    :type pages: iterable(tuple)
+    :param text_index: index of text in each page tuple
+    :type text_index: int
+    :param lang_model: spaCy language model name
+    :type lang_model: str or unicode
+    :param disable: names of pipeline components to disable
+    :type disable: list(str or unicode)
+    :param batch_size: number of texts per batch
+    :type batch_size: int
+    :param n_process: number of processes used by the pipe
+    :type n_process: int
+    :return: each page tuple with its spaCy document appended
+    :rtype: iterable(tuple)
+    """
+    pages, text_pages = tee(pages)
+    docs = get_spacy_model(lang_model, disable).pipe(
+        (page[text_index] for page in text_pages),
+        batch_size=batch_size,
+        n_process=n_process)
+    for page, doc in zip(pages, docs):
+        yield page + (doc,)
+
 
 def serialize_doc(doc):
-   nlp = spacy.load('en')
-   vocab_bytes = nlp.vocab.to_bytes()
+   vocab_bytes = doc.vocab.to_bytes()
    doc_bytes = doc.to_bytes()
    return doc_bytes, vocab_bytes
 
@@ -284,6 +833,8 @@ def serialize_spacy(text):
 
 
 def deserialize_doc(serialized_bytes):
+    from spacy.tokens import Doc
+    from spacy.vocab import Vocab
     vocab = Vocab()
     doc_bytes = serialized_bytes[0]
     vocab_bytes= serialized_bytes[1]
@@ -292,6 +843,7 @@ def deserialize_doc(serialized_bytes):
     return doc
 
 def display_spacy(doc):
+    from spacy import displacy
     disp_ent=''
     if doc.ents:
         disp_ent=displacy.render(doc, style="ent")
@@ -302,46 +854,52 @@ def spacy_entities(doc):
     entities=[(i, i.label_, i.label) for i in doc.ents]
     return entities
 
+def geo_entities(doc):
+    """
+    Get toponyms, the texts of location (LOC) and geopolitical (GPE)
+    entities, in a spaCy document.
+
+    :param doc: spaCy document
+    :type doc: spacy.tokens.Doc
+    :return: toponyms
+    :rtype: list(str or unicode)
+    """
+    return [ent.text for ent in doc.ents
+            if ent.label_ == "LOC" or ent.label_ == "GPE"]
+
+
+def placenames_xml(toponyms):
+    """
+    Get toponyms as XML for geoground, identifying each toponym by
+    its position, starting at 1.
+
+    :param toponyms: toponyms
+    :type toponyms: list(str or unicode)
+    :return: XML
+    :rtype: str or unicode
+    """
+    root = etree.Element("placenames")
+    for toponym_id, toponym in enumerate(toponyms, 1):
+        etree.SubElement(root, "placename", id=str(toponym_id), name=toponym)
+    return etree.tostring(root, encoding="unicode")
+
+
 def xml_geo_entities(doc):
-    id=0
-    xml_doc='<placenames> '
-    flag=0
-    for ent in doc.ents:
-       #print("ROSA-ENTITY: Spacy entities %s" %ent)
-       if ent.label_ == "LOC" or ent.label_ == "GPE":
-            #print("ROSA-LOCATION: Found as place the entity: %s" %ent.text)
-            id=id+1
-            toponym = ent.text
-            child ='<placename id="' + str(id) + '" name="' + toponym + '"/> '
-            xml_doc= xml_doc+child
-            flag=1
-    xml_doc=xml_doc+ '</placenames>'
-    return flag, xml_doc
+    toponyms = geo_entities(doc)
+    flag = 1 if toponyms else 0
+    return flag, placenames_xml(toponyms)
+
 
 def georesolve_cmd(in_xml):
-    georesolve_xml =''
-    atempt=0
-    flag = 1
-    if "'" in in_xml:
-        in_xml=in_xml.replace("'", "\'\\\'\'")
-    cmd = 'printf \'%s\' \''+ in_xml + ' \' | ./georesolve/scripts/geoground -g unlockgeonames -lb -7.54296875, 54.689453125, -0.774267578125, 60.8318847656 2 -top '
-    #cmd = 'printf \'%s\' \''+ in_xml + '\' | ./georesolve/scripts/geoground -g unlockgeonames -top'
-    while (len(georesolve_xml) < 5) and (atempt < 100) and (flag == 1): 
-        proc=subprocess.Popen(cmd.encode('utf-8'), shell=True,
-                               stdin=subprocess.PIPE,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-        proc.terminate()
-        atempt= atempt + 1
-        stdout, stderr = proc.communicate()
-        if "Error" in str(stderr):
-            flag = 0
-            print("err: '{}'".format(stderr))
-            georesolve_xml =  ''
-        else:
-            georesolve_xml = stdout
-    #print("ROSA -1- georesolve_xml: %s!!!" %georesolve_xml)
-    return georesolve_xml
+    """
+    Resolve toponyms in XML using geoground.
+
+    :param in_xml: toponyms XML, as returned by xml_geo_entities
+    :type in_xml: str or unicode
+    :return: georesolved XML, or b'' if geoground failed
+    :rtype: bytes
+    """
+    return get_tool_pool().run([GEOGROUND_CMD], in_xml.encode('utf-8'))
 
 
 def coord_xml(geo_xml):
@@ -364,44 +922,130 @@ def coord_xml(geo_xml):
     #print("ROSA -2- ResolvedLocs: %s!!!" % dResolvedLocs)
     return dResolvedLocs
 
+def georesolve_toponyms(toponyms):
+    """
+    Resolve toponyms using geoground, reusing results held in the
+    toponym cache. Only toponyms missing from the cache are sent to
+    geoground, and geoground is not run if all toponyms are cached.
+
+    :param toponyms: toponyms
+    :type toponyms: list(str or unicode)
+    :return: latitude and longitude of each toponym, keyed by
+    "<toponym>-<position>" as for coord_xml
+    :rtype: dict
+    """
+    cache = get_toponym_cache()
+    keys = [content_key(GEOGROUND_CMD, toponym) for toponym in toponyms]
+    resolved = cache.get_many(keys)
+    uncached = list(dict.fromkeys(toponym for toponym, key
+                                  in zip(toponyms, keys)
+                                  if key not in resolved))
+    dResolvedLocs = {}
+    if uncached:
+        geo_xml = georesolve_cmd(placenames_xml(uncached))
+        uncached_locs = coord_xml(geo_xml)
+        if "cmd" in uncached_locs:
+            dResolvedLocs["cmd"] = uncached_locs["cmd"]
+        else:
+            new_resolved = {}
+            for name_id, location in uncached_locs.items():
+                toponym_id = int(name_id.rsplit("-", 1)[1])
+                toponym = uncached[toponym_id - 1]
+                new_resolved[content_key(GEOGROUND_CMD, toponym)] = location
+            cache.put_many(new_resolved)
+            resolved.update(new_resolved)
+    for toponym_id, (toponym, key) in enumerate(zip(toponyms, keys), 1):
+        if key in resolved:
+            dResolvedLocs[toponym + "-" + str(toponym_id)] = \
+                tuple(resolved[key])
+    return dResolvedLocs
+
+
 def geomap_cmd(in_xml):
-    geomap_html = ''
-    atempt=0
-    if "'" in in_xml:
-        in_xml=in_xml.replace("'", "\'\\\'\'")
-    cmd = 'printf \'%s\' \''+ in_xml + ' \' | ./georesolve/scripts/geoground -g unlockgeonames -lb -7.54296875, 54.689453125, -0.774267578125, 60.8318847656 2 -top | ./georesolve/bin/sys-i386-64/lxt -s ./georesolve/lib/georesolve/gazmap-leaflet.xsl'
-    while (len(geomap_html) < 5) and (atempt < 100): 
-        proc=subprocess.Popen(cmd.encode('utf-8'), shell=True,
-                               stdin=subprocess.PIPE,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-        proc.terminate()
-        geomap_html = proc.communicate(timeout=100)[0]
-        atempt= atempt + 1
+    """
+    Resolve toponyms in XML using geoground and render them as a
+    Leaflet map.
+
+    :param in_xml: toponyms XML, as returned by xml_geo_entities
+    :type in_xml: str or unicode
+    :return: map HTML, or '' if geoground or lxt failed
+    :rtype: str or unicode
+    """
+    geomap_html = get_tool_pool().run([GEOGROUND_CMD, GEOMAP_CMD],
+                                      in_xml.encode('utf-8'))
     return geomap_html.decode("utf-8")
 
 
+def geoparser_document(texts, docdate=None):
+    """
+    Write texts as a geoparser input document, with a paragraph per
+    text, as the geoparser's prepare-plain script does for plain text
+    holding texts separated by blank lines. The document can be given
+    to the geoparser's run script with "-t ltgxml", which starts at
+    tokenisation.
+
+    White space within each text is collapsed to single spaces, and
+    control characters, which prepare-plain rejects, are treated as
+    spaces.
+
+    :param texts: texts
+    :type texts: list(str or unicode)
+    :param docdate: document date, if None then today's date is used
+    :type docdate: datetime.date
+    :return: XML
+    :rtype: str or unicode
+    """
+    if docdate is None:
+        docdate = datetime.date.today()
+    attr = ('<attr name="docdate" id="docdate" year="{0:%Y}" '
+            'month="{0:%m}" date="{0:%d}" sdate="{0:%Y-%m-%d}" '
+            'day-number="{1}" day="{2}" wdaynum="{3}">{0:%Y%m%d}</attr>'
+            .format(docdate,
+                    docdate.toordinal() - 1,
+                    WEEKDAYS[docdate.weekday()],
+                    docdate.isoweekday()))
+    paragraphs = "\n\n".join(
+        "<p>" + escape(" ".join(XML_INVALID_REGEXP.sub(" ", text).split())) +
+        "</p>" for text in texts)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<document version="3">\n<meta>\n' + attr + '\n</meta>\n'
+            '<text>\n' + paragraphs + '\n</text>\n</document>\n')
+
+
 def geoparser_cmd(text):
-    atempt=0
-    flag = 1
-    geoparser_xml = ''
-    if "'" in text:
-        text=text.replace("'", "\'\\\'\'")
-    cmd = 'echo \'%s\' \''+ text + ' \' | ./geoparser-v1.1/scripts/run -t plain -g unlockgeonames -lb -7.54296875, 54.689453125, -0.774267578125, 60.8318847656 2 -top' 
-    #cmd = 'echo \'%s\' \''+ text + ' \' | ./geoparser-v1.1/scripts/run -t plain -g unlockgeonames -top' 
-    while (len(geoparser_xml) < 5) and (atempt < 100) and (flag == 1): 
-        proc=subprocess.Popen(cmd.encode('utf-8'), shell=True,
-                               stdin=subprocess.PIPE,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-        proc.terminate()
-        stdout, stderr = proc.communicate()
-        if "Error" in str(stderr):
-            flag = 0
-            print("err: '{}'".format(stderr))
-        else:
-            geoparser_xml = stdout
-    return geoparser_xml
+    """
+    Geoparse text using the Edinburgh geoparser.
+
+    :param text: text
+    :type text: str or unicode
+    :return: geoparsed XML, or b'' if the geoparser failed
+    :rtype: bytes
+    """
+    return geoparser_texts_cmd([text])
+
+
+def geoparser_texts_cmd(texts, attempts=None):
+    """
+    Geoparse texts, as one document with a paragraph per text, using
+    the Edinburgh geoparser. The run is allowed the tool pool's
+    timeout, for one text, and GEOPARSER_TEXT_TIMEOUT more seconds for
+    each other text.
+
+    :param texts: texts
+    :type texts: list(str or unicode)
+    :param attempts: maximum number of geoparser runs, if None then
+    the tool pool's attempts is used
+    :type attempts: int
+    :return: geoparsed XML, or b'' if the geoparser failed
+    :rtype: bytes
+    """
+    pool = get_tool_pool()
+    timeout = pool.timeout + GEOPARSER_TEXT_TIMEOUT * max(len(texts) - 1, 0)
+    return pool.run([GEOPARSER_CMD],
+                    geoparser_document(texts).encode('utf-8'),
+                    timeout=timeout,
+                    attempts=attempts)
+
 
 def geoparser_coord_xml(geo_xml):
     dResolvedLocs = dict()
@@ -423,6 +1067,158 @@ def geoparser_coord_xml(geo_xml):
         pass
     return dResolvedLocs
 
+def geoparser_key(text):
+    """
+    Get toponym cache key for geoparser results for text.
+
+    :param text: text
+    :type text: str or unicode
+    :return: key
+    :rtype: str or unicode
+    """
+    return content_key(GEOPARSER_CMD,
+                       hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def geoparser_resolve(text):
+    """
+    Geoparse text, as geoparser_cmd, and get the latitude and
+    longitude of its toponyms, as geoparser_coord_xml. Results are
+    held in the toponym cache, keyed by text, so the geoparser is not
+    run for text geoparsed before.
+
+    :param text: text
+    :type text: str or unicode
+    :return: latitude and longitude of each toponym, keyed by
+    "<toponym>-<id>"
+    :rtype: dict
+    """
+    cache = get_toponym_cache()
+    key = geoparser_key(text)
+    cached = cache.get_many([key])
+    if key in cached:
+        return {name_id: tuple(location)
+                for name_id, location in cached[key].items()}
+    geo_xml = geoparser_cmd(text)
+    dResolvedLocs = geoparser_coord_xml(geo_xml)
+    if geo_xml:
+        cache.put_many({key: dResolvedLocs})
+    return dResolvedLocs
+
+
+def geoparser_split_coord_xml(geo_xml, num_texts):
+    """
+    Get the latitude and longitude of toponyms in each text from
+    geoparser output for texts geoparsed by geoparser_texts_cmd. Each
+    text is a paragraph of the output, and each toponym belongs to the
+    paragraph holding its first word.
+
+    :param geo_xml: geoparsed XML
+    :type geo_xml: bytes
+    :param num_texts: number of texts
+    :type num_texts: int
+    :return: latitude and longitude of each toponym, keyed by
+    "<toponym>-<id>", for each text
+    :rtype: list(dict)
+    :raises lxml.etree.XMLSyntaxError: if geo_xml is not XML
+    :raises ValueError: if the number of paragraphs is not num_texts
+    """
+    root = etree.fromstring(geo_xml)
+    paragraphs = root.findall("text/p")
+    if len(paragraphs) != num_texts:
+        raise ValueError("Expected {} paragraphs but found {}".format(
+            num_texts, len(paragraphs)))
+    word_texts = {}
+    for text_index, paragraph in enumerate(paragraphs):
+        for word in paragraph.iter("w"):
+            word_texts[word.get("id")] = text_index
+    dResolvedLocs = [dict() for _ in range(num_texts)]
+    for element in root.iter("ent"):
+        if element.get("type") != "location" or "lat" not in element.attrib:
+            continue
+        location = (element.get("lat"), element.get("long"))
+        for part in element.iterfind("parts/part"):
+            text_index = word_texts.get(part.get("sw"))
+            if text_index is not None:
+                dResolvedLocs[text_index][
+                    part.text + "-" + element.get("id")] = location
+    return dResolvedLocs
+
+
+def geoparser_resolve_batch(texts):
+    """
+    Geoparse texts, as geoparser_resolve, with one geoparser run for
+    all texts missing from the toponym cache. If the output of that
+    run cannot be split into texts, then each text is geoparsed
+    separately, so that run is not restarted. Texts holding only white
+    space have no toponyms.
+
+    Toponym ids are unique across the run, not within each text, and
+    the geoparser resolves toponyms in the context of all texts in the
+    run.
+
+    :param texts: texts
+    :type texts: list(str or unicode)
+    :return: latitude and longitude of each toponym, keyed by
+    "<toponym>-<id>", for each text
+    :rtype: list(dict)
+    """
+    cache = get_toponym_cache()
+    keys = [geoparser_key(text) for text in texts]
+    cached = cache.get_many(keys)
+    results = [None] * len(texts)
+    pending = []
+    for index, (text, key) in enumerate(zip(texts, keys)):
+        if key in cached:
+            results[index] = {name_id: tuple(location)
+                              for name_id, location in cached[key].items()}
+        elif not text.strip():
+            results[index] = {}
+        else:
+            pending.append(index)
+    if len(pending) > 1:
+        geo_xml = geoparser_texts_cmd([texts[index] for index in pending],
+                                      attempts=1)
+        try:
+            split_locs = geoparser_split_coord_xml(geo_xml, len(pending))
+        except (etree.XMLSyntaxError, ValueError):
+            split_locs = None
+        if split_locs is not None:
+            for index, dResolvedLocs in zip(pending, split_locs):
+                results[index] = dResolvedLocs
+            cache.put_many({keys[index]: results[index] for index in pending})
+            pending = []
+    for index in pending:
+        results[index] = geoparser_resolve(texts[index])
+    return results
+
+
+def geoparser_resolve_pages(pages, text_index,
+                            batch_size=GEOPARSER_BATCH_SIZE):
+    """
+    Geoparse the text of each page in batches, using
+    geoparser_resolve_batch. For use with RDD.mapPartitions.
+
+    :param pages: pages, each a tuple
+    :type pages: iterable(tuple)
+    :param text_index: index of text in each page tuple
+    :type text_index: int
+    :param batch_size: number of pages per batch
+    :type batch_size: int
+    :return: each page tuple with the latitude and longitude of each
+    toponym, as returned by geoparser_resolve, appended
+    :rtype: iterable(tuple)
+    """
+    pages = iter(pages)
+    while True:
+        batch = list(islice(pages, batch_size))
+        if not batch:
+            return
+        texts = [page[text_index] for page in batch]
+        for page, dResolvedLocs in zip(batch, geoparser_resolve_batch(texts)):
+            yield page + (dResolvedLocs,)
+
+
 def geoparser_text_xml(geo_xml):
     text_ER=[]
     try:
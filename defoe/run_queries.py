@@ -2,6 +2,8 @@
 Run Spark several text queries jobs.
 
     usage: run_queries.py [-h] [-n [NUM_CORES]]  [-e [ERRORS_FILE]]
+                      [-p [PARTITIONS_FILE]] [-t [PAGES_PER_TASK]] [-f]
+                      [-c [CACHE_LEVEL]] [-s [CACHE_FILE]]
                       data_file model_name -l query_list [query_config_file]
 
     Run Spark text analysis job
@@ -9,7 +11,7 @@ Run Spark several text queries jobs.
     positional arguments:
       data_file             Data file listing data files to query
       model_name            Data model to which data files conform:
-      ['books', 'papers', 'fmp','nzpp', 'generic_xml', 'nls', 'hdfs', 'psql', 'es']
+      ['books', 'papers', 'fmp','nzpp', 'generic_xml', 'nls', 'nlsArticles', 'hdfs', 'psql', 'es']
       query_list            A file with the queries to run. For each query
                             we have to indicate: query_module [query_configuration_file] [-r results_file]
        Example:
@@ -23,6 +25,17 @@ Run Spark several text queries jobs.
                             Number of cores
       -e [ERRORS_FILE], --errors_file [ERRORS_FILE]
                             Errors file
+      -p [PARTITIONS_FILE], --partitions_file [PARTITIONS_FILE]
+                            Partition load report file, as for
+                            run_query.py
+      -t [PAGES_PER_TASK], --pages_per_task [PAGES_PER_TASK]
+                            Pages per task, as for run_query.py
+      -f, --fused           Run queries supporting fused_query in one pass
+      -c [CACHE_LEVEL], --cache_level [CACHE_LEVEL]
+                            Storage level of page records kept for all
+                            queries
+      -s [CACHE_FILE], --cache_file [CACHE_FILE]
+                            Page records storage footprint file
 
 * data_file: lists either URLs or paths to files on the file system.
 * model_name: text model to be used. The model determines the modules
@@ -48,6 +61,26 @@ Run Spark several text queries jobs.
                   str|unicode config_file,
                   py4j.java_gateway.JavaObject logger)
 
+* "fused": run the queries whose modules support a function
+
+    defoe.fused_query.FusedQuery fused_query(str|unicode config_file,
+                                             py4j.java_gateway.JavaObject
+                                             logger)
+
+  in one pass over the documents and pages, sharing each page's
+  cleaned and preprocessed words. See defoe.fused_query. Other
+  queries are run one by one with do_query, as usual.
+* "cache_level": read the pages of all documents once into
+  defoe.page_records records, holding document metadata and page
+  words, word confidences and clean text, and keep these, with a
+  pyspark.StorageLevel such as "MEMORY_ONLY" or "MEMORY_AND_DISK",
+  for all queries, in place of the archives. Only queries using the
+  recorded attributes can be run. Only supported by models whose
+  archives hold documents of pages: books, fmp, nls and nlsArticles.
+  Default: None, queries read the archives.
+* "cache_file": name of file to hold, in YAML format, the storage
+  level, number of partitions and bytes in memory and on disk of the
+  kept page records. Default: "cache.yml".
 * "query_config_file": query-specific configuration file. This is
   optional and depends on the chosen query module above.
 * results_file": name of file to hold query results in YAML
@@ -59,9 +92,12 @@ import importlib
 import os.path
 import yaml
 
-from pyspark import SparkContext, SparkConf
+from pyspark import SparkContext, SparkConf, StorageLevel
 
-from defoe.spark_utils import files_to_rdd
+from defoe.fused_query import run_fused_queries
+from defoe.page_records import archive_to_records
+from defoe.spark_utils import files_to_rdd, files_to_work_units, \
+    get_storage_footprint, ErrorCollector, PartitionReport
 
 
 def main():
@@ -70,7 +106,9 @@ def main():
     """
     root_module = "defoe"
     setup_module = "setup"
-    models = ["books", "papers", "fmp", "nzpp", "generic_xml", "nls", "hdfs", "psql", "es"]
+    models = ["books", "papers", "fmp", "nzpp", "generic_xml", "nls", "nlsArticles", "hdfs", "psql", "es"]
+    page_task_models = ["nls", "nlsArticles"]
+    record_models = ["books", "fmp", "nls", "nlsArticles"]
 
     parser = ArgumentParser(description="Run Spark text analysis job")
     parser.add_argument("data_file",
@@ -92,6 +130,30 @@ def main():
                         nargs="?",
                         default="errors.yml",
                         help="Errors file")
+    parser.add_argument("-p",
+                        "--partitions_file",
+                        nargs="?",
+                        default=None,
+                        help="Partition load report file")
+    parser.add_argument("-t",
+                        "--pages_per_task",
+                        nargs="?",
+                        default=None,
+                        help="Pages per task, to split archives into tasks")
+    parser.add_argument("-f",
+                        "--fused",
+                        action="store_true",
+                        help="Run queries supporting fused_query in one pass")
+    parser.add_argument("-c",
+                        "--cache_level",
+                        nargs="?",
+                        default=None,
+                        help="Storage level of page records kept for all queries")
+    parser.add_argument("-s",
+                        "--cache_file",
+                        nargs="?",
+                        default="cache.yml",
+                        help="Page records storage footprint file")
 
     args = parser.parse_args()
     model_name = args.model_name
@@ -99,10 +161,23 @@ def main():
     data_file = args.data_file
     num_cores = args.num_cores
     errors_file = args.errors_file
+    partitions_file = args.partitions_file
+    pages_per_task = args.pages_per_task
+    fused = args.fused
+    cache_level = args.cache_level
+    cache_file = args.cache_file
 
     
 
     assert model_name in models, ("'model' must be one of " + str(models))
+    assert not pages_per_task or model_name in page_task_models, \
+        ("'pages_per_task' is only supported by " + str(page_task_models))
+    assert not fused or model_name not in ["hdfs", "psql", "es"], \
+        "'fused' is only supported for models reading data files"
+    assert not cache_level or model_name in record_models, \
+        ("'cache_level' is only supported by " + str(record_models))
+    assert not cache_level or hasattr(StorageLevel, cache_level), \
+        "'cache_level' must be a pyspark.StorageLevel"
 
     # Dynamically load model and query modules.
     setup = importlib.import_module(root_module +
@@ -123,66 +198,117 @@ def main():
     context = SparkContext(conf=conf)
     log = context._jvm.org.apache.log4j.LogManager.getLogger(__name__)  # pylint: disable=protected-access
     
+    report = None
+    errors = None
     if (model_name!= "hdfs") and (model_name!= "psql") and (model_name!= "es"):
         # [filename,...]
-        rdd_filenames = files_to_rdd(context, num_cores, data_file=data_file)
+        if partitions_file:
+            report = PartitionReport(context)
+        rdd_filenames = files_to_rdd(context,
+                                     num_cores,
+                                     data_file=data_file,
+                                     report=report)
         # [(object, None)|(filename, error_message), ...]
-        data = rdd_filenames.map(
-             lambda filename: filename_to_object(filename))
+        if pages_per_task:
+            data = files_to_work_units(context,
+                                       rdd_filenames,
+                                       setup.filename_to_work_units,
+                                       setup.work_unit_to_object,
+                                       int(pages_per_task))
+        else:
+            data = rdd_filenames.map(
+                 lambda filename: filename_to_object(filename))
 
-        # [object, ...]
-        ok_data = data \
-            .filter(lambda obj_file_err: obj_file_err[1] is None) \
-            .map(lambda obj_file_err: obj_file_err[0])
-        # [(filename, error_message), ...]
-        error_data = data \
-            .filter(lambda obj_file_err: obj_file_err[1] is not None) \
-            .map(lambda obj_file_err: (obj_file_err[0], obj_file_err[1]))
-        # Collect and record problematic files before attempting query.
-        errors = error_data.collect()
-        errors = list(errors)
-        if errors:
-            with open(errors_file, "w") as f:
-                 f.write(yaml.safe_dump(list(errors)))
+        # [object, ...], created once and cached for reuse, then
+        # parsed as the query runs, after the cache, as only their
+        # filenames are cached. Problematic files are recorded by
+        # errors.
+        data = data.cache()
+        errors = ErrorCollector(context)
+        ok_data = data.mapPartitions(errors.filter_errors)
     
     else: 
         ok_data=filename_to_object(data_file, context)
  
 
     
-   # Lets open the queries list and run each of them: 
-    f = open(queries_list, "r")
-    queries = f.readlines()
-    f.close()
-
-    num_query=0
-    for query in queries:
-        query_l=query.rstrip()
-        arguments=query_l.split(" ")
-        query_name = arguments[0]
-        # Default Values for results and config_file:
-        query_config_file = None
-        results_file = "results_"+str(num_query)+".yml"
+    if os.path.exists(errors_file):
+        os.remove(errors_file)
+    # Errors are written even if a query fails.
+    try:
+        if cache_level:
+            # [[document_record, ...], ...], read once and kept for
+            # all queries.
+            ok_data = ok_data \
+                .map(lambda archive: archive_to_records(archive)) \
+                .persist(getattr(StorageLevel, cache_level))
+            ok_data.count()
+            data.unpersist()
+            with open(cache_file, "w") as f:
+                f.write(yaml.safe_dump(get_storage_footprint(context,
+                                                             ok_data)))
+
+        # Lets open the queries list and run each of them: 
+        f = open(queries_list, "r")
+        queries = f.readlines()
+        f.close()
+
+        # [(query module, query_config_file, results_file), ...]
+        query_runs = []
+        num_query=0
+        for query in queries:
+            query_l=query.rstrip()
+            arguments=query_l.split(" ")
+            query_name = arguments[0]
+            # Default Values for results and config_file:
+            query_config_file = None
+            results_file = "results_"+str(num_query)+".yml"
   
-        if arguments[1]:
-            if arguments[1] != "-r":
-                 query_config_file = arguments[1]
-                 if arguments[2]:
-                     results_file = arguments[3]
-            else :
-                results_file = arguments[2]
+            if arguments[1]:
+                if arguments[1] != "-r":
+                     query_config_file = arguments[1]
+                     if arguments[2]:
+                         results_file = arguments[3]
+                else :
+                    results_file = arguments[2]
               
-        for f in [results_file, errors_file]:
-            if os.path.exists(f):
-                os.remove(f)
+            if os.path.exists(results_file):
+                os.remove(results_file)
         
-        query = importlib.import_module(query_name)
-        do_query = query.do_query
-        results = do_query(ok_data, query_config_file, log, context)
-        if results!="0":
-            with open(results_file, "w") as f:
-                 f.write(yaml.safe_dump(dict(results)))
-        num_query+=1
+            query = importlib.import_module(query_name)
+            query_runs.append((query, query_config_file, results_file))
+            num_query+=1
+
+        # Run queries which can be fused in one pass over the pages.
+        fused_runs = []
+        if fused:
+            fused_runs = [query_run for query_run in query_runs
+                          if hasattr(query_run[0], "fused_query")]
+        if fused_runs:
+            fused_queries = [query.fused_query(query_config_file, log)
+                             for query, query_config_file, _ in fused_runs]
+            fused_results = run_fused_queries(ok_data, fused_queries)
+            for (_, _, results_file), results in zip(fused_runs, fused_results):
+                with open(results_file, "w") as f:
+                     f.write(yaml.safe_dump(dict(results)))
+
+        for query_run in query_runs:
+            if query_run in fused_runs:
+                continue
+            query, query_config_file, results_file = query_run
+            do_query = query.do_query
+            results = do_query(ok_data, query_config_file, log, context)
+            if results!="0":
+                with open(results_file, "w") as f:
+                     f.write(yaml.safe_dump(dict(results)))
+    finally:
+        # [(filename, error_message), ...]
+        if errors is not None and errors.to_list():
+            with open(errors_file, "w") as f:
+                f.write(yaml.safe_dump(errors.to_list()))
+    if report is not None:
+        with open(partitions_file, "w") as f:
+            f.write(yaml.safe_dump(report.to_dict()))
 
 
 if __name__ == "__main__":
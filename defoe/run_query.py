@@ -2,7 +2,8 @@
 Run Spark text query job.
 
     usage: run_query.py [-h] [-n [NUM_CORES]] [-r [RESULTS_FILE]]
-                      [-e [ERRORS_FILE]]
+                      [-e [ERRORS_FILE]] [-p [PARTITIONS_FILE]]
+                      [-t [PAGES_PER_TASK]] [-i]
                       data_file model_name query_name [query_config_file]
 
     Run Spark text analysis job
@@ -22,6 +23,11 @@ Run Spark text query job.
                             Query results file
       -e [ERRORS_FILE], --errors_file [ERRORS_FILE]
                             Errors file
+      -p [PARTITIONS_FILE], --partitions_file [PARTITIONS_FILE]
+                            Partition load report file
+      -t [PAGES_PER_TASK], --pages_per_task [PAGES_PER_TASK]
+                            Pages per task, to split archives into tasks
+      -i, --index           Run query from an index, if one exists
 
 * data_file: lists either URLs or paths to files on the file system.
 * model_name: text model to be used. The model determines the modules
@@ -51,6 +57,49 @@ Run Spark text query job.
   optional and depends on the chosen query module above.
 * results_file": name of file to hold query results in YAML
   format. Default: "results.yml".
+* "errors_file": name of file to hold, in YAML format, the data files
+  which could not be read and parsed, and why. Files are read as the
+  query runs, so this is written once it has run. Default:
+  "errors.yml".
+* "partitions_file": name of file to hold, in YAML format, the
+  expected load, in bytes, and actual time, in seconds, of each
+  partition of data files. Files are packed into partitions by
+  size. Default: None, no report. With "pages_per_task", the
+  partitions are those in which archives are listed.
+* "pages_per_task": split each document into tasks of at most this
+  many pages, so that the pages of a large archive, such as an
+  encyclopaedia volume, are queried in parallel. Archives are listed
+  first, and the metadata of their documents broadcast to the tasks.
+  Each task's document holds only its pages, so queries counting
+  documents count each task. Only supported by "nls" and
+  "nlsArticles", whose setup modules support functions:
+
+    tuple(tuple(list(tuple), dict) | str or unicode, str or unicode)
+    filename_to_work_units(str or unicode: filename, int: pages_per_unit)
+
+    tuple(Object | str or unicode, str or unicode)
+    work_unit_to_object(tuple: work_unit, dict: document_metadata)
+
+  Default: None, one task per archive.
+* "index": run the query from an index over the data files, if
+  there is one. If the query module supports a function
+
+    list index_query(defoe.inverted_index.InvertedIndex index,
+                     pyspark.rdd.PipelinedRDD rdd,
+                     str|unicode config_file,
+                     py4j.java_gateway.JavaObject logger)
+
+  and an index over the data files is found, as built by a
+  "build_inverted_index" query, then the query is run from the
+  index. The index is the directory given by "index" in the query
+  configuration file, or else "<data_file>.index". It is only used
+  if it lists the same archives as the data file, unchanged since
+  they were indexed or, for "hdfs", "psql" and "es", the same
+  archive filenames as the page table. The query falls back to
+  scanning if there is no such index, or index_query returns None,
+  as when the index does not hold words preprocessed as the query
+  configures, or raw words, for queries matching these. Results are
+  those of a scan. Default: False, data files are scanned.
 """
 
 from argparse import ArgumentParser
@@ -61,7 +110,8 @@ import yaml
 
 from pyspark import SparkContext, SparkConf
 
-from defoe.spark_utils import files_to_rdd, files_to_dataframe
+from defoe.spark_utils import files_to_rdd, files_to_dataframe, \
+    files_to_work_units, ErrorCollector, PartitionReport
 
 
 def main():
@@ -71,6 +121,7 @@ def main():
     root_module = "defoe"
     setup_module = "setup"
     models = ["books", "papers", "fmp", "nzpp", "generic_xml", "nls", "nlsArticles", "hdfs", "psql", "es"]
+    page_task_models = ["nls", "nlsArticles"]
 
     parser = ArgumentParser(description="Run Spark text analysis job")
     parser.add_argument("data_file",
@@ -99,6 +150,20 @@ def main():
                         nargs="?",
                         default="errors.yml",
                         help="Errors file")
+    parser.add_argument("-p",
+                        "--partitions_file",
+                        nargs="?",
+                        default=None,
+                        help="Partition load report file")
+    parser.add_argument("-t",
+                        "--pages_per_task",
+                        nargs="?",
+                        default=None,
+                        help="Pages per task, to split archives into tasks")
+    parser.add_argument("-i",
+                        "--index",
+                        action="store_true",
+                        help="Run query from an index, if one exists")
 
     args = parser.parse_args()
     model_name = args.model_name
@@ -108,12 +173,17 @@ def main():
     query_config_file = args.query_config_file
     results_file = args.results_file
     errors_file = args.errors_file
+    partitions_file = args.partitions_file
+    pages_per_task = args.pages_per_task
+    use_index = args.index
 
-    for f in [results_file, errors_file]:
-        if os.path.exists(f):
+    for f in [results_file, errors_file, partitions_file]:
+        if f and os.path.exists(f):
             os.remove(f)
 
     assert model_name in models, ("'model' must be one of " + str(models))
+    assert not pages_per_task or model_name in page_task_models, \
+        ("'pages_per_task' is only supported by " + str(page_task_models))
 
     # Dynamically load model and query modules.
     setup = importlib.import_module(root_module +
@@ -138,35 +208,67 @@ def main():
     # Check the data_file size, just in case it is empty, which means that we just need to execute the query
     # because the data has been already preprocessed and saved into HDFS | db. 
 
+    report = None
+    errors = None
     if (model_name!= "hdfs") and (model_name!= "psql") and (model_name!= "es"):
         # [filename,...]
-        rdd_filenames = files_to_rdd(context, num_cores, data_file=data_file)
+        if partitions_file:
+            report = PartitionReport(context)
+        rdd_filenames = files_to_rdd(context,
+                                     num_cores,
+                                     data_file=data_file,
+                                     report=report)
         # [(object, None)|(filename, error_message), ...]
-        data = rdd_filenames.map(
-             lambda filename: filename_to_object(filename))
+        if pages_per_task:
+            data = files_to_work_units(context,
+                                       rdd_filenames,
+                                       setup.filename_to_work_units,
+                                       setup.work_unit_to_object,
+                                       int(pages_per_task))
+        else:
+            data = rdd_filenames.map(
+                 lambda filename: filename_to_object(filename))
 
-        # [object, ...]
-        ok_data = data \
-            .filter(lambda obj_file_err: obj_file_err[1] is None) \
-            .map(lambda obj_file_err: obj_file_err[0])
-        # [(filename, error_message), ...]
-        error_data = data \
-            .filter(lambda obj_file_err: obj_file_err[1] is not None) \
-            .map(lambda obj_file_err: (obj_file_err[0], obj_file_err[1]))
-        # Collect and record problematic files before attempting query.
-        errors = error_data.collect()
-        errors = list(errors)
-        if errors:
-            with open(errors_file, "w") as f:
-                 f.write(yaml.safe_dump(list(errors)))
+        # [object, ...], created once and cached for reuse, then
+        # parsed as the query runs, after the cache, as only their
+        # filenames are cached. Problematic files are recorded by
+        # errors.
+        data = data.cache()
+        errors = ErrorCollector(context)
+        ok_data = data.mapPartitions(errors.filter_errors)
     
     else:
         ok_data=filename_to_object(data_file, context)
     
-    results = do_query(ok_data, query_config_file, log, context)
-    if results!="0":
-        with open(results_file, "w") as f:
-            f.write(yaml.safe_dump(dict(results)))
+    # Errors are written even if the query fails.
+    try:
+        results = None
+        if use_index and hasattr(query, "index_query"):
+            from defoe.inverted_index import find_index, \
+                table_archive_filenames
+            filenames = None
+            if model_name in ["hdfs", "psql", "es"]:
+                filenames = table_archive_filenames(ok_data)
+            index = find_index(data_file, query_config_file, filenames)
+            if index is not None:
+                results = query.index_query(index,
+                                            ok_data,
+                                            query_config_file,
+                                            log,
+                                            context)
+        if results is None:
+            results = do_query(ok_data, query_config_file, log, context)
+        if results!="0":
+            with open(results_file, "w") as f:
+                f.write(yaml.safe_dump(dict(results)))
+    finally:
+        # [(filename, error_message), ...]
+        if errors is not None and errors.to_list():
+            with open(errors_file, "w") as f:
+                f.write(yaml.safe_dump(errors.to_list()))
+    if report is not None:
+        with open(partitions_file, "w") as f:
+            f.write(yaml.safe_dump(report.to_dict()))
 
       
 
@@ -2,6 +2,14 @@
 Spark-related file-handling utilities.
 """
 
+import heapq
+import os
+from stat import S_ISREG
+import time
+
+from defoe.archive_manifest import read_manifest
+from defoe.parse_on_use import parse_or_error
+
 HTTP = "http://"
 HTTPS = "https://"
 BLOB = "blob:"
@@ -9,11 +17,16 @@ BLOB = "blob:"
 
 def files_to_rdd(context,
                  num_cores=1,
-                 data_file="data.txt"):
+                 data_file="data.txt",
+                 report=None):
     """
     Populate Spark RDD with file names or URLs over which a query is
     to be run.
 
+    Files are packed into num_cores partitions so that each partition
+    holds about the same number of bytes, as estimated by file_load,
+    rather than partitioned in the order they are listed.
+
     :param context: Spark Context
     :type context: pyspark.context.SparkContext
     :param num_cores: number of cores over which to parallelize Spark
@@ -22,14 +35,329 @@ def files_to_rdd(context,
     :param data_file: name of file with file names or URLs, one per
     line
     :type data_file: str or unicode
+    :param report: if given, records expected and actual load of each
+    partition
+    :type report: defoe.spark_utils.PartitionReport
     :return: RDD
     :rtype: pyspark.rdd.RDD
     """
     filenames = [filename.strip() for filename in list(open(data_file))]
-    rdd_filenames = context.parallelize(filenames, num_cores)
+    loads = [file_load(filename) for filename in filenames]
+    partitions = partition_files(filenames, loads, int(num_cores))
+    rdd_partitions = context.parallelize(partitions, len(partitions))
+    if report is not None:
+        report.expect(partitions, filenames, loads)
+        rdd_filenames = rdd_partitions.mapPartitionsWithIndex(
+            report.time_partition)
+    else:
+        rdd_filenames = rdd_partitions.flatMap(lambda partition: partition)
     return rdd_filenames
 
 
+def file_load(filename):
+    """
+    Estimate load of querying a file, as its size in bytes. For
+    archives with a valid manifest, this is the total size of the
+    archive's members when uncompressed.
+
+    :param filename: file name or URL
+    :type filename: str or unicode
+    :return: load, or None if unknown, as for URLs and directories
+    without a manifest
+    :rtype: int
+    """
+    if filename.lower().startswith((HTTP, HTTPS, BLOB)):
+        return None
+    manifest = read_manifest(filename)
+    if manifest is not None:
+        return sum(size for _, _, size in manifest["members"].values())
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    if not S_ISREG(stat.st_mode):
+        return None
+    return stat.st_size
+
+
+def partition_files(filenames, loads, num_partitions):
+    """
+    Pack files into partitions with about the same total load, by
+    adding each file, largest first, to the partition with the least
+    load so far. Files of unknown load are given the mean of the known
+    loads.
+
+    :param filenames: file names or URLs
+    :type filenames: list(str or unicode)
+    :param loads: load of each file, or None if unknown
+    :type loads: list(int)
+    :param num_partitions: number of partitions
+    :type num_partitions: int
+    :return: file names in each partition, in the order they were
+    listed. There are no empty partitions, so there may be fewer than
+    num_partitions
+    :rtype: list(list(str or unicode))
+    """
+    known = [load for load in loads if load is not None]
+    default_load = sum(known) / len(known) if known else 1
+    loads = [default_load if load is None else load for load in loads]
+    num_partitions = max(1, min(num_partitions, len(filenames)))
+    heap = [(0, index) for index in range(num_partitions)]
+    partitions = [[] for _ in range(num_partitions)]
+    for position in sorted(range(len(filenames)),
+                           key=lambda position: -loads[position]):
+        load, index = heapq.heappop(heap)
+        partitions[index].append(position)
+        heapq.heappush(heap, (load + loads[position], index))
+    return [[filenames[position] for position in sorted(partition)]
+            for partition in partitions if partition]
+
+
+class PartitionReport(object):
+    """
+    Report of the expected and actual load of each partition of files
+    created by files_to_rdd.
+
+    Actual load is the time spent in each partition's task from when
+    it starts reading file names until all of the files' results have
+    been consumed by the rest of the stage. If a partition is computed
+    by more than one action, its times are summed.
+    """
+
+    def __init__(self, context):
+        """
+        Constructor.
+
+        :param context: Spark Context
+        :type context: pyspark.context.SparkContext
+        """
+        from pyspark.accumulators import AccumulatorParam
+
+        class DictParam(AccumulatorParam):
+            """
+            Accumulates dictionaries by summing values of their keys.
+            """
+
+            def zero(self, value):
+                return {}
+
+            def addInPlace(self, value1, value2):
+                for key, value in value2.items():
+                    value1[key] = value1.get(key, 0) + value
+                return value1
+
+        self.expected = []
+        self.seconds = context.accumulator({}, DictParam())
+
+    def expect(self, partitions, filenames, loads):
+        """
+        Records expected loads of partitions.
+
+        :param partitions: file names in each partition
+        :type partitions: list(list(str or unicode))
+        :param filenames: file names or URLs
+        :type filenames: list(str or unicode)
+        :param loads: load of each file, or None if unknown
+        :type loads: list(int)
+        """
+        file_loads = dict(zip(filenames, loads))
+        self.expected = [
+            (len(partition),
+             sum(file_loads[filename] or 0 for filename in partition),
+             sum(1 for filename in partition if file_loads[filename] is None))
+            for partition in partitions]
+
+    def time_partition(self, index, partitions):
+        """
+        Yields the file names of a partition, recording the time until
+        they have all been consumed. For use with
+        pyspark.rdd.RDD.mapPartitionsWithIndex.
+
+        :param index: partition index
+        :type index: int
+        :param partitions: partition, as a list of file names
+        :type partitions: iterator(list(str or unicode))
+        :return: file names
+        :rtype: iterator(str or unicode)
+        """
+        start = time.time()
+        for partition in partitions:
+            for filename in partition:
+                yield filename
+        self.seconds.add({index: time.time() - start})
+
+    def to_dict(self):
+        """
+        Gets report. Call once the query has run.
+
+        :return: expected number of files, bytes, and files of unknown
+        size, and actual seconds, for each partition
+        :rtype: list(dict)
+        """
+        seconds = self.seconds.value
+        return [{"partition": index,
+                 "files": num_files,
+                 "expected_bytes": num_bytes,
+                 "unknown_size_files": num_unknown,
+                 "seconds": seconds.get(index)}
+                for index, (num_files, num_bytes, num_unknown)
+                in enumerate(self.expected)]
+
+
+class ErrorCollector(object):
+    """
+    Collector of errors creating objects from files, so that objects
+    are created in the same pass as they are queried, rather than in
+    a separate pass to find errors first.
+
+    Errors are keyed by file name, so a partition computed by more
+    than one action records its errors once.
+    """
+
+    def __init__(self, context):
+        """
+        Constructor.
+
+        :param context: Spark Context
+        :type context: pyspark.context.SparkContext
+        """
+        from pyspark.accumulators import AccumulatorParam
+
+        class UpdateParam(AccumulatorParam):
+            """
+            Accumulates dictionaries by updating their keys.
+            """
+
+            def zero(self, value):
+                return {}
+
+            def addInPlace(self, value1, value2):
+                value1.update(value2)
+                return value1
+
+        self.errors = context.accumulator({}, UpdateParam())
+
+    def filter_errors(self, data):
+        """
+        Yields objects, recording errors. Objects which parse their XML
+        on first use are parsed, as by
+        defoe.parse_on_use.parse_or_error, so that invalid files are
+        recorded. For use with pyspark.rdd.RDD.mapPartitions.
+
+        :param data: (object, None) or (filename, error message)
+        :type data: iterator(tuple(Object | str or unicode, str or
+        unicode))
+        :return: objects
+        :rtype: iterator(Object)
+        """
+        errors = {}
+        for obj, error in map(parse_or_error, data):
+            if error is None:
+                yield obj
+            else:
+                errors[obj] = error
+        self.errors.add(errors)
+
+    def to_list(self):
+        """
+        Gets errors. Call once the query has run.
+
+        :return: file names and error messages, sorted by file name
+        :rtype: list(tuple(str or unicode, str or unicode))
+        """
+        return sorted(self.errors.value.items())
+
+
+def files_to_work_units(context,
+                        rdd_filenames,
+                        filename_to_work_units,
+                        work_unit_to_object,
+                        pages_per_unit):
+    """
+    Split archives into work units, each a range of pages of one
+    document, and populate Spark RDD with objects for the work units,
+    one work unit per partition, so that the pages of one large
+    archive are queried in parallel.
+
+    Archives are first listed, in parallel, with
+    filename_to_work_units, which also reads each document's metadata.
+    The work units are collected, and the metadata broadcast, so that
+    work_unit_to_object need not read the metadata again for each
+    work unit.
+
+    Queries that count documents count each work unit's document, so
+    are best run over whole archives.
+
+    :param context: Spark Context
+    :type context: pyspark.context.SparkContext
+    :param rdd_filenames: RDD of file names or URLs
+    :type rdd_filenames: pyspark.rdd.RDD
+    :param filename_to_work_units: function returning ((work units,
+    metadata keyed by document code), None) or (filename, error
+    message), given a filename and pages_per_unit. Work units are
+    tuples of archive filename, document code, and start and end
+    index of pages
+    :type filename_to_work_units: function
+    :param work_unit_to_object: function returning (object, None) or
+    (name, error message), given a work unit and metadata keyed by
+    archive filename and document code
+    :type work_unit_to_object: function
+    :param pages_per_unit: maximum number of pages per work unit
+    :type pages_per_unit: int
+    :return: RDD of (object, None) or (name, error message)
+    :rtype: pyspark.rdd.RDD
+    """
+    listings = rdd_filenames.map(
+        lambda filename: filename_to_work_units(filename, pages_per_unit)) \
+        .collect()
+    work_units = []
+    metadata = {}
+    errors = []
+    for listing, error in listings:
+        if error is not None:
+            errors.append((listing, error))
+            continue
+        archive_work_units, document_metadata = listing
+        work_units.extend(archive_work_units)
+        for work_unit in archive_work_units:
+            filename, document_code = work_unit[:2]
+            metadata[(filename, document_code)] = \
+                document_metadata[document_code]
+    broadcast_metadata = context.broadcast(metadata)
+    data = context.parallelize(work_units, max(len(work_units), 1)) \
+        .map(lambda work_unit:
+             work_unit_to_object(work_unit, broadcast_metadata.value))
+    if errors:
+        data = data.union(context.parallelize(errors, 1))
+    return data
+
+
+def get_storage_footprint(context, rdd):
+    """
+    Gets memory and disk used by a persisted RDD, as reported by
+    Spark's block manager.
+
+    :param context: Spark Context
+    :type context: pyspark.context.SparkContext
+    :param rdd: RDD
+    :type rdd: pyspark.rdd.RDD
+    :return: storage level, number of partitions and of cached
+    partitions, and bytes held in memory and on disk
+    :rtype: dict
+    """
+    footprint = {"storage_level": str(rdd.getStorageLevel()),
+                 "partitions": rdd.getNumPartitions(),
+                 "cached_partitions": 0,
+                 "memory_bytes": 0,
+                 "disk_bytes": 0}
+    # pylint: disable=protected-access
+    for info in context._jsc.sc().getRDDStorageInfo():
+        if info.id() == rdd.id():
+            footprint["cached_partitions"] = info.numCachedPartitions()
+            footprint["memory_bytes"] = info.memSize()
+            footprint["disk_bytes"] = info.diskSize()
+    return footprint
+
 
 def files_to_dataframe(context,
                  num_cores=1,
@@ -94,7 +422,6 @@ def open_stream(filename):
 
     elif is_blob:
         import io
-        import os
         from azure.storage.blob import BlobService
 
         sas_token = os.environ['BLOB_SAS_TOKEN']
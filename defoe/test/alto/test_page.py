@@ -53,3 +53,10 @@ class TestPage(TestCase):
         expected phrase.
         """
         self.assertTrue("BEFORE YOU BUY" in self.page.content)
+
+    def test_wc(self):
+        """
+        Tests Page.wc property returns word confidences as floats.
+        """
+        self.assertEqual(52, len(self.page.wc))
+        self.assertEqual(0.76, self.page.wc[0])
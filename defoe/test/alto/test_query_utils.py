@@ -0,0 +1,51 @@
+"""
+defoe.alto.query_utils tests.
+"""
+
+from unittest import TestCase
+
+from defoe.alto.page import Page
+from defoe.alto.query_utils import get_document_keywords, get_page_matches
+from defoe.file_utils import get_path
+from defoe.test.alto import fixtures
+
+
+class PageList(list):
+    """
+    List of pages standing in for a document.
+    """
+
+    year = 1800
+
+
+class TestKeywordMatches(TestCase):
+    """
+    defoe.alto.query_utils keyword matching tests.
+    """
+
+    def setUp(self):
+        """
+        Creates document with two pages from test file
+        fixtures/000000037_000005.xml.
+        """
+        source = get_path(fixtures, '000000037_000005.xml')
+        self.document = PageList([Page(None, "1", source),
+                                  Page(None, "2", source)])
+
+    def test_get_page_matches(self):
+        """
+        Tests get_page_matches lists matches by keyword then page.
+        """
+        matches = get_page_matches(self.document, ["buy", "nokeyword", "you"])
+        self.assertEqual([("buy", "1"), ("buy", "2"), ("you", "1"),
+                          ("you", "2")],
+                         [(keyword, page.code)
+                          for _, _, page, keyword in matches])
+
+    def test_get_document_keywords(self):
+        """
+        Tests get_document_keywords gives sorted keywords found.
+        """
+        self.assertEqual(["buy", "you"],
+                         get_document_keywords(self.document,
+                                               ["you", "nokeyword", "buy"]))
@@ -2,6 +2,7 @@
 defoe.books.archive.Archive tests.
 """
 
+import pickle
 from unittest import TestCase
 
 from defoe.books.archive import Archive
@@ -50,3 +51,23 @@ class TestArchive(TestCase):
         self.assertTrue('000001' in codes['000000037'])
         self.assertEqual(306, len(codes['000000218']))
         self.assertTrue('03_000002' in codes['000000218'])
+
+    def test_pickle(self):
+        """
+        Tests Archive and its documents can be pickled, holding only
+        the archive's filename and manifest, and still be read once
+        unpickled.
+        """
+        document = self.archive[0]
+        for page in document:
+            pass
+        self.assertIsNotNone(self.archive.archive_zip)
+        archive = pickle.loads(pickle.dumps(self.archive))
+        self.assertIsNone(archive.archive_zip)
+        self.assertEqual(self.archive.document_codes, archive.document_codes)
+        copy = pickle.loads(pickle.dumps(document))
+        self.assertFalse(copy.parsed)
+        self.assertEqual(document.code, copy.code)
+        self.assertEqual(document.title, copy.title)
+        self.assertTrue(copy.parsed)
+        self.assertEqual(document[0].words, copy[0].words)
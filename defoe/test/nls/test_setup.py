@@ -0,0 +1,83 @@
+"""
+defoe.nls.setup tests.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+import zipfile
+
+from defoe.nls.setup import filename_to_work_units, work_unit_to_object
+
+METS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<mets:mets xmlns:mets="http://www.loc.gov/METS/"
+           xmlns:mods="http://www.loc.gov/mods/v3">
+  <mods:title>Encyclopaedia</mods:title>
+  <mods:dateIssued>1771</mods:dateIssued>
+</mets:mets>
+"""
+
+
+class TestWorkUnits(TestCase):
+    """
+    defoe.nls.setup.filename_to_work_units and work_unit_to_object
+    tests.
+    """
+
+    def setUp(self):
+        """
+        Creates ZIP file with a metadata file and 5 pages in a
+        temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "archive.zip")
+        with zipfile.ZipFile(self.filename, "w") as archive_zip:
+            archive_zip.writestr("123-mets.xml", METS)
+            for page in [3, 1, 5, 2, 4]:
+                archive_zip.writestr("alto/12300{}.34.xml".format(page), "")
+
+    def tearDown(self):
+        """
+        Removes temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+    def test_work_units(self):
+        """
+        Tests documents are split into work units of consecutive
+        pages, each of which gives an archive holding only its pages
+        and the metadata listed with it.
+        """
+        listing, error = filename_to_work_units(self.filename, 2)
+        self.assertIsNone(error)
+        work_units, metadata = listing
+        self.assertEqual([(self.filename, "123", 0, 2),
+                          (self.filename, "123", 2, 4),
+                          (self.filename, "123", 4, 5)],
+                         work_units)
+        self.assertEqual({"123": METS}, metadata)
+        # Metadata given with the work unit is used in place of the
+        # metadata file.
+        document_metadata = {(self.filename, "123"):
+                             METS.replace(b"1771", b"1797")}
+        archive, error = work_unit_to_object(work_units[1], document_metadata)
+        self.assertIsNone(error)
+        archive = pickle.loads(pickle.dumps(archive))
+        documents = list(archive)
+        self.assertEqual(1, len(documents))
+        self.assertEqual(["alto/123003.34.xml", "alto/123004.34.xml"],
+                         documents[0].page_codes)
+        self.assertEqual("Encyclopaedia", documents[0].title)
+        self.assertEqual(1797, documents[0].year)
+
+    def test_work_units_error(self):
+        """
+        Tests errors listing and opening archives are returned.
+        """
+        missing = os.path.join(self.directory, "missing.zip")
+        self.assertEqual(missing, filename_to_work_units(missing, 2)[0])
+        name, error = work_unit_to_object((self.filename, "456", 0, 2), {})
+        self.assertEqual(self.filename + ":456:0-2", name)
+        self.assertIsNotNone(error)
@@ -2,6 +2,7 @@
 defoe.papers.issue.Issue tests.
 """
 
+import pickle
 from unittest import TestCase
 
 
@@ -33,6 +34,19 @@ class TestIssue(TestCase):
         self.assertEqual(11, self.issue.date.month)
         self.assertEqual(10, self.issue.date.day)
 
+    def test_pickle(self):
+        """
+        Tests Issue can be pickled and is parsed again on first use
+        once unpickled.
+        """
+        issue = pickle.loads(pickle.dumps(self.issue))
+        self.assertFalse(issue.parsed)
+        self.assertEqual("papers", issue.model)
+        self.assertFalse(issue.parsed)
+        self.assertEqual(self.issue.newspaper_id, issue.newspaper_id)
+        self.assertTrue(issue.parsed)
+        self.assertEqual(len(self.issue.articles), len(issue.articles))
+
     def test_page_count(self):
         """
         Tests Issue.page_count attribute holds expected page count.
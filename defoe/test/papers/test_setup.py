@@ -2,11 +2,14 @@
 defoe.papers.setup tests.
 """
 
+import pickle
 from unittest import TestCase
+from unittest.mock import patch
 
 from defoe.papers.issue import Issue
 from defoe.papers.setup import filename_to_object
 from defoe.file_utils import get_path
+from defoe.parse_on_use import parse_or_error
 from defoe.test.papers import fixtures
 
 
@@ -29,10 +32,10 @@ class TestSetup(TestCase):
     def test_filename_to_object_bad_xml(self):
         """
         Tests filename_to_object with a bad XML file results in a
-        tuple with a filename and an error message.
+        tuple with a filename and an error message, once parsed.
         """
         filename = get_path(fixtures, 'bad.xml')
-        result = filename_to_object(filename)
+        result = parse_or_error(filename_to_object(filename))
         self.assertTrue(result[0] is not None)
         self.assertTrue(isinstance(result[0], str))
         self.assertEqual(filename, result[0])
@@ -43,13 +46,28 @@ class TestSetup(TestCase):
     def test_filename_to_object_no_such_file(self):
         """
         Tests filename_to_object with a non-existant file results in a
-        tuple with a filename and an error message.
+        tuple with a filename and an error message, once parsed.
         """
         filename = get_path(fixtures, 'no-such-file.xml')
-        result = filename_to_object(filename)
+        result = parse_or_error(filename_to_object(filename))
         self.assertTrue(result[0] is not None)
         self.assertTrue(isinstance(result[0], str))
         self.assertEqual(filename, result[0])
         self.assertTrue(result[1] is not None)
         self.assertTrue(isinstance(result[1], str))
         self.assertTrue("No such file or directory" in str(result[1]))
+
+    def test_filename_to_object_parse_once(self):
+        """
+        Tests an Issue is parsed once, when created, cached, as
+        pickled by Spark, and then parsed and queried.
+        """
+        filename = get_path(fixtures, '1912_11_10_bl.xml')
+        with patch.object(Issue, "parse", autospec=True,
+                          side_effect=Issue.parse) as parse:
+            result = filename_to_object(filename)
+            result = (pickle.loads(pickle.dumps(result[0])), result[1])
+            issue, error = parse_or_error(result)
+            self.assertEqual(None, error)
+            self.assertTrue(len(issue.articles) > 0)
+            self.assertEqual(1, parse.call_count)
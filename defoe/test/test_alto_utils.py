@@ -0,0 +1,83 @@
+"""
+defoe.alto_utils tests.
+"""
+
+import io
+import math
+from unittest import TestCase
+
+from defoe.alto_utils import NAMESPACED_ALTO_TAGS, parse_alto
+from defoe.file_utils import get_path
+from defoe.test.alto import fixtures
+
+NAMESPACED_ALTO = b"""<?xml version="1.0" encoding="UTF-8"?>
+<alto xmlns="http://www.loc.gov/standards/alto/ns-v3#">
+  <Layout>
+    <Page ID="P1" HEIGHT="100" WIDTH="80" PC="0.9">
+      <PrintSpace>
+        <TextBlock ID="TB1">
+          <TextLine ID="TL1">
+            <String CONTENT="Near" WC="0.5" CC="01 2" HPOS="1" VPOS="2"
+                    WIDTH="3" HEIGHT="4"/>
+            <SP/>
+            <String CONTENT="Leith"/>
+            <String WC="0.1"/>
+          </TextLine>
+        </TextBlock>
+        <TextBlock ID="TB2">
+          <TextLine ID="TL2">
+            <String CONTENT="Perth" WC="x"/>
+          </TextLine>
+        </TextBlock>
+      </PrintSpace>
+    </Page>
+  </Layout>
+</alto>
+"""
+
+
+class TestParseAlto(TestCase):
+    """
+    defoe.alto_utils.parse_alto tests.
+    """
+
+    def test_parse_alto(self):
+        """
+        Tests parse_alto gives aligned columns for namespaced ALTO,
+        with NaN and None for missing and invalid values, and skips
+        Strings with no content.
+        """
+        columns, root = parse_alto(io.BytesIO(NAMESPACED_ALTO),
+                                   tags=NAMESPACED_ALTO_TAGS)
+        self.assertIsNone(root)
+        self.assertEqual("0.9", columns.page["PC"])
+        self.assertEqual(["Near", "Leith", "Perth"], columns.words)
+        self.assertEqual(0.5, columns.wc[0])
+        self.assertTrue(math.isnan(columns.wc[1]))
+        self.assertTrue(math.isnan(columns.wc[2]))
+        self.assertEqual(["01 2", None, None], columns.cc)
+        self.assertEqual([1, 2, 3, 4], [columns.hpos[0], columns.vpos[0],
+                                        columns.width[0], columns.height[0]])
+        self.assertEqual(["TL1", "TL1", "TL2"], columns.line_ids)
+        self.assertEqual(["TB1", "TB1", "TB2"], columns.block_ids)
+
+    def test_parse_alto_no_namespace(self):
+        """
+        Tests parse_alto reads only elements in no namespace by
+        default, as XPath queries such as //String/@CONTENT do.
+        """
+        columns, _ = parse_alto(io.BytesIO(NAMESPACED_ALTO))
+        self.assertEqual({}, columns.page)
+        self.assertEqual([], columns.words)
+
+    def test_parse_alto_keep_tree(self):
+        """
+        Tests parse_alto keeps the tree only if asked to, and gives
+        the same columns either way.
+        """
+        source = get_path(fixtures, "000000037_000005.xml")
+        columns, root = parse_alto(source, keep_tree=True)
+        self.assertEqual(52, len(root.findall(".//String")))
+        streamed, _ = parse_alto(source)
+        self.assertEqual(columns.words, streamed.words)
+        self.assertEqual(list(columns.wc), list(streamed.wc))
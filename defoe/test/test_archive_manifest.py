@@ -0,0 +1,93 @@
+"""
+defoe.archive_manifest tests.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from defoe.archive_manifest import directory_members, get_archive_type, \
+    manifest_path, read_manifest, write_manifest
+from defoe.alto.document import Document
+from defoe.books.archive import Archive
+from defoe.file_utils import get_path
+from defoe.test.books import fixtures
+
+
+class TestArchiveManifest(TestCase):
+    """
+    defoe.archive_manifest tests.
+    """
+
+    def setUp(self):
+        """
+        Copies test file
+        fixtures/000000037_0_1-42pgs__944211_dat_modified.zip to a
+        temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "archive.zip")
+        shutil.copy(get_path(fixtures,
+                             "000000037_0_1-42pgs__944211_dat_modified.zip"),
+                    self.filename)
+
+    def tearDown(self):
+        """
+        Removes temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+    def test_read_manifest(self):
+        """
+        Tests an archive is built from its manifest without opening the
+        ZIP file, and gives the same documents and pages.
+        """
+        archive = Archive(self.filename)
+        self.assertIsNone(read_manifest(self.filename,
+                                        get_archive_type(archive)))
+        self.assertEqual(manifest_path(self.filename),
+                         write_manifest(self.filename, archive.manifest))
+        manifest_archive = Archive(self.filename)
+        self.assertIsNone(manifest_archive.archive_zip)
+        self.assertEqual(archive.document_codes,
+                         manifest_archive.document_codes)
+        self.assertEqual(
+            archive.members["000000037_metadata.xml"],
+            manifest_archive.members["000000037_metadata.xml"])
+        document = [document for document in manifest_archive
+                    if document.code == "000000037"][0]
+        self.assertEqual(42, document.num_pages)
+        self.assertEqual(
+            sorted(archive.manifest["document_codes"]["000000037"],
+                   key=Document.sorter),
+            archive.manifest["document_codes"]["000000037"])
+
+    def test_read_manifest_stale(self):
+        """
+        Tests a manifest is not used once its archive is modified.
+        """
+        archive = Archive(self.filename)
+        write_manifest(self.filename, archive.manifest)
+        stat = os.stat(self.filename)
+        os.utime(self.filename, ns=(stat.st_atime_ns,
+                                    stat.st_mtime_ns + 1000000000))
+        self.assertIsNone(read_manifest(self.filename,
+                                        get_archive_type(archive)))
+        self.assertIsNotNone(Archive(self.filename).archive_zip)
+
+    def test_directory_members(self):
+        """
+        Tests directory_members lists files, and files in
+        subdirectories if asked to.
+        """
+        os.mkdir(os.path.join(self.directory, "alto"))
+        with open(os.path.join(self.directory, "alto", "1.xml"), "w") as f:
+            f.write("<alto/>")
+        filenames, members, subdirectories = directory_members(
+            self.directory, recurse=True)
+        self.assertEqual(["alto/1.xml", "archive.zip"], sorted(filenames))
+        self.assertEqual([None, 7, 7], members["alto/1.xml"])
+        self.assertEqual(["alto"], subdirectories)
+        filenames, _, _ = directory_members(self.directory)
+        self.assertEqual(["archive.zip"], filenames)
@@ -0,0 +1,141 @@
+"""
+defoe.bloom_filters tests.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from defoe.archive_manifest import archive_stat
+from defoe.bloom_filters import BLOOM_DIR_ENV, BloomFilter, \
+    candidate_pages, create_sidecar, might_contain, read_sidecar, \
+    sidecar_false_positive_rate, sidecar_path, write_sidecar
+from defoe.query_utils import PreprocessWordType
+
+NORMALIZE = PreprocessWordType.NORMALIZE
+
+
+class TestBloomFilter(TestCase):
+    """
+    defoe.bloom_filters.BloomFilter tests.
+    """
+
+    def test_bloom_filter(self):
+        """
+        Tests filters hold all their words, and few others, and
+        survive conversion to and from lists.
+        """
+        words = ["word{}".format(i) for i in range(1000)]
+        bloom_filter = BloomFilter.from_words(words, 0.01)
+        bloom_filter = BloomFilter.from_list(bloom_filter.to_list())
+        self.assertTrue(all(word in bloom_filter for word in words))
+        false_positives = sum("other{}".format(i) in bloom_filter
+                              for i in range(10000))
+        self.assertLess(false_positives, 200)
+        self.assertLess(bloom_filter.false_positive_rate(), 0.02)
+        self.assertNotIn("word", BloomFilter.from_words([]))
+
+
+class TestSidecar(TestCase):
+    """
+    defoe.bloom_filters sidecar tests.
+    """
+
+    def setUp(self):
+        """
+        Creates archive file in a temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "archive.zip")
+        with open(self.filename, "w") as f:
+            f.write("archive")
+        units = [("1", ["The", "cat", "sat"]),
+                 ("2", ["A", "dog"]),
+                 ("", ["ant"]),
+                 ("", ["bee"])]
+        self.sidecar = create_sidecar(units,
+                                      archive_stat(self.filename),
+                                      [NORMALIZE])
+
+    def tearDown(self):
+        """
+        Removes temporary directory.
+        """
+        shutil.rmtree(self.directory)
+        os.environ.pop(BLOOM_DIR_ENV, None)
+
+    def test_sidecar(self):
+        """
+        Tests sidecars are read while the archive is unchanged, and
+        their filters skip pages lacking all keywords.
+        """
+        path = write_sidecar(self.filename, self.sidecar)
+        self.assertEqual(self.filename + ".bloom.json", path)
+        self.assertEqual(self.sidecar, read_sidecar(self.filename))
+        self.assertLess(sidecar_false_positive_rate(self.sidecar), 0.02)
+        self.assertTrue(might_contain(self.filename, "1", ["cat"],
+                                      NORMALIZE))
+        self.assertTrue(might_contain(self.filename, "1",
+                                      ["cow", "the cat"], NORMALIZE))
+        self.assertFalse(might_contain(self.filename, "2", ["cat"],
+                                       NORMALIZE))
+        # Articles sharing a code share a filter.
+        self.assertTrue(might_contain(self.filename, "", ["ant"],
+                                      NORMALIZE))
+        self.assertTrue(might_contain(self.filename, "", ["bee"],
+                                      NORMALIZE))
+        # Pages, and preprocessing types, with no filter may hold any
+        # keyword.
+        self.assertTrue(might_contain(self.filename, "3", ["cat"],
+                                      NORMALIZE))
+        self.assertTrue(might_contain(self.filename, "2", ["cat"],
+                                      PreprocessWordType.STEM))
+        with open(self.filename, "a") as f:
+            f.write("changed")
+        self.assertIsNone(read_sidecar(self.filename))
+
+    def test_sidecar_directory(self):
+        """
+        Tests sidecars are held in the directory given by the
+        environment, if any.
+        """
+        sidecars = os.path.join(self.directory, "sidecars")
+        os.mkdir(sidecars)
+        os.environ[BLOOM_DIR_ENV] = sidecars
+        path = write_sidecar(self.filename, self.sidecar)
+        self.assertEqual(sidecars, os.path.dirname(path))
+        self.assertEqual(path, sidecar_path(self.filename))
+        self.assertEqual(self.sidecar, read_sidecar(self.filename))
+
+    def test_candidate_pages(self):
+        """
+        Tests only pages which may hold keywords are read, and all
+        pages are read if there is no sidecar.
+        """
+
+        class Archive(object):
+            filename = self.filename
+
+        class Document(object):
+            archive = Archive()
+            page_codes = ["1", "2"]
+
+            def page(self, code):
+                return "page " + code
+
+            def __iter__(self):
+                return iter([self.page(code) for code in self.page_codes])
+
+        document = Document()
+        self.assertEqual(["page 1", "page 2"],
+                         list(candidate_pages(document, ["dog"], NORMALIZE)))
+        Archive.filename = os.path.join(self.directory, "other.zip")
+        with open(Archive.filename, "w") as f:
+            f.write("archive")
+        self.sidecar["stat"] = archive_stat(Archive.filename)
+        write_sidecar(Archive.filename, self.sidecar)
+        self.assertEqual(["page 2"],
+                         list(candidate_pages(document, ["dog"], NORMALIZE)))
+        self.assertEqual([],
+                         list(candidate_pages(document, ["cow"], NORMALIZE)))
@@ -0,0 +1,104 @@
+"""
+defoe.fused_query tests.
+"""
+
+import os
+import tempfile
+from unittest import TestCase
+
+from defoe.alto.page import Page
+from defoe.file_utils import get_path
+from defoe.fused_query import PageText, combine_tagged, extend_list, \
+    group_pairs, map_archive
+from defoe.nls.queries import keyword_by_word, normalize, total_words
+from defoe.query_utils import PreprocessWordType, normalize as normalize_word
+from defoe.test.alto import fixtures
+
+
+class PageList(list):
+    """
+    List of pages standing in for a document.
+    """
+
+    year = 1800
+
+    @property
+    def num_pages(self):
+        return len(self)
+
+
+class TestFusedQuery(TestCase):
+    """
+    defoe.fused_query tests.
+    """
+
+    def setUp(self):
+        """
+        Creates archive with a document with two pages from test
+        file fixtures/000000037_000005.xml.
+        """
+        source = get_path(fixtures, "000000037_000005.xml")
+        self.archive = [PageList([Page(None, "1", source),
+                                  Page(None, "2", source)])]
+        self.num_words = len(self.archive[0][0].words)
+
+    def test_extend_list(self):
+        """
+        Tests extend_list extends the first list in place.
+        """
+        values = [1]
+        self.assertIs(values, extend_list(values, [2, 3]))
+        self.assertEqual([1, 2, 3], values)
+
+    def test_group_pairs(self):
+        """
+        Tests group_pairs groups by either part of the keys.
+        """
+        pairs = [((1771, "a"), 1), ((1771, "b"), 2), ((1797, "a"), 3)]
+        self.assertEqual([(1771, [("a", 1), ("b", 2)]), (1797, [("a", 3)])],
+                         group_pairs(pairs))
+        self.assertEqual([("a", [(1771, 1), (1797, 3)]), ("b", [(1771, 2)])],
+                         group_pairs(pairs, 1))
+
+    def test_page_text(self):
+        """
+        Tests PageText preprocesses words once for each preprocess
+        type.
+        """
+        page_text = PageText(self.archive[0], self.archive[0][0])
+        words = page_text.words(PreprocessWordType.NORMALIZE)
+        self.assertIs(words, page_text.words(PreprocessWordType.NORMALIZE))
+        self.assertEqual(self.num_words, len(words))
+        self.assertEqual(1800, page_text.year)
+
+    def test_map_archive(self):
+        """
+        Tests queries fused with map_archive give the same results as
+        each would alone.
+        """
+        with tempfile.NamedTemporaryFile("w", delete=False) as f:
+            f.write("buy\nnokeyword\n")
+        try:
+            queries = [total_words.fused_query(),
+                       normalize.fused_query(),
+                       keyword_by_word.fused_query(f.name)]
+        finally:
+            os.remove(f.name)
+        combined = {}
+        for key, value in map_archive(self.archive, queries):
+            if key in combined:
+                value = combine_tagged(queries, combined[key], value)
+            combined[key] = value
+        query_pairs = [[], [], []]
+        for (index, key), (_, value) in combined.items():
+            query_pairs[index].append((key, value))
+        results = [query.result(query_pairs[index])
+                   for index, query in enumerate(queries)]
+        self.assertEqual({"num_documents": 1,
+                          "num_words": 2 * self.num_words},
+                         results[0])
+        self.assertEqual([(1800, [1, 2, 2 * self.num_words])], results[1])
+        self.assertEqual(1, len(results[2]))
+        num_buy = [normalize_word(word)
+                   for word in self.archive[0][0].words].count("buy")
+        self.assertEqual([("buy", [(1800, 2 * num_buy)])], results[2])
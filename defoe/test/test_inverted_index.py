@@ -0,0 +1,251 @@
+"""
+defoe.inverted_index tests.
+"""
+
+import os.path
+import shutil
+import tempfile
+from unittest import TestCase
+import zipfile
+
+import yaml
+
+from defoe.alto.page import Page
+from defoe.file_utils import get_path
+from defoe.fused_query import PageText
+from defoe.inverted_index import InvertedIndex, MANIFEST_FILE, \
+    archive_to_pages, archives_to_manifest, count_phrases, count_terms, \
+    find_index, hit_pages, open_pages, read_build_config, \
+    segments_to_manifest, write_segments
+from defoe.nls.setup import filename_to_object
+from defoe.page_records import ArchiveRecord
+from defoe.query_utils import KeysentenceMatcher, PreprocessWordType, \
+    normalize
+from defoe.test.alto import fixtures
+from defoe.test.nls.test_setup import METS
+
+NORMALIZE = PreprocessWordType.NORMALIZE
+
+
+class TestInvertedIndex(TestCase):
+    """
+    defoe.inverted_index tests.
+    """
+
+    def setUp(self):
+        """
+        Creates temporary index directory.
+        """
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Removes temporary index directory.
+        """
+        shutil.rmtree(self.path)
+
+    def build(self, pages, pages_per_segment):
+        """
+        Writes segments and manifest, as the index build job does.
+
+        :param pages: pages, as returned by archive_to_pages
+        :type pages: list(tuple)
+        :param pages_per_segment: maximum number of pages per segment
+        :type pages_per_segment: int
+        :return: index
+        :rtype: defoe.inverted_index.InvertedIndex
+        """
+        segments = list(write_segments(self.path, 0, pages,
+                                       pages_per_segment))
+        with open(os.path.join(self.path, MANIFEST_FILE), "w") as f:
+            f.write(yaml.safe_dump(
+                {"archives": archives_to_manifest(
+                    [page[2] for page in pages]),
+                 "preprocess": segments_to_manifest(segments)}))
+        return InvertedIndex(self.path)
+
+    def test_lookup(self):
+        """
+        Tests terms are found in the pages and at the positions they
+        occur, across segments and years.
+        """
+        pages = [
+            ("normalize", "1800", "a.zip", "1", "the cat and the dog".split()),
+            ("normalize", "1800", "a.zip", "2", "a dog".split()),
+            ("normalize", "1800", "b.zip", "1", "the end".split()),
+            ("normalize", "1801", "c.zip", "1", "dog".split()),
+            ("normalize", "1801", "c.zip", "2", []),
+            ("raw_normalize", "1800", "a.zip", "1", "the catand".split())
+        ]
+        index = self.build(pages, 2)
+        self.assertEqual([NORMALIZE], index.preprocess_types())
+        self.assertEqual([NORMALIZE], index.preprocess_types(raw=True))
+        self.assertEqual(["1800", "1801"], index.years(NORMALIZE))
+        self.assertEqual(2, len(index.year_segments(NORMALIZE, "1800")))
+        self.assertEqual(
+            [("1800", "a.zip", "1", [0, 3]), ("1800", "b.zip", "1", [0])],
+            list(index.lookup("the", NORMALIZE)))
+        self.assertEqual(
+            [("1800", "a.zip", "1", [4]), ("1800", "a.zip", "2", [1]),
+             ("1801", "c.zip", "1", [0])],
+            list(index.lookup("dog", NORMALIZE)))
+        self.assertEqual([("1801", "c.zip", "1", [0])],
+                         list(index.lookup("dog", NORMALIZE, [1801])))
+        self.assertEqual([], list(index.lookup("cow", NORMALIZE)))
+        self.assertEqual([("1800", "a.zip", "1", [1])],
+                         list(index.lookup("catand", NORMALIZE, raw=True)))
+        self.assertEqual([], list(index.lookup("cat", NORMALIZE, raw=True)))
+        self.assertEqual([], list(index.lookup("dog",
+                                               PreprocessWordType.STEM)))
+        self.assertEqual(7, index.manifest["preprocess"]["normalize"]["1800"]["terms"])
+        self.assertEqual(2, index.manifest["preprocess"]["normalize"]["1801"]["pages"])
+
+    def test_lookup_phrase(self):
+        """
+        Tests phrases are found where all their terms occur in turn,
+        and counted as keysearch_by_year counts keysentences.
+        """
+        texts = ["the cat sat on the cat mat", "cat the cat", "the dog"]
+        pages = [("normalize", "1800", "a.zip", str(page), text.split())
+                 for page, text in enumerate(texts)]
+        index = self.build(pages, 2)
+        self.assertEqual(
+            [("1800", "a.zip", "0", [0, 4]), ("1800", "a.zip", "1", [1])],
+            list(index.lookup_phrase("the cat", NORMALIZE)))
+        self.assertEqual([], list(index.lookup_phrase("cat dog", NORMALIZE)))
+        self.assertEqual([], list(index.lookup_phrase("", NORMALIZE)))
+        phrases = ["the cat", "cat", "the cat", "cow", "the dog"]
+        matcher = KeysentenceMatcher(phrases)
+        expected = {}
+        for text in texts:
+            for phrase in matcher.matches(text):
+                key = ("1800", phrase)
+                expected[key] = expected.get(key, 0) + 1
+        self.assertEqual(expected,
+                         dict(count_phrases(index, phrases, NORMALIZE)))
+        self.assertEqual({("1800", "cat"): 4, ("1800", "dog"): 1},
+                         dict(count_terms(index, ["cat", "dog", "cat"],
+                                          NORMALIZE)))
+        self.assertEqual({"a.zip": {"0", "1"}},
+                         hit_pages(index, ["the cat", "cow"], NORMALIZE))
+
+    def test_find_index(self):
+        """
+        Tests indexes are found at the path configured, or next to
+        the data file, once their manifest is written.
+        """
+        data_file = os.path.join(self.path, "data.txt")
+        with open(data_file, "w") as f:
+            f.write("a.zip\n")
+        os.makedirs(data_file + ".index")
+        self.assertIsNone(find_index(data_file))
+        with open(os.path.join(data_file + ".index", MANIFEST_FILE),
+                  "w") as f:
+            f.write(yaml.safe_dump({"archives": {"a.zip": None},
+                                    "preprocess": {}}))
+        self.assertEqual(data_file + ".index", find_index(data_file).path)
+        config_file = os.path.join(self.path, "query.yml")
+        with open(config_file, "w") as f:
+            f.write("index: data.txt.index\n")
+        self.assertEqual(os.path.join(self.path, "data.txt.index"),
+                         find_index(data_file, config_file).path)
+        with open(config_file, "w") as f:
+            f.write("[word\nword:\n")
+        self.assertIsNone(find_index("other.txt", config_file, ["a.zip"]))
+
+    def test_find_index_archives(self):
+        """
+        Tests indexes are not found if they are over other archives,
+        or archives since changed.
+        """
+        archive = os.path.join(self.path, "a.zip")
+        with open(archive, "w") as f:
+            f.write("a")
+        data_file = os.path.join(self.path, "data.txt")
+        with open(data_file, "w") as f:
+            f.write(archive + "\n")
+        os.makedirs(data_file + ".index")
+        with open(os.path.join(data_file + ".index", MANIFEST_FILE),
+                  "w") as f:
+            f.write(yaml.safe_dump(
+                {"archives": archives_to_manifest([archive]),
+                 "preprocess": {}}))
+        self.assertIsNotNone(find_index(data_file))
+        self.assertIsNone(find_index(data_file,
+                                     filenames=[archive, "b.zip"]))
+        self.assertIsNone(find_index(data_file, filenames=[]))
+        with open(archive, "w") as f:
+            f.write("ab")
+        self.assertIsNone(find_index(data_file))
+
+    def test_open_pages(self):
+        """
+        Tests archives are opened holding only the pages given.
+        """
+        filename = os.path.join(self.path, "archive.zip")
+        with zipfile.ZipFile(filename, "w") as archive_zip:
+            archive_zip.writestr("123-mets.xml", METS)
+            archive_zip.writestr("456-mets.xml", METS)
+            for page in [1, 2, 3]:
+                archive_zip.writestr("alto/12300{}.34.xml".format(page), "")
+                archive_zip.writestr("alto/45600{}.34.xml".format(page), "")
+        archives = open_pages(filename,
+                              ["alto/123003.34.xml", "alto/123001.34.xml"],
+                              filename_to_object)
+        self.assertEqual(1, len(archives))
+        documents = list(archives[0])
+        self.assertEqual(["123"], [document.code for document in documents])
+        self.assertEqual(["alto/123001.34.xml", "alto/123003.34.xml"],
+                         documents[0].page_codes)
+        self.assertEqual([], open_pages(filename + ".missing", [],
+                                        filename_to_object))
+
+    def test_archive_to_pages(self):
+        """
+        Tests pages are indexed by the words of their clean text, as
+        preprocessed, with their positions in this text, and by their
+        raw words, as preprocessed, omitting those which are not terms.
+        """
+        source = get_path(fixtures, "000000037_000005.xml")
+
+        class Document(list):
+            year = 1800
+            archive = ArchiveRecord("archive.zip")
+
+        document = Document([Page(None, "1", source)])
+        pages = list(archive_to_pages([document], [NORMALIZE], [NORMALIZE]))
+        self.assertEqual(2, len(pages))
+        words = PageText(document, document[0]) \
+            .preprocessed_clean(NORMALIZE).split()
+        self.assertEqual(("normalize", "1800", "archive.zip", "1", words),
+                         pages[0])
+        raw_words = [normalize(word) for word in document[0].words]
+        self.assertIn("", raw_words)
+        self.assertEqual(("raw_normalize", "1800", "archive.zip", "1",
+                          [word for word in raw_words if word]),
+                         pages[1])
+        index = self.build(pages, 10)
+        term = words[-1]
+        positions = [position for position, word in enumerate(words)
+                     if word == term]
+        self.assertEqual([("1800", "archive.zip", "1", positions)],
+                         list(index.lookup(term, NORMALIZE)))
+
+    def test_read_build_config(self):
+        """
+        Tests index directories are relative to the configuration
+        file and preprocess may be one type or a list.
+        """
+        config_file = os.path.join(self.path, "index.yml")
+        with open(config_file, "w") as f:
+            f.write("index: index\npreprocess: [normalize, stem]\n")
+        self.assertEqual(
+            (os.path.join(self.path, "index"),
+             [NORMALIZE, PreprocessWordType.STEM], [], 10000),
+            read_build_config(config_file))
+        with open(config_file, "w") as f:
+            f.write("index: /index\npreprocess: none\n"
+                    "raw_preprocess: [normalize]\npages_per_segment: 5\n")
+        self.assertEqual(("/index", [PreprocessWordType.NONE], [NORMALIZE],
+                          5),
+                         read_build_config(config_file))
@@ -0,0 +1,100 @@
+"""
+defoe.page_cache tests.
+"""
+
+from unittest import TestCase
+
+from defoe.page_cache import PageCache
+
+
+class SizedPage(object):
+    """
+    Page with a given size.
+    """
+
+    def __init__(self, code, nbytes):
+        """
+        Constructor.
+
+        :param code: page code
+        :type code: str or unicode
+        :param nbytes: page size in bytes
+        :type nbytes: int
+        """
+        self.code = code
+        self.nbytes = nbytes
+
+
+class TestPageCache(TestCase):
+    """
+    defoe.page_cache.PageCache tests.
+    """
+
+    def setUp(self):
+        """
+        Creates page sizes and list of loaded pages.
+        """
+        self.sizes = {"a": 40, "b": 40, "c": 40, "big": 200}
+        self.loaded = []
+
+    def load(self, code):
+        """
+        Loads page, recording its code.
+
+        :param code: page code
+        :type code: str or unicode
+        :return: page
+        :rtype: SizedPage
+        """
+        self.loaded.append(code)
+        return SizedPage(code, self.sizes[code])
+
+    def test_get(self):
+        """
+        Tests get loads each page once while it is cached, and
+        evicts least-recently-used pages to stay within size.
+        """
+        cache = PageCache(100)
+        page = cache.get("a", self.load)
+        self.assertIs(page, cache.get("a", self.load))
+        cache.get("b", self.load)
+        cache.get("a", self.load)
+        cache.get("c", self.load)
+        self.assertEqual(80, cache.nbytes)
+        cache.get("a", self.load)
+        cache.get("b", self.load)
+        self.assertEqual(["a", "b", "c", "b"], self.loaded)
+        self.assertEqual(3, cache.hits)
+
+    def test_get_uncached(self):
+        """
+        Tests get does not cache pages larger than the cache, or any
+        page if the cache size is 0.
+        """
+        cache = PageCache(100)
+        cache.get("big", self.load)
+        self.assertEqual(0, len(cache))
+        cache = PageCache(0)
+        cache.get("a", self.load)
+        cache.get("a", self.load)
+        self.assertEqual(["big", "a", "a"], self.loaded)
+
+    def test_update(self):
+        """
+        Tests update counts growth of a cached page, evicting other
+        pages, or the page itself, to stay within size.
+        """
+        cache = PageCache(100)
+        page = cache.get("a", self.load)
+        cache.get("b", self.load)
+        page.nbytes = 70
+        cache.update("a")
+        self.assertEqual(70, cache.nbytes)
+        self.assertEqual(1, len(cache))
+        self.assertIs(page, cache.get("a", self.load))
+        page.nbytes = 200
+        cache.update("a")
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.nbytes)
+        cache.update("a")
+        self.assertEqual(["a", "b"], self.loaded)
@@ -0,0 +1,69 @@
+"""
+defoe.page_records tests.
+"""
+
+import pickle
+from unittest import TestCase
+
+from defoe.alto.page import Page
+from defoe.file_utils import get_path
+from defoe.fused_query import PageText
+from defoe.page_records import ArchiveRecord, DocumentRecord
+from defoe.query_utils import PreprocessWordType
+from defoe.test.alto import fixtures
+
+
+class PageList(list):
+    """
+    List of pages standing in for a document.
+    """
+
+    year = 1800
+    title = "Title"
+    archive = ArchiveRecord("archive.zip")
+
+
+class TestDocumentRecord(TestCase):
+    """
+    defoe.page_records.DocumentRecord tests.
+    """
+
+    def setUp(self):
+        """
+        Creates document with two pages from test file
+        fixtures/000000037_000005.xml.
+        """
+        source = get_path(fixtures, "000000037_000005.xml")
+        self.document = PageList([Page(None, "1", source),
+                                  Page(None, "2", source)])
+
+    def test_document_record(self):
+        """
+        Tests records hold document metadata and page words and
+        survive pickling.
+        """
+        record = pickle.loads(pickle.dumps(DocumentRecord(self.document)))
+        self.assertEqual(1800, record.year)
+        self.assertEqual("Title", record.title)
+        self.assertIsNone(record.edition)
+        self.assertEqual("archive.zip", record.archive.filename)
+        self.assertEqual(["1", "2"], [page.code for page in record])
+        self.assertEqual(self.document[0].words, record.pages[0].words)
+        self.assertEqual(self.document[0].wc, record.pages[0].wc)
+        self.assertEqual(2 * len(self.document[0].words),
+                         len(list(record.words())))
+        self.assertIs(record, record.pages[1].document)
+
+    def test_page_text(self):
+        """
+        Tests PageText uses the clean text held by page records, which
+        is that it computes from pages.
+        """
+        record = DocumentRecord(self.document)
+        page_text = PageText(self.document, self.document[0])
+        record_text = PageText(record, record.pages[0])
+        self.assertIs(record.pages[0].clean_text, record_text.clean)
+        self.assertEqual(page_text.clean, record_text.clean)
+        self.assertEqual(
+            page_text.preprocessed_clean(PreprocessWordType.NORMALIZE),
+            record_text.preprocessed_clean(PreprocessWordType.NORMALIZE))
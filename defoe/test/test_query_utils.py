@@ -0,0 +1,406 @@
+"""
+defoe.query_utils tests.
+"""
+
+import datetime
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+import spacy
+
+import defoe
+from defoe import query_utils
+from defoe.alto.page import Page
+from defoe.file_utils import get_path
+from defoe.query_utils import PreprocessWordType
+from defoe.test.alto import fixtures
+
+
+class TestPreprocessWord(TestCase):
+    """
+    defoe.query_utils.preprocess_word and preprocess_words tests.
+    """
+
+    def setUp(self):
+        """
+        Empties preprocessing caches.
+        """
+        query_utils.clear_preprocess_caches()
+
+    def test_preprocess_word_none(self):
+        """
+        Tests preprocess_word with NONE returns the word unchanged.
+        """
+        self.assertEqual("Books,",
+                         query_utils.preprocess_word("Books,",
+                                                     PreprocessWordType.NONE))
+
+    def test_preprocess_word_normalize(self):
+        """
+        Tests preprocess_word with NORMALIZE lower-cases the word and
+        removes non a-z characters.
+        """
+        self.assertEqual("books",
+                         query_utils.preprocess_word(
+                             "Books,", PreprocessWordType.NORMALIZE))
+
+    def test_preprocess_word_stem(self):
+        """
+        Tests preprocess_word with STEM normalizes and stems the word.
+        """
+        self.assertEqual("look",
+                         query_utils.preprocess_word(
+                             "Looked.", PreprocessWordType.STEM))
+
+    def test_preprocess_word_memoized(self):
+        """
+        Tests repeated calls to preprocess_word are served from the
+        cache for that preprocessing type.
+        """
+        for _ in range(3):
+            query_utils.preprocess_word("Looked", PreprocessWordType.STEM)
+        info = query_utils._PREPROCESSORS[  # pylint: disable=protected-access
+            PreprocessWordType.STEM].cache_info()
+        self.assertEqual(1, info.misses)
+        self.assertEqual(2, info.hits)
+
+    def test_preprocess_words(self):
+        """
+        Tests preprocess_words gives the same results as
+        preprocess_word applied to each word.
+        """
+        words = ["The", "Books", "looked", "old."]
+        for preprocess_type in [PreprocessWordType.NONE,
+                                PreprocessWordType.NORMALIZE,
+                                PreprocessWordType.STEM]:
+            expected = [query_utils.preprocess_word(word, preprocess_type)
+                        for word in words]
+            self.assertEqual(expected,
+                             query_utils.preprocess_words(words,
+                                                          preprocess_type))
+
+    def test_import_lazy(self):
+        """
+        Tests importing query utilities does not import spaCy or NLTK,
+        which are imported on first use.
+        """
+        code = ("import sys, defoe.query_utils, defoe.nls.query_utils; "
+                "print(' '.join(m for m in ['spacy', 'nltk'] "
+                "if m in sys.modules))")
+        proc = subprocess.run([sys.executable, "-c", code],
+                              stdout=subprocess.PIPE,
+                              check=True)
+        self.assertEqual(b"", proc.stdout.strip())
+
+    def test_stemmer_shared(self):
+        """
+        Tests get_stemmer returns the same stemmer on each call.
+        """
+        self.assertIs(query_utils.get_stemmer(), query_utils.get_stemmer())
+
+    def test_preprocess_words_vocabulary_maps(self):
+        """
+        Tests preprocess_words looks up words in vocabulary maps and
+        preprocesses words missing from the maps as usual.
+        """
+        vocabulary_maps = {PreprocessWordType.STEM: {"books": "BOOK"}}
+        self.assertEqual(["BOOK", "look"],
+                         query_utils.preprocess_words(
+                             ["Books,", "looked"],
+                             PreprocessWordType.STEM,
+                             vocabulary_maps))
+        self.assertEqual(["books", "looked"],
+                         query_utils.preprocess_words(
+                             ["Books,", "looked"],
+                             PreprocessWordType.NORMALIZE,
+                             vocabulary_maps))
+
+
+class TestTokenPipeline(TestCase):
+    """
+    defoe.query_utils token pipeline tests.
+    """
+
+    def test_join_words(self):
+        """
+        Tests join_words joins words with ' ', skipping leading empty
+        words only.
+        """
+        self.assertEqual("a  b", query_utils.join_words(["", "a", "", "b"]))
+        self.assertEqual("", query_utils.join_words([]))
+
+    def test_split_camel_case_words(self):
+        """
+        Tests split_camel_case_words splits words that run together
+        and leaves words holding '.' unchanged.
+        """
+        self.assertEqual(["of Edinburgh", "EDINBURGH", "N.W", "leith"],
+                         list(query_utils.split_camel_case_words(
+                             ["ofEdinburgh", "EDINBURGH", "N.W", "leith"])))
+
+    def test_clean_words(self):
+        """
+        Tests clean_words rejoins hyphenated words and drops empty
+        words.
+        """
+        self.assertEqual(["The", "example", "text"],
+                         query_utils.clean_words(
+                             ["", "The", "exam-", "ple", "", "text"]))
+
+
+class TestLongS(TestCase):
+    """
+    defoe.query_utils long-s correction tests.
+    """
+
+    def test_longsfix_sentence(self):
+        """
+        Tests longsfix_sentence corrects long-s misspellings, keeping
+        case and punctuation.
+        """
+        self.assertEqual("The House, of Most lords.",
+                         query_utils.longsfix_sentence(
+                             "The Houfe, of Moft lords."))
+
+    def test_longsfix_sentence_fs(self):
+        """
+        Tests longsfix_sentence replaces 'fs' by 'ss' when preceded by
+        a vowel and keeps only the first line.
+        """
+        self.assertEqual("cross",
+                         query_utils.longsfix_sentence("crofs\nsecond"))
+
+    def test_fix_long_s_lxtransduce(self):
+        """
+        Tests fix_long_s gives the same output as lxtransduce run with
+        f-to-s.lex and fix-spelling.gr.
+        """
+        lexicon = sorted(query_utils.get_long_s_lexicon())
+        words = lexicon[::20]
+        lines = [" ".join(words),
+                 " ".join(word.upper() for word in words),
+                 " ".join(word.capitalize() for word in words),
+                 " ".join(word.swapcase()[:-1] + word[-1] for word in words),
+                 " ".join("1" + word + "," for word in words),
+                 " ".join(word + "x" for word in words),
+                 "f F fe Fe \u00e9houfe ho\u00fcfe (Moft) \"houfe\" & <b>",
+                 " ".join(Page(None, None,
+                               get_path(fixtures,
+                                        "000000037_000005.xml")).words)]
+        text = "\n".join(lines)
+        cmd = [get_path(defoe, "lxtransduce"),
+               "-l", "spelling=" + get_path(defoe, "f-to-s.lex"),
+               get_path(defoe, "fix-spelling.gr")]
+        try:
+            proc = subprocess.run(cmd,
+                                  input=text.encode("utf-8"),
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE,
+                                  check=True)
+        except (OSError, subprocess.CalledProcessError) as exception:
+            self.skipTest("lxtransduce cannot be run: {}".format(exception))
+        expected = proc.stdout.decode("utf-8").split("\n")
+        actual = query_utils.fix_long_s(text).split("\n")
+        for expected_line, actual_line in zip(expected, actual):
+            self.assertEqual(expected_line, actual_line)
+        self.assertEqual(len(lines), len(actual))
+
+
+class TestGeoparserSplit(TestCase):
+    """
+    defoe.query_utils.geoparser_split_coord_xml tests.
+    """
+
+    GEO_XML = b"""<document version="3">
+<text>
+<p><s id="s1"><w id="w0">Near</w> <w id="w5">Leith</w></s></p>
+
+<p><s id="s2"><w id="w12">In</w> <w id="w15">New</w> <w id="w19">York</w></s></p>
+
+<p><s id="s3"><w id="w25">Nothing</w></s></p>
+</text>
+<standoff><ents source="ner-rb">
+  <ent id="rb1" type="location" lat="55.97" long="-3.17">
+    <parts><part ew="w5" sw="w5">Leith</part></parts>
+  </ent>
+  <ent id="rb2" type="person">
+    <parts><part ew="w12" sw="w12">In</part></parts>
+  </ent>
+  <ent id="rb3" type="location" lat="40.71" long="-74.00">
+    <parts><part ew="w19" sw="w15">New York</part></parts>
+  </ent>
+  <ent id="rb4" type="location">
+    <parts><part ew="w25" sw="w25">Nothing</part></parts>
+  </ent>
+</ents></standoff></document>"""
+
+    def test_geoparser_split_coord_xml(self):
+        """
+        Tests geoparser_split_coord_xml assigns resolved locations to
+        the paragraph holding their first word.
+        """
+        self.assertEqual([{"Leith-rb1": ("55.97", "-3.17")},
+                          {"New York-rb3": ("40.71", "-74.00")},
+                          {}],
+                         query_utils.geoparser_split_coord_xml(
+                             self.GEO_XML, 3))
+
+    def test_geoparser_split_coord_xml_mismatch(self):
+        """
+        Tests geoparser_split_coord_xml raises ValueError if the
+        number of paragraphs is not the number of texts.
+        """
+        with self.assertRaises(ValueError):
+            query_utils.geoparser_split_coord_xml(self.GEO_XML, 2)
+
+
+class TestGeoparserDocument(TestCase):
+    """
+    defoe.query_utils.geoparser_document tests.
+    """
+
+    def test_geoparser_document_escape(self):
+        """
+        Tests geoparser_document escapes markup and replaces control
+        characters and white space by single spaces.
+        """
+        document = query_utils.geoparser_document(
+            ["Leith & <b>\x01 \tPerth"], datetime.date(2020, 1, 19))
+        self.assertIn("<p>Leith &amp; &lt;b&gt; Perth</p>", document)
+        self.assertIn('day-number="737442" day="Sunday" wdaynum="7"',
+                      document)
+
+    def test_geoparser_document_prepare_plain(self):
+        """
+        Tests geoparser_document gives the same document as the
+        geoparser's prepare-plain script.
+        """
+        words = Page(None, None,
+                     get_path(fixtures, "000000037_000005.xml")).words
+        texts = [" ".join(words), " ".join(words[:10]), "'\"Leith\"'"]
+        cmd = [get_path(defoe, "..", "geoparser-v1.1", "scripts",
+                        "prepare-plain"), "-d", "2020-01-19"]
+        try:
+            proc = subprocess.run(cmd,
+                                  input=("\n\n".join(texts) + "\n")
+                                  .encode("utf-8"),
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE,
+                                  check=True)
+        except (OSError, subprocess.CalledProcessError) as exception:
+            self.skipTest("prepare-plain cannot be run: {}".format(exception))
+        self.assertEqual(proc.stdout.decode("utf-8"),
+                         query_utils.geoparser_document(
+                             texts, datetime.date(2020, 1, 19)))
+
+
+class TestSpacyModels(TestCase):
+    """
+    defoe.query_utils spaCy model registry tests.
+    """
+
+    def setUp(self):
+        """
+        Saves a blank English spaCy model to a temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        spacy.blank("en").to_disk(self.directory)
+
+    def tearDown(self):
+        """
+        Removes temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+    def test_get_spacy_model(self):
+        """
+        Tests get_spacy_model loads each model once per process.
+        """
+        self.assertIs(query_utils.get_spacy_model(self.directory),
+                      query_utils.get_spacy_model(self.directory))
+
+    def test_spacy_nlp_pages(self):
+        """
+        Tests spacy_nlp_pages appends the spaCy document for each
+        page's text, across batches.
+        """
+        pages = [("a", "Near Leith"), ("b", ""), ("c", "In the town of Perth")]
+        results = list(query_utils.spacy_nlp_pages(
+            iter(pages), 1, self.directory, batch_size=2))
+        self.assertEqual(pages, [result[:2] for result in results])
+        self.assertEqual([text for _, text in pages],
+                         [result[2].text for result in results])
+
+
+class TestOcrQuality(TestCase):
+    """
+    defoe.query_utils OCR quality tests.
+    """
+
+    def setUp(self):
+        """
+        Replaces dictionary with a small one.
+        """
+        self.dictionary = query_utils._DICTIONARY  # pylint: disable=protected-access
+        query_utils._DICTIONARY = frozenset(["near", "leith"])  # pylint: disable=protected-access
+
+    def tearDown(self):
+        """
+        Restores dictionary.
+        """
+        query_utils._DICTIONARY = self.dictionary  # pylint: disable=protected-access
+
+    def test_calculate_words_within_dictionary(self):
+        """
+        Tests words empty after preprocessing are not counted.
+        """
+        self.assertEqual("50.0",
+                         query_utils.calculate_words_within_dictionary(
+                             ["Near", "--", "Leith", "Lcith", "Tovvn"]))
+        self.assertEqual("0",
+                         query_utils.calculate_words_within_dictionary(["--"]))
+
+
+class TestKeysentenceMatcher(TestCase):
+    """
+    defoe.query_utils.KeysentenceMatcher tests.
+    """
+
+    def test_matches(self):
+        """
+        Tests words and phrases match whole words, once per match,
+        including overlapping and nested matches.
+        """
+        matcher = query_utils.KeysentenceMatcher(
+            ["new york", "york", "he", "she sells", "sells sea shells", ""])
+        text = "she sells sea shells in new york and yorkshire new yorks"
+        self.assertEqual(["new york", "sells sea shells", "she sells", "york"],
+                         matcher.matches(text))
+        self.assertTrue(matcher.contains_any(text))
+        self.assertFalse(matcher.contains_any("yorkshire anew yorker"))
+        self.assertEqual([], matcher.matches(""))
+
+    def test_repeated_words(self):
+        """
+        Tests keysentences with repeated words match after partial
+        matches.
+        """
+        matcher = query_utils.KeysentenceMatcher(["ha ha", "ha ho"])
+        self.assertEqual(["ha ha", "ha ha", "ha ho"],
+                         matcher.matches("ha ha ha ho"))
+
+    def test_get_sentences_list_matches(self):
+        """
+        Tests get_sentences_list_matches accepts keysentences or a
+        matcher.
+        """
+        keysentences = ["cholera", "typhus fever"]
+        text = "typhus fever and cholera and cholera"
+        expected = ["cholera", "cholera", "typhus fever"]
+        self.assertEqual(expected, query_utils.get_sentences_list_matches(
+            text, keysentences))
+        self.assertEqual(expected, query_utils.get_sentences_list_matches(
+            text, query_utils.KeysentenceMatcher(keysentences)))
@@ -0,0 +1,76 @@
+"""
+defoe.spark_utils tests.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from defoe.archive_manifest import write_manifest
+from defoe.books.archive import Archive
+from defoe.file_utils import get_path
+from defoe.spark_utils import file_load, partition_files
+from defoe.test.books import fixtures
+
+
+class TestPartitionFiles(TestCase):
+    """
+    defoe.spark_utils.partition_files tests.
+    """
+
+    def test_partition_files(self):
+        """
+        Tests partition_files balances loads, keeping listed order
+        within partitions, and gives unknown loads the mean load.
+        """
+        self.assertEqual([["a"], ["b", "e", "f"], ["c", "d"]],
+                         partition_files(["a", "b", "c", "d", "e", "f"],
+                                         [100, 1, None, 50, 60, 2],
+                                         3))
+
+    def test_partition_files_few(self):
+        """
+        Tests partition_files gives no empty partitions.
+        """
+        self.assertEqual([["a"], ["b"]],
+                         partition_files(["a", "b"], [None, None], 4))
+
+
+class TestFileLoad(TestCase):
+    """
+    defoe.spark_utils.file_load tests.
+    """
+
+    def setUp(self):
+        """
+        Copies test file
+        fixtures/000000037_0_1-42pgs__944211_dat_modified.zip to a
+        temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "archive.zip")
+        shutil.copy(get_path(fixtures,
+                             "000000037_0_1-42pgs__944211_dat_modified.zip"),
+                    self.filename)
+
+    def tearDown(self):
+        """
+        Removes temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+    def test_file_load(self):
+        """
+        Tests file_load gives file size, or uncompressed size if there
+        is a manifest, and None for URLs and directories.
+        """
+        self.assertEqual(os.path.getsize(self.filename),
+                         file_load(self.filename))
+        archive = Archive(self.filename)
+        write_manifest(self.filename, archive.manifest)
+        self.assertEqual(sum(info.file_size
+                             for info in archive.zip.infolist()),
+                         file_load(self.filename))
+        self.assertIsNone(file_load(self.directory))
+        self.assertIsNone(file_load("http://example.org/archive.zip"))
@@ -0,0 +1,81 @@
+"""
+defoe.token_ids tests.
+"""
+
+import pickle
+from unittest import TestCase
+
+from defoe.nls.query_utils import get_concordance, get_text_keyword_idx
+from defoe.token_ids import TokenText, Vocabulary
+
+TEXT = "the cholera and the typhus fever and the cholera morbus"
+
+
+class TestTokenText(TestCase):
+    """
+    defoe.token_ids.TokenText tests.
+    """
+
+    def setUp(self):
+        """
+        Creates token text over a new vocabulary.
+        """
+        self.vocabulary = Vocabulary()
+        self.text = TokenText(TEXT, self.vocabulary)
+
+    def test_keyword_positions(self):
+        """
+        Tests keyword_positions gives the same matches as for strings,
+        ignoring keywords not in the vocabulary.
+        """
+        keywords = ["cholera", "fever", "smallpox"]
+        self.assertEqual(get_text_keyword_idx(TEXT, keywords),
+                         self.text.keyword_positions(keywords))
+        self.assertEqual(get_text_keyword_idx(TEXT, keywords),
+                         get_text_keyword_idx(self.text, keywords))
+        self.assertNotIn("smallpox", self.vocabulary.ids)
+
+    def test_keyword_counts(self):
+        """
+        Tests keyword_counts counts occurrences of keywords found.
+        """
+        self.assertEqual({"cholera": 2, "the": 3},
+                         self.text.keyword_counts(["the", "cholera", "plague"]))
+
+    def test_phrase_positions(self):
+        """
+        Tests phrase_positions finds phrases starting at each word.
+        """
+        self.assertEqual([1, 8], self.text.phrase_positions("cholera"))
+        self.assertEqual([0, 3, 7], self.text.phrase_positions("the"))
+        self.assertEqual([4], self.text.phrase_positions("typhus fever and"))
+        self.assertEqual([], self.text.phrase_positions("fever the"))
+        self.assertEqual([], self.text.phrase_positions("cholera plague"))
+        self.assertEqual([], self.text.phrase_positions(""))
+
+    def test_concordance(self):
+        """
+        Tests concordance gives the same words as for strings, at the
+        start, middle and end of the text.
+        """
+        for position in [0, 4, 9]:
+            self.assertEqual(get_concordance(TEXT, None, position, 2),
+                             get_concordance(self.text, None, position, 2))
+
+    def test_pickle(self):
+        """
+        Tests token text pickles as its words.
+        """
+        text = pickle.loads(pickle.dumps(self.text))
+        self.assertEqual(TEXT.split(), text.vocabulary.decode(text.token_ids))
+
+    def test_vocabulary(self):
+        """
+        Tests texts created without a vocabulary each have their own.
+        """
+        text = TokenText(TEXT)
+        other = TokenText("plague")
+        self.assertIsNot(text.vocabulary, other.vocabulary)
+        self.assertEqual(6, len(text.vocabulary))
+        self.assertEqual([], text.phrase_positions("plague"))
+        self.assertEqual([0], other.phrase_positions("plague"))
@@ -0,0 +1,83 @@
+"""
+defoe.tool_utils tests.
+"""
+
+from contextlib import redirect_stdout
+import io
+from unittest import TestCase
+
+from defoe.tool_utils import ToolPool
+
+
+class TestToolPool(TestCase):
+    """
+    defoe.tool_utils.ToolPool tests.
+    """
+
+    def test_run(self):
+        """
+        Tests run feeds data through a pipeline without a shell.
+        """
+        pool = ToolPool()
+        self.assertEqual(b"HOUSE 'S $HOME\n",
+                         pool.run([["cat"], ["tr", "a-z", "A-Z"]],
+                                  b"house 's $HOME\n"))
+        self.assertEqual(1, pool.metrics["calls"])
+        self.assertEqual(0, pool.metrics["restarts"])
+
+    def test_run_short_output(self):
+        """
+        Tests run restarts a pipeline giving too little output, up to
+        the maximum number of attempts.
+        """
+        pool = ToolPool(attempts=3)
+        self.assertEqual(b'', pool.run([["cat"]], b"abc"))
+        self.assertEqual(2, pool.metrics["restarts"])
+        self.assertEqual(1, pool.metrics["failures"])
+
+    def test_run_timeout(self):
+        """
+        Tests run stops a pipeline that runs past the timeout.
+        """
+        pool = ToolPool(timeout=0.2, attempts=2)
+        self.assertEqual(b'', pool.run([["sleep", "5"]], b""))
+        self.assertEqual(2, pool.metrics["timeouts"])
+        self.assertEqual(1, pool.metrics["failures"])
+
+    def test_run_timeout_attempts(self):
+        """
+        Tests run uses the timeout and attempts given for a call in
+        place of the pool's.
+        """
+        pool = ToolPool(timeout=10, attempts=3)
+        self.assertEqual(b'', pool.run([["sleep", "5"]], b"",
+                                       timeout=0.2, attempts=1))
+        self.assertEqual(1, pool.metrics["timeouts"])
+        self.assertEqual(0, pool.metrics["restarts"])
+
+    def test_run_error(self):
+        """
+        Tests run does not restart a pipeline that reports an error.
+        """
+        pool = ToolPool()
+        self.assertEqual(b'',
+                         pool.run([["sh", "-c", "echo Error >&2; cat"]],
+                                  b"abcdef"))
+        self.assertEqual(b'', pool.run([["./no-such-tool"]], b"abcdef"))
+        self.assertEqual(0, pool.metrics["restarts"])
+        self.assertEqual(2, pool.metrics["errors"])
+
+    def test_report(self):
+        """
+        Tests metrics are logged at debug level, not printed, after a
+        call which failed.
+        """
+        pool = ToolPool(attempts=2)
+        output = io.StringIO()
+        with redirect_stdout(output), \
+                self.assertLogs("defoe.tool_utils", "DEBUG") as logs:
+            pool.run([["cat"]], b"abcdef")
+            pool.run([["cat"]], b"abc")
+        self.assertEqual("", output.getvalue())
+        self.assertEqual(["DEBUG:defoe.tool_utils:tools: calls=2 restarts=1 "
+                          "timeouts=0 errors=0 failures=1"], logs.output)
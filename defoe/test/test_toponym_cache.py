@@ -0,0 +1,95 @@
+"""
+defoe.toponym_cache tests.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from defoe import query_utils
+from defoe import toponym_cache
+from defoe.toponym_cache import ToponymCache, content_key
+
+
+class TestToponymCache(TestCase):
+    """
+    defoe.toponym_cache.ToponymCache tests.
+    """
+
+    def setUp(self):
+        """
+        Creates temporary directory for cache files.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "toponyms.sqlite")
+
+    def tearDown(self):
+        """
+        Removes temporary directory and shared cache.
+        """
+        toponym_cache._TOPONYM_CACHE = None  # pylint: disable=protected-access
+        shutil.rmtree(self.directory)
+
+    def test_get_many_put_many(self):
+        """
+        Tests values put in a cache can be got from the same file by
+        another cache.
+        """
+        key = content_key(query_utils.GEOGROUND_CMD, "Leith")
+        ToponymCache(self.path).put_many({key: ["55.97", "-3.17"]})
+        self.assertEqual({key: ["55.97", "-3.17"]},
+                         ToponymCache(self.path).get_many([key, "Perth"]))
+
+    def test_content_key(self):
+        """
+        Tests keys differ for the same toponym resolved with
+        different options.
+        """
+        self.assertNotEqual(content_key(["-g", "unlock"], "Leith"),
+                            content_key(["-g", "geonames"], "Leith"))
+
+    def test_georesolve_toponyms_cached(self):
+        """
+        Tests georesolve_toponyms gets all toponyms from the cache
+        without running geoground.
+        """
+        cache = ToponymCache(self.path)
+        toponym_cache._TOPONYM_CACHE = cache  # pylint: disable=protected-access
+        cache.put_many({
+            content_key(query_utils.GEOGROUND_CMD, "Leith"):
+            ["55.97", "-3.17"],
+            content_key(query_utils.GEOGROUND_CMD, "Perth"):
+            ["56.39", "-3.43"]})
+        calls = query_utils.get_tool_pool().metrics["calls"]
+        self.assertEqual({"Leith-1": ("55.97", "-3.17"),
+                          "Perth-2": ("56.39", "-3.43"),
+                          "Leith-3": ("55.97", "-3.17")},
+                         query_utils.georesolve_toponyms(
+                             ["Leith", "Perth", "Leith"]))
+        self.assertEqual(calls, query_utils.get_tool_pool().metrics["calls"])
+
+    def test_placenames_xml(self):
+        """
+        Tests placenames_xml numbers toponyms and escapes them.
+        """
+        self.assertEqual('<placenames><placename id="1" name="Leith"/>'
+                         '<placename id="2" name="A &amp; &quot;B&quot;"/>'
+                         '</placenames>',
+                         query_utils.placenames_xml(["Leith", 'A & "B"']))
+
+    def test_geoparser_resolve_batch_cached(self):
+        """
+        Tests geoparser_resolve_batch gets cached texts from the cache
+        and gives no toponyms for blank texts, without running the
+        geoparser.
+        """
+        cache = ToponymCache(self.path)
+        toponym_cache._TOPONYM_CACHE = cache  # pylint: disable=protected-access
+        cache.put_many({query_utils.geoparser_key("Near Leith"):
+                        {"Leith-rb1": ["55.97", "-3.17"]}})
+        calls = query_utils.get_tool_pool().metrics["calls"]
+        self.assertEqual([{"Leith-rb1": ("55.97", "-3.17")}, {}],
+                         query_utils.geoparser_resolve_batch(
+                             ["Near Leith", " "]))
+        self.assertEqual(calls, query_utils.get_tool_pool().metrics["calls"])
@@ -0,0 +1,214 @@
+"""
+Texts as arrays of integer token IDs, over a vocabulary of the text's
+own words, so that keywords and phrases are found by vectorized NumPy
+comparisons rather than by comparing strings word by word, and
+concordances are array slices. A vocabulary is held only as long as
+its texts, so memory does not grow with every word an executor sees.
+
+This module imports NumPy, so should only be imported by queries
+which are configured to use token IDs.
+"""
+
+import numpy as np
+
+TOKEN_ID_DTYPE = np.uint32
+""" Type of token IDs """
+
+
+class Vocabulary(object):
+    """
+    Interned vocabulary, giving each word a token ID in the order
+    words are first seen.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.ids = {}
+        self.words = []
+
+    def __len__(self):
+        """
+        Gets number of words.
+
+        :return: number of words
+        :rtype: int
+        """
+        return len(self.words)
+
+    def encode(self, words):
+        """
+        Gets token IDs of words, adding any new words to the
+        vocabulary.
+
+        :param words: words
+        :type words: list(str or unicode)
+        :return: token IDs
+        :rtype: numpy.ndarray
+        """
+        ids = self.ids
+        vocabulary_words = self.words
+        token_ids = []
+        for word in words:
+            token_id = ids.get(word)
+            if token_id is None:
+                token_id = len(vocabulary_words)
+                ids[word] = token_id
+                vocabulary_words.append(word)
+            token_ids.append(token_id)
+        return np.array(token_ids, dtype=TOKEN_ID_DTYPE)
+
+    def lookup(self, word):
+        """
+        Gets token ID of word, without adding it to the vocabulary.
+
+        :param word: word
+        :type word: str or unicode
+        :return: token ID, or None if the word has never been encoded,
+        so occurs in no text
+        :rtype: int
+        """
+        return self.ids.get(word)
+
+    def decode(self, token_ids):
+        """
+        Gets words of token IDs.
+
+        :param token_ids: token IDs
+        :type token_ids: numpy.ndarray
+        :return: words
+        :rtype: list(str or unicode)
+        """
+        words = self.words
+        return [words[token_id] for token_id in token_ids.tolist()]
+
+
+class TokenText(object):
+    """
+    Text held as an array of token IDs.
+    """
+
+    def __init__(self, text, vocabulary=None):
+        """
+        Constructor.
+
+        :param text: text, which is split on whitespace, or its words
+        :type text: str or unicode or list(str or unicode)
+        :param vocabulary: vocabulary, which may be shared by texts
+        held together. If None then a new vocabulary is used
+        :type vocabulary: defoe.token_ids.Vocabulary
+        """
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        if isinstance(text, str):
+            text = text.split()
+        self.vocabulary = vocabulary
+        self.token_ids = vocabulary.encode(text)
+
+    def __len__(self):
+        """
+        Gets number of words.
+
+        :return: number of words
+        :rtype: int
+        """
+        return len(self.token_ids)
+
+    def __getstate__(self):
+        """
+        Gets state for pickling: the text's words. Token IDs are only
+        meaningful in their vocabulary, so the words are encoded again,
+        in a new vocabulary, when unpickling.
+
+        :return: state
+        :rtype: dict
+        """
+        return {"words": self.vocabulary.decode(self.token_ids)}
+
+    def __setstate__(self, state):
+        """
+        Sets state when unpickling.
+
+        :param state: state
+        :type state: dict
+        """
+        self.__init__(state["words"])
+
+    def lookup_ids(self, words):
+        """
+        Gets token IDs of those words in the vocabulary.
+
+        :param words: words
+        :type words: list(str or unicode)
+        :return: token IDs
+        :rtype: numpy.ndarray
+        """
+        token_ids = [self.vocabulary.lookup(word) for word in words]
+        return np.array([token_id for token_id in token_ids
+                         if token_id is not None],
+                        dtype=TOKEN_ID_DTYPE)
+
+    def keyword_positions(self, keywords):
+        """
+        Gets positions of keywords.
+
+        :param keywords: keywords
+        :type keywords: list(str or unicode)
+        :return: keywords and their positions, sorted
+        :rtype: list(tuple(str or unicode, int))
+        """
+        positions = np.flatnonzero(np.isin(self.token_ids,
+                                           self.lookup_ids(keywords)))
+        words = self.vocabulary.decode(self.token_ids[positions])
+        return sorted(zip(words, positions.tolist()))
+
+    def keyword_counts(self, keywords):
+        """
+        Counts occurrences of keywords.
+
+        :param keywords: keywords
+        :type keywords: list(str or unicode)
+        :return: number of occurrences of each keyword found
+        :rtype: dict(str or unicode, int)
+        """
+        matches = self.token_ids[np.isin(self.token_ids,
+                                         self.lookup_ids(keywords))]
+        token_ids, counts = np.unique(matches, return_counts=True)
+        return dict(zip(self.vocabulary.decode(token_ids), counts.tolist()))
+
+    def phrase_positions(self, phrase):
+        """
+        Gets positions at which a phrase starts, comparing the text
+        with itself shifted by each word of the phrase.
+
+        :param phrase: phrase, one or more space-separated words
+        :type phrase: str or unicode
+        :return: positions
+        :rtype: list(int)
+        """
+        words = phrase.split()
+        token_ids = [self.vocabulary.lookup(word) for word in words]
+        num_starts = len(self.token_ids) - len(words) + 1
+        if not words or None in token_ids or num_starts < 1:
+            return []
+        mask = self.token_ids[:num_starts] == token_ids[0]
+        for offset in range(1, len(token_ids)):
+            mask &= self.token_ids[offset:offset + num_starts] == \
+                token_ids[offset]
+        return np.flatnonzero(mask).tolist()
+
+    def concordance(self, position, window):
+        """
+        Gets words around a position.
+
+        :param position: position
+        :type position: int
+        :param window: number of words to the left and right
+        :type window: int
+        :return: words
+        :rtype: list(str or unicode)
+        """
+        start = max(position - window, 0)
+        return self.vocabulary.decode(
+            self.token_ids[start:position + window + 1])
@@ -0,0 +1,206 @@
+"""
+Run external tools, such as the Edinburgh geoparser scripts, without
+a shell.
+"""
+
+import logging
+import subprocess
+import tempfile
+import threading
+
+TOOL_TIMEOUT = 300
+""" Seconds allowed for one run of a tool pipeline """
+TOOL_ATTEMPTS = 3
+""" Maximum number of runs of a tool pipeline per call """
+TOOL_WORKERS = 1
+""" Maximum number of tool pipelines run at once by a process """
+MIN_OUTPUT_LENGTH = 5
+""" Output shorter than this (in bytes) is treated as a failed run """
+
+TOOL_METRICS = ["calls", "restarts", "timeouts", "errors", "failures"]
+""" Counters kept by ToolPool """
+
+_TOOL_POOL = None
+_LOGGER = logging.getLogger(__name__)
+
+
+class ToolPool(object):
+    """
+    Runs pipelines of external tools, feeding data to the first tool's
+    standard input and returning the last tool's standard output.
+
+    A run that times out or gives too little output is restarted, up to
+    a bounded number of attempts. A run that fails to start, or reports
+    "Error" on standard error, is not restarted. Counts of calls,
+    restarts, timeouts, errors and failed calls are kept in metrics,
+    and logged at debug level after each call which was restarted or
+    failed.
+    """
+
+    def __init__(self,
+                 workers=TOOL_WORKERS,
+                 timeout=TOOL_TIMEOUT,
+                 attempts=TOOL_ATTEMPTS,
+                 cwd=None):
+        """
+        Constructor.
+
+        :param workers: maximum number of pipelines run at once
+        :type workers: int
+        :param timeout: seconds allowed for one run of a pipeline
+        :type timeout: int or float
+        :param attempts: maximum number of runs per call
+        :type attempts: int
+        :param cwd: working directory for tools, if None then the
+        current working directory is used
+        :type cwd: str or unicode
+        """
+        self.timeout = timeout
+        self.attempts = attempts
+        self.cwd = cwd
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._metrics = dict.fromkeys(TOOL_METRICS, 0)
+
+    @property
+    def metrics(self):
+        """
+        Gets counts of calls, restarts, timeouts, errors and failed
+        calls.
+
+        :return: metrics
+        :rtype: dict(str or unicode, int)
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+    def _count(self, metric):
+        """
+        Increments a metric.
+
+        :param metric: metric, one of TOOL_METRICS
+        :type metric: str or unicode
+        """
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def report(self):
+        """
+        Gets metrics as a line for logs.
+
+        :return: metrics, as "tools: calls=<N> restarts=<N> ..."
+        :rtype: str or unicode
+        """
+        metrics = self.metrics
+        return "tools: " + " ".join("{}={}".format(metric, metrics[metric])
+                                    for metric in TOOL_METRICS)
+
+    def run(self, pipeline, data, min_output=MIN_OUTPUT_LENGTH,
+            timeout=None, attempts=None):
+        """
+        Runs a pipeline of tools over data.
+
+        :param pipeline: tools, each a list of program and arguments
+        :type pipeline: list(list(str or unicode))
+        :param data: data for first tool's standard input
+        :type data: bytes
+        :param min_output: minimum length of output from a
+        successful run
+        :type min_output: int
+        :param timeout: seconds allowed for one run of the pipeline,
+        if None then the pool's timeout is used
+        :type timeout: int or float
+        :param attempts: maximum number of runs, if None then the
+        pool's attempts is used
+        :type attempts: int
+        :return: last tool's standard output, or b'' if no run
+        succeeded
+        :rtype: bytes
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if attempts is None:
+            attempts = self.attempts
+        self._count("calls")
+        with self._slots:
+            for attempt in range(attempts):
+                if attempt > 0:
+                    self._count("restarts")
+                try:
+                    stdout, stderr = self._run_once(pipeline, data, timeout)
+                except subprocess.TimeoutExpired:
+                    self._count("timeouts")
+                    continue
+                except OSError as exception:
+                    self._count("errors")
+                    print("err: '{}'".format(exception))
+                    break
+                if b"Error" in stderr:
+                    self._count("errors")
+                    print("err: '{}'".format(stderr))
+                    break
+                if len(stdout) >= min_output:
+                    if attempt > 0:
+                        _LOGGER.debug(self.report())
+                    return stdout
+        self._count("failures")
+        _LOGGER.debug(self.report())
+        return b''
+
+    def _run_once(self, pipeline, data, timeout):
+        """
+        Runs a pipeline of tools over data once. Standard error of all
+        tools is collected together, as for a shell pipeline.
+
+        :param pipeline: tools, each a list of program and arguments
+        :type pipeline: list(list(str or unicode))
+        :param data: data for first tool's standard input
+        :type data: bytes
+        :param timeout: seconds allowed for the run
+        :type timeout: int or float
+        :return: last tool's standard output and all tools' standard
+        error
+        :rtype: tuple(bytes, bytes)
+        :raises subprocess.TimeoutExpired: if the pipeline does not
+        finish within the timeout
+        :raises OSError: if a tool cannot be started
+        """
+        with tempfile.TemporaryFile() as stdin, \
+                tempfile.TemporaryFile() as stderr:
+            stdin.write(data)
+            stdin.seek(0)
+            processes = []
+            try:
+                for args in pipeline:
+                    source = processes[-1].stdout if processes else stdin
+                    processes.append(subprocess.Popen(args,
+                                                      stdin=source,
+                                                      stdout=subprocess.PIPE,
+                                                      stderr=stderr,
+                                                      cwd=self.cwd))
+                    if len(processes) > 1:
+                        processes[-2].stdout.close()
+                stdout = processes[-1].communicate(timeout=timeout)[0]
+                for process in processes[:-1]:
+                    process.wait(timeout=timeout)
+            except BaseException:
+                for process in processes:
+                    process.kill()
+                    process.wait()
+                raise
+            stderr.seek(0)
+            return stdout, stderr.read()
+
+
+def get_tool_pool():
+    """
+    Gets tool pool, creating it on first call. The pool is shared by
+    all calls within a process, so each Spark executor has its own.
+
+    :return: tool pool
+    :rtype: ToolPool
+    """
+    global _TOOL_POOL
+    if _TOOL_POOL is None:
+        _TOOL_POOL = ToolPool()
+    return _TOOL_POOL
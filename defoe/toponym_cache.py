@@ -0,0 +1,137 @@
+"""
+On-disk cache of toponym resolution results, shared by processes on a
+node and kept across runs.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+
+TOPONYM_CACHE_ENV = "DEFOE_TOPONYM_CACHE"
+""" Environment variable giving path to cache file """
+TOPONYM_CACHE_FILE = "defoe-toponyms.sqlite"
+""" Cache file name in temporary directory, if TOPONYM_CACHE_ENV is unset """
+TOPONYM_CACHE_TIMEOUT = 60
+""" Seconds to wait for another process's write to finish """
+
+_TOPONYM_CACHE = None
+
+
+def options_key(options):
+    """
+    Gets key identifying options used to resolve toponyms, for example
+    a tool command line holding gazetteer and bounding box.
+
+    :param options: options
+    :type options: list(str or unicode)
+    :return: key
+    :rtype: str or unicode
+    """
+    return hashlib.sha1(json.dumps(options).encode("utf-8")).hexdigest()
+
+
+def content_key(options, content):
+    """
+    Gets key identifying content, such as a toponym or the text of a
+    page, resolved with the given options.
+
+    :param options: options
+    :type options: list(str or unicode)
+    :param content: content
+    :type content: str or unicode
+    :return: key
+    :rtype: str or unicode
+    """
+    return options_key(options) + ":" + content
+
+
+class ToponymCache(object):
+    """
+    Key-value cache held in an SQLite file. Values are stored as
+    JSON. If the file cannot be used then the cache is always empty.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor.
+
+        :param path: cache file path
+        :type path: str or unicode
+        """
+        self.path = path
+        try:
+            self._connection = sqlite3.connect(path,
+                                               timeout=TOPONYM_CACHE_TIMEOUT)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT)")
+            self._connection.commit()
+        except sqlite3.Error as exception:
+            print("err: '{}': {}".format(path, exception))
+            self._connection = None
+
+    def get_many(self, keys):
+        """
+        Gets cached values.
+
+        :param keys: keys
+        :type keys: list(str or unicode)
+        :return: values of keys in the cache
+        :rtype: dict
+        """
+        values = {}
+        if self._connection is None:
+            return values
+        keys = list(set(keys))
+        try:
+            # Stay below SQLite's limit on query parameters.
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._connection.execute(
+                    "SELECT key, value FROM cache WHERE key IN ({})".format(
+                        ",".join("?" * len(batch))), batch)
+                for key, value in rows:
+                    values[key] = json.loads(value)
+        except sqlite3.Error as exception:
+            print("err: '{}': {}".format(self.path, exception))
+        return values
+
+    def put_many(self, values):
+        """
+        Adds values to the cache.
+
+        :param values: values of keys
+        :type values: dict
+        """
+        if self._connection is None or not values:
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                    [(key, json.dumps(value))
+                     for key, value in values.items()])
+        except sqlite3.Error as exception:
+            print("err: '{}': {}".format(self.path, exception))
+
+
+def get_toponym_cache():
+    """
+    Gets toponym cache, opening it on first call. The cache file is
+    given by the DEFOE_TOPONYM_CACHE environment variable, or is
+    defoe-toponyms.sqlite in the temporary directory, so processes on
+    a node share it.
+
+    :return: toponym cache
+    :rtype: ToponymCache
+    """
+    global _TOPONYM_CACHE
+    if _TOPONYM_CACHE is None:
+        path = os.environ.get(TOPONYM_CACHE_ENV,
+                              os.path.join(tempfile.gettempdir(),
+                                           TOPONYM_CACHE_FILE))
+        _TOPONYM_CACHE = ToponymCache(path)
+    return _TOPONYM_CACHE